@@ -0,0 +1,250 @@
+# CONTINUUM: for the tokenising of lexeme content into terms
+import re
+# CONTINUUM: for the inverse document frequency of each term
+import math
+# CONTINUUM: allows us to create a named structure for each finding
+from dataclasses import dataclass
+# CONTINUUM: for the machine-readable form of the findings
+import json
+# CONTINUUM: to read the CLI and issue exit status
+import sys
+import argparse
+
+from compendium import COMPENDIUM
+from lexicographer import LEXICOGRAPHER
+
+'''
+THROUGHLINE:
+A library's catalogue answers "which books speak of this?" without anyone walking the shelves.
+
+Until now, finding every lexeme that mentions a concept (say "sludge", or "heir") meant grepping the whole lexeme store. The CATALOGUE is an inverted index of the words of every lexeme's content: each term is filed with every lexeme it appears in (and how often), so a search turns straight to the folios of its terms and ranks what it finds (by Okapi BM25), optionally keeping only the lexemes of some ExpoTags categories, or whose keys begin with an attestation prefix.
+
+Each lexeme is catalogued as a document, remembering the module (script) it was extracted from. So when only some modules are extracted afresh, only their documents are replaced - the rest of the catalogue is kept, without tokenising anything again - and the term folios are bound anew.
+
+The catalogue is bound (as a COMPENDIUM) alongside the lexeme store, e.g. `expo.catalogue.compendium`, holding:
+- `document:<key>` folios: the lexeme's module, category and term frequencies
+- `term:<term>` folios: the postings of the term, as [key, frequency, document length, category]
+- a `tally` folio: how many documents there are, and their average length
+'''
+
+# KNOWLEDGE: A single lexeme found by a search, and how well it ranked
+@dataclass(frozen=True)
+class Finding:
+    key: str
+    category: str
+    module: str
+    score: float
+
+    def __str__(self):
+        return f"{self.score:8.3f}  {self.key} [{self.category}] ({self.module})"
+
+
+'''
+FIGURATION:
+Catalogues the words of every lexeme's content, module by module, so lexemes can be sought by what they say.
+'''
+class CATALOGUE:
+    # KNOWLEDGE: The conventional file extension of a bound catalogue, sitting alongside the lexeme stores
+    EXTENSION = f".catalogue{COMPENDIUM.EXTENSION}"
+
+    # KNOWLEDGE: How the folios of a bound catalogue are headed
+    DOCUMENT = 'document:'
+    TERM = 'term:'
+    TALLY = 'tally'
+
+    # KNOWLEDGE: The words of content: runs of letters and digits (so snake_case names are filed under each of their parts)
+    WORD = re.compile(r'[A-Za-z][A-Za-z0-9]*|[0-9]+')
+
+    # KNOWLEDGE: The BM25 term frequency saturation (k1) and length normalisation (b)
+    SATURATION = 1.2
+    NORMALISATION = 0.75
+
+    def __init__(self):
+        # KNOWLEDGE: Every lexeme catalogued, as key -> {'module', 'category', 'terms': {term: frequency}}
+        self._documents = {}
+        # KNOWLEDGE: The keys of the lexemes each module gave
+        self._modules = {}
+
+    '''
+    SKILL:
+    The terms of some text, in order (lower-cased)
+    '''
+    @staticmethod
+    def terms_of(text):
+        return [word.lower() for word in CATALOGUE.WORD.findall(text)]
+
+    '''
+    BEHAVIOUR:
+    Catalogues the expositions (key -> Lexeme) of a module, in place of whatever it gave before.
+    As in the lexeme store, a key already given by another module is now given by this one.
+    '''
+    def update(self, module, expositions):
+        module = str(module)
+        self.forget(module)
+
+        keys = set()
+        for key, lexeme in expositions.items():
+            key = str(key)
+            previous = self._documents.get(key)
+            # (distinct keys of this very module may be written alike, and this module's own keys were already forgotten)
+            if previous is not None and previous['module'] != module:
+                self._modules[previous['module']].discard(key)
+
+            record = LEXICOGRAPHER.transcribe(lexeme)
+            terms = {}
+            for term in self.terms_of(record['content']):
+                terms[term] = terms.get(term, 0) + 1
+            self._documents[key] = {'module': module, 'category': record['category'], 'terms': terms}
+            keys.add(key)
+
+        if keys:
+            self._modules[module] = keys
+
+    '''
+    BEHAVIOUR:
+    Removes every lexeme a module gave from the catalogue (e.g. when the module is no more)
+    '''
+    def forget(self, module):
+        for key in self._modules.pop(str(module), set()):
+            del self._documents[key]
+
+    def __len__(self):
+        return len(self._documents)
+
+    '''
+    MECHANISM:
+    Gives the folios of the bound catalogue: every document, the postings of every term, and the tally
+    '''
+    def _folios(self):
+        postings = {}
+        total_length = 0
+        for key, document in self._documents.items():
+            length = sum(document['terms'].values())
+            total_length += length
+            for term, frequency in document['terms'].items():
+                postings.setdefault(term, []).append([key, frequency, length, document['category']])
+            yield f"{CATALOGUE.DOCUMENT}{key}", document
+
+        for term, posted in postings.items():
+            yield f"{CATALOGUE.TERM}{term}", posted
+
+        count = len(self._documents)
+        yield CATALOGUE.TALLY, {'documents': count, 'average_length': total_length / count if count else 0.0}
+
+    '''
+    BEHAVIOUR:
+    Binds the catalogue into a compendium at the given path
+    '''
+    def save(self, path):
+        COMPENDIUM.bind(path, self._folios())
+
+    '''
+    BEHAVIOUR:
+    Reopens a bound catalogue, ready to be updated
+    '''
+    @staticmethod
+    def load(path):
+        catalogue = CATALOGUE()
+        with COMPENDIUM(path) as book:
+            # (the document folios all sort together, ahead of the tally and the terms)
+            for key, document in book.folios():
+                if not key.startswith(CATALOGUE.DOCUMENT):
+                    break
+                key = key[len(CATALOGUE.DOCUMENT):]
+                catalogue._documents[key] = document
+                catalogue._modules.setdefault(document['module'], set()).add(key)
+        return catalogue
+
+    '''
+    BEHAVIOUR:
+    Searches a bound catalogue (or an open one) for the lexemes whose content best matches the query, best first.
+    Only lexemes of the given categories (if any), and whose keys begin with the attestation prefix (if any), are found.
+    '''
+    @staticmethod
+    def search(store, query, categories=None, prefix=None, limit=10):
+        if isinstance(store, str):
+            with COMPENDIUM(store) as opened:
+                return CATALOGUE.search(opened, query, categories, prefix, limit)
+
+        tally = store.get(CATALOGUE.TALLY)
+        if not tally or not tally['documents']:
+            return []
+        count, average_length = tally['documents'], tally['average_length'] or 1.0
+        k1, b = CATALOGUE.SATURATION, CATALOGUE.NORMALISATION
+
+        scores = {}
+        for term in dict.fromkeys(CATALOGUE.terms_of(query)):
+            posted = store.get(f"{CATALOGUE.TERM}{term}", [])
+            rarity = math.log(1 + (count - len(posted) + 0.5) / (len(posted) + 0.5))
+            for key, frequency, length, category in posted:
+                if categories and category not in categories:
+                    continue
+                if prefix and not key.startswith(prefix):
+                    continue
+                weight = frequency * (k1 + 1) / (frequency + k1 * (1 - b + b * length / average_length))
+                scores[key] = (scores.get(key, (0.0, category))[0] + rarity * weight, category)
+
+        ranked = sorted(scores.items(), key=lambda scored: (-scored[1][0], scored[0]))
+        if limit:
+            ranked = ranked[:limit]
+        # (only the documents of the findings are turned to, for their modules)
+        return [
+            Finding(key, category, store[f"{CATALOGUE.DOCUMENT}{key}"]['module'], round(score, 6))
+            for key, (score, category) in ranked
+        ]
+
+
+'''
+BEHAVIOUR:
+Extracts some modules afresh, and updates a bound catalogue with just their lexemes (a module that is no more is forgotten)
+'''
+def recatalogue(path, modules):
+    import os
+    from granulator import GRANULATOR, Lineages
+
+    catalogue = CATALOGUE.load(path) if os.path.exists(path) else CATALOGUE()
+    lexicographer = LEXICOGRAPHER()
+    lineages = Lineages()
+    for module in modules:
+        if not os.path.isfile(module):
+            catalogue.forget(module)
+            continue
+        with open(module, 'rb') as f:
+            granulated = GRANULATOR(f, module, lineages).granulate()
+        catalogue.update(module, lexicographer.extract(granulated) if granulated else {})
+    catalogue.save(path)
+    return catalogue
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Searches (or updates) the catalogue of lexeme content bound during a scan (narrate.py --catalogue).")
+    commands = parser.add_subparsers(dest='command', required=True)
+
+    search = commands.add_parser('search', help="find the lexemes whose content best matches a query")
+    search.add_argument('store', help=f"the bound catalogue, e.g. expo{CATALOGUE.EXTENSION}")
+    search.add_argument('query', nargs='+', help="the words sought")
+    search.add_argument('--category', action='append', metavar='NAME', help="only lexemes of this ExpoTags category (may be repeated)")
+    search.add_argument('--prefix', metavar='ATTESTATION', help="only lexemes whose keys begin with this attestation")
+    search.add_argument('--limit', type=int, default=10, help="how many findings to give (0 for all; default 10)")
+    search.add_argument('--json', action='store_true', help="print the findings as JSON")
+
+    update = commands.add_parser('update', help="extract some modules afresh, and update the catalogue with just their lexemes")
+    update.add_argument('store', help=f"the bound catalogue, e.g. expo{CATALOGUE.EXTENSION}")
+    update.add_argument('modules', nargs='+', help="the scripts to extract, named just as the scan named them")
+    args = parser.parse_args()
+
+    if args.command == 'update':
+        catalogue = recatalogue(args.store, args.modules)
+        print(f"Catalogued {len(catalogue)} lexemes into {args.store}")
+        sys.exit(0)
+
+    findings = CATALOGUE.search(args.store, ' '.join(args.query), args.category, args.prefix, args.limit)
+    if args.json:
+        print(json.dumps([
+            {'key': f.key, 'category': f.category, 'module': f.module, 'score': f.score}
+            for f in findings
+        ], indent=2))
+    else:
+        for finding in findings:
+            print(finding)
+    sys.exit(0 if findings else 1)
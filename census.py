@@ -0,0 +1,181 @@
+# CONTINUUM: for the machine-readable form of the census
+import json
+# CONTINUUM: to find the stores a scan left behind
+import os
+# CONTINUUM: to read the CLI and issue exit status
+import sys
+import argparse
+
+from lexicographics import LexicalOccurence
+from compendium import COMPENDIUM
+from concordance import CONCORDANCE
+
+'''
+THROUGHLINE:
+A census counts every soul, and notes who is missing from the records.
+
+Every class and def names an heir, and every heir ought to have its story told. The census counts the heirs (the definitions noted in the concordance) and asks the lexeme store which of them have an exposition - and of which ExpoTags category - and which have none. The tally is given for the whole code base, module by module, and category by category, along with the names of those left untold.
+
+Nothing is granulated: the census is taken from the stores a scan (`narrate.py --concordance`) already left behind, so checking coverage (e.g. in CI) costs no more than reading them.
+'''
+
+'''
+FIGURATION:
+Counts the definitions of a code base, and how many of them have their story told.
+'''
+class CENSUS:
+    # KNOWLEDGE: How definitions with no exposition are tallied amongst the categories
+    UNTOLD = '(none)'
+
+    def __init__(self):
+        # KNOWLEDGE: Every definition counted, as (script, key, location, category or None)
+        self.definitions = []
+
+    '''
+    BEHAVIOUR:
+    Takes the census from a lexeme store (key -> record) and a bound concordance
+    '''
+    def take(self, lexemes, concordance):
+        for _, sightings in concordance.folios():
+            for lexical, script, attestation, line, column, definition in sightings:
+                if not definition:
+                    continue
+                key = str(LexicalOccurence(attestation, lexical))
+                record = lexemes.get(key)
+                self.definitions.append((script, key, (line, column), record['category'] if record else None))
+        self.definitions.sort(key=lambda definition: (definition[0], definition[2]))
+        return self
+
+    '''
+    BEHAVIOUR:
+    Takes the census from the stores a scan left behind under a base name (the freshest lexeme store - compendium or JSON, compressed or not - and the concordance)
+    '''
+    @staticmethod
+    def of_scan(basefile):
+        concordance_path = f"{basefile}{CONCORDANCE.EXTENSION}"
+        if not os.path.exists(concordance_path):
+            # Note: we raise errors in the native (Python) metaphor, since they cross the boundary of our module metaphor
+            raise ValueError(f"No concordance '{concordance_path}' - scan with `narrate.py --concordance` first.")
+
+        store_path = COMPENDIUM.latest(basefile)
+        if store_path is None:
+            raise ValueError(f"No lexeme store for '{basefile}' - scan with `narrate.py` first.")
+
+        lexemes = COMPENDIUM.consult(store_path)
+        try:
+            with COMPENDIUM(concordance_path) as concordance:
+                return CENSUS().take(lexemes, concordance)
+        finally:
+            if hasattr(lexemes, 'close'):
+                lexemes.close()
+
+    '''
+    SKILL:
+    A tally as (told, counted, percentage told)
+    '''
+    @staticmethod
+    def _tally(told, counted):
+        return told, counted, round(100.0 * told / counted, 1) if counted else 100.0
+
+    '''
+    MECHANISM:
+    The census, for the whole code base and module by module
+    '''
+    def coverage(self):
+        modules = {}
+        for script, _, _, category in self.definitions:
+            told, counted = modules.get(script, (0, 0))
+            modules[script] = (told + (category is not None), counted + 1)
+
+        told = sum(1 for *_, category in self.definitions if category is not None)
+        return self._tally(told, len(self.definitions)), {
+            script: self._tally(*tally) for script, tally in sorted(modules.items())
+        }
+
+    '''
+    MECHANISM:
+    How many definitions are told in each category (and how many are untold)
+    '''
+    def categories(self):
+        counts = {}
+        for *_, category in self.definitions:
+            category = category or CENSUS.UNTOLD
+            counts[category] = counts.get(category, 0) + 1
+        total = len(self.definitions)
+        return {category: self._tally(count, total) for category, count in sorted(counts.items())}
+
+    '''
+    MECHANISM:
+    The definitions whose story is untold, as (script, key, location)
+    '''
+    def untold(self):
+        return [(script, key, location) for script, key, location, category in self.definitions if category is None]
+
+    '''
+    BEHAVIOUR:
+    Prints the census
+    '''
+    def report(self, with_untold=True):
+        (told, counted, percentage), modules = self.coverage()
+        print(f"=== Exposition census: {told} of {counted} definitions told ({percentage}%)")
+
+        width = max([len(script) for script in modules] + [len('Module')])
+        print(f"{'Module':<{width}}  {'Told':>6}  {'Total':>6}  {'%':>6}")
+        for script, (told, counted, percentage) in modules.items():
+            print(f"{script:<{width}}  {told:>6}  {counted:>6}  {percentage:>6}")
+
+        print(f"{'Category':<{width}}  {'Count':>6}  {'':>6}  {'%':>6}")
+        for category, (count, _, percentage) in self.categories().items():
+            print(f"{category:<{width}}  {count:>6}  {'':>6}  {percentage:>6}")
+
+        if with_untold:
+            print("=== Untold:")
+            for script, key, location in self.untold():
+                print(f"{script}:{location[0]} {key}")
+
+    '''
+    MECHANISM:
+    The census as plain data, for machine consumption
+    '''
+    def as_dict(self):
+        (told, counted, percentage), modules = self.coverage()
+        return {
+            'told': told,
+            'definitions': counted,
+            'percentage': percentage,
+            'modules': {
+                script: {'told': told, 'definitions': counted, 'percentage': percentage}
+                for script, (told, counted, percentage) in modules.items()
+            },
+            'categories': {
+                category: {'count': count, 'percentage': percentage}
+                for category, (count, _, percentage) in self.categories().items()
+            },
+            'untold': [
+                {'script': script, 'key': key, 'location': list(location)}
+                for script, key, location in self.untold()
+            ],
+        }
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Reports which classes and defs have no exposition, from the stores of an earlier scan.")
+    parser.add_argument('base_filename', help=f"base name of the scan's stores (e.g. expo, for expo.json and expo{CONCORDANCE.EXTENSION})")
+    parser.add_argument('--json', action='store_true', help="print the census as JSON")
+    parser.add_argument('--brief', action='store_true', help="leave out the list of untold definitions")
+    parser.add_argument('--fail-under', type=float, metavar='PERCENT', help="exit with status 1 if less than PERCENT of definitions are told")
+    args = parser.parse_args()
+
+    try:
+        census = CENSUS.of_scan(args.base_filename)
+    except ValueError as e:
+        print(e)
+        sys.exit(2)
+
+    if args.json:
+        print(json.dumps(census.as_dict(), indent=2))
+    else:
+        census.report(with_untold=not args.brief)
+
+    (_, _, percentage), _ = census.coverage()
+    sys.exit(1 if args.fail_under is not None and percentage < args.fail_under else 0)
@@ -0,0 +1,159 @@
+# CONTINUUM: each lexeme is a line of JSON
+import json
+# CONTINUUM: gives the reader the familiar read-only dictionary face
+from collections.abc import Mapping
+
+'''
+THROUGHLINE:
+A chronicle is written as things happen, entry after entry, and is never rewritten - only added to.
+
+The classic JSON store can only be written once the whole scan is done, as one document, so nothing can read it until the very end. The CHRONICLE is the same lexemes as JSON Lines (e.g. `expo.jsonl`): one lexeme per line, `{"key": ..., "category": ..., "canonical": ..., "content": ..., "reference": ...}`, appended by the CHRONICLER as soon as each script's lexemes are extracted (and flushed, script by script).
+
+So a reader need not wait. It indexes the byte offset of every complete line it finds (reading only as far as each key), then turns straight to a line when its lexeme is wanted; and it can `refresh()` to index whatever lines have been appended since. As when updating a dictionary, should a key be written more than once, the last line wins.
+'''
+
+'''
+FIGURATION:
+Appends the lexemes of each script to a chronicle as soon as they are extracted.
+'''
+class CHRONICLER:
+    def __init__(self, path):
+        self.path = path
+        self._file = open(path, 'w', encoding='utf-8', newline='\n')
+
+    '''
+    BEHAVIOUR:
+    Appends one line per (key, record) pair, then flushes, so a reader sees every line whole
+    '''
+    def record(self, records):
+        for key, record in records:
+            self._file.write(CHRONICLE.line_of(key, record))
+        self._file.flush()
+
+    def close(self):
+        if not self._file.closed:
+            self._file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+
+'''
+FIGURATION:
+A chronicle of lexemes, read as a read-only dictionary of key -> record, without decoding any record until it is wanted.
+'''
+class CHRONICLE(Mapping):
+    # KNOWLEDGE: The conventional file extension of a chronicle, sitting alongside the JSON and TXT stores
+    EXTENSION = '.jsonl'
+
+    # KNOWLEDGE: How every line written by the chronicler opens, so its key can be read without decoding the rest
+    OPENING = '{"key": '
+
+    def __init__(self, path):
+        self.path = path
+        self._file = open(path, 'rb')
+        # KNOWLEDGE: The byte offset of the (latest) line of each key, and how far into the file the lines are indexed
+        self._offsets = {}
+        self._indexed = 0
+        self.refresh()
+
+    '''
+    BEHAVIOUR:
+    Writes a whole sequence of (key, record) pairs as a chronicle
+    '''
+    @staticmethod
+    def write(path, records):
+        with CHRONICLER(path) as chronicler:
+            chronicler.record(records)
+
+    '''
+    MECHANISM:
+    The line of a single lexeme
+    '''
+    @staticmethod
+    def line_of(key, record):
+        return json.dumps({'key': str(key), **record}, ensure_ascii=False) + '\n'
+
+    '''
+    MECHANISM:
+    Reads the key of a line, decoding no more of it than need be
+    '''
+    @staticmethod
+    def _key_of(line):
+        text = line.decode('utf-8')
+        if text.startswith(CHRONICLE.OPENING):
+            try:
+                return json.JSONDecoder().raw_decode(text, len(CHRONICLE.OPENING))[0]
+            except ValueError:
+                pass
+        return json.loads(text)['key']
+
+    '''
+    BEHAVIOUR:
+    Indexes every complete line appended since the last look (a line still being written is left for the next), giving how many were found
+    '''
+    def refresh(self):
+        self._file.seek(self._indexed)
+        found = 0
+        for line in self._file:
+            if not line.endswith(b'\n'):
+                break
+            if line.strip():
+                self._offsets[self._key_of(line)] = self._indexed
+                found += 1
+            self._indexed += len(line)
+        return found
+
+    def __getitem__(self, key):
+        offset = self._offsets[str(key)]
+        self._file.seek(offset)
+        record = json.loads(self._file.readline().decode('utf-8'))
+        del record['key']
+        return record
+
+    def __contains__(self, key):
+        return str(key) in self._offsets
+
+    def __len__(self):
+        return len(self._offsets)
+
+    def __iter__(self):
+        return iter(list(self._offsets))
+
+    '''
+    MECHANISM:
+    Walks the whole chronicle, in the order the keys first arrived, decoding each record in turn
+    '''
+    def folios(self):
+        for key in list(self._offsets):
+            yield key, self[key]
+
+    def close(self):
+        if not self._file.closed:
+            self._file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+
+if __name__ == '__main__':
+    import sys
+
+    if len(sys.argv) not in (2, 3):
+        print("Usage: python chronicle.py <expo.jsonl> [key]")
+        sys.exit(1)
+
+    with CHRONICLE(sys.argv[1]) as chronicle:
+        if len(sys.argv) == 2:
+            print(f"{len(chronicle)} lexemes chronicled in {sys.argv[1]}")
+            sys.exit(0)
+        if sys.argv[2] not in chronicle:
+            print(f"No lexeme '{sys.argv[2]}' in {sys.argv[1]}")
+            sys.exit(1)
+        print(json.dumps(chronicle[sys.argv[2]], indent=2))
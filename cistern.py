@@ -0,0 +1,127 @@
+# CONTINUUM: the spilled runs are merged back together as sorted streams
+import heapq
+# CONTINUUM: somewhere transient for the spilled runs to lie
+import tempfile
+# CONTINUUM: for naming each spilled run within the spillway
+import os
+
+from compendium import COMPENDIUM
+from lexicographer import LEXICOGRAPHER
+
+'''
+THROUGHLINE:
+Left alone, the full linguistic set is a reservoir that only ever fills: every lexeme of every script is held until the very end of the run, so the larger the tree, the deeper the water.
+
+A CISTERN holds only so much. Each script's lexemes pour in as a batch; once the level reaches the threshold, the cistern spills its contents - sorted by key - into a run on disk (a COMPENDIUM) and starts afresh.
+
+When the run is over the cistern is drained: the spilled runs and whatever remains in the cistern flow together as a single, key-ordered stream (a k-way merge), ready to be written straight into the final outputs.
+
+The flow honours the same rule as updating a dictionary: when the same key arrives from more than one batch, the latest batch wins. Every record therefore carries the ordinal of the batch that delivered it, which also lets the cistern drain stores that were filled elsewhere.
+
+A record that loses out is not stored, but it is still indexed (just as when the whole set is saved from a dictionary - see `LEXICOGRAPHER.save_to_file`), so the cistern notes its index entry on the way.
+'''
+
+'''
+FIGURATION:
+A bounded holding tank for the full linguistic set; it offers `update` just like the dictionary it stands in for, and `drain` to release the merged flow.
+'''
+class CISTERN:
+    # KNOWLEDGE: The field, added to each spilled record, noting which batch delivered it
+    ORDINAL = 'ordinal'
+
+    def __init__(self, threshold, spillway=None):
+        # KNOWLEDGE: How many lexemes may be held before the cistern spills
+        self.threshold = max(1, threshold)
+
+        # KNOWLEDGE: The lexemes currently held, as key -> transcribed record (including its ordinal)
+        self._held = {}
+
+        # KNOWLEDGE: How many batches have poured in so far
+        self._batches = 0
+
+        # KNOWLEDGE: The spilled runs, in the order they were spilled
+        self.runs = []
+
+        # KNOWLEDGE: The index entries of the records that lost out to a later one of the same key (only complete once the cistern has been drained)
+        self.shadowed = set()
+
+        # KNOWLEDGE: Where the runs are spilled; a transient directory that is cleared when the cistern is drained
+        self._spillway = tempfile.TemporaryDirectory(prefix='cistern-', dir=spillway)
+
+    '''
+    BEHAVIOUR:
+    Pours in one batch of lexemes (typically those of one script), spilling if the threshold has been reached.
+    Batches are numbered in the order they arrive, unless the pourer knows better (e.g. the script's place in a walk shared with other scans)
+    Should the batch's module be given, each record names it (as a merged store's records must - see LEXICOGRAPHER.save_records)
+    '''
+    def update(self, expositions, ordinal=None, module=None):
+        self._batches += 1
+        if ordinal is None:
+            ordinal = self._batches
+        for key, lexeme in expositions.items():
+            record = LEXICOGRAPHER.transcribe(lexeme)
+            record[CISTERN.ORDINAL] = ordinal
+            if module is not None:
+                record[LEXICOGRAPHER.MODULE] = module
+            name = str(key)
+            if name in self._held:
+                self.shadowed.add(f"{name}:{self._held[name]['category']}")
+            self._held[name] = record
+
+        if len(self._held) >= self.threshold:
+            self._spill()
+
+    '''
+    MECHANISM:
+    Binds the held lexemes into a run on disk, then empties the cistern
+    '''
+    def _spill(self):
+        run_path = os.path.join(self._spillway.name, f"run-{len(self.runs):06d}{COMPENDIUM.EXTENSION}")
+        COMPENDIUM.bind(run_path, self._held.items())
+        self.runs.append(run_path)
+        self._held = {}
+
+    '''
+    BEHAVIOUR:
+    Releases the full linguistic set as a stream of (key, record) pairs in key order, merging every spilled run with whatever is still held.
+    The spillway is cleared once the stream has run dry.
+    '''
+    def drain(self, with_ordinals=False):
+        stores = [COMPENDIUM(run_path) for run_path in self.runs]
+        try:
+            streams = [store.folios() for store in stores]
+            streams.append(iter(sorted(self._held.items())))
+            yield from CISTERN.confluence(streams, with_ordinals, self.shadowed)
+        finally:
+            for store in stores:
+                store.close()
+            self._held = {}
+            self.runs = []
+            self._spillway.cleanup()
+
+    '''
+    SKILL:
+    Merges several key-ordered streams of (key, record) pairs into one.
+    Where a key flows in from more than one stream, the record with the highest ordinal wins - exactly as if every batch had been poured, in order, into a single dictionary.
+    The ordinal is dropped from the records that flow out, unless they are to be merged again later.
+    Should a set be given, the index entry of every record that loses out is noted in it.
+    '''
+    @staticmethod
+    def confluence(streams, with_ordinals=False, shadowed=None):
+        merged = heapq.merge(*[
+            ((key, record.get(CISTERN.ORDINAL, 0), tributary, record) for key, record in stream)
+            for tributary, stream in enumerate(streams)
+        ])
+
+        current_key, current_record = None, None
+        for key, _, _, record in merged:
+            if current_record is not None and key != current_key:
+                yield current_key, current_record
+            elif current_record is not None and shadowed is not None:
+                shadowed.add(f"{key}:{current_record['category']}")
+            current_key, current_record = key, record
+            if not with_ordinals:
+                record.pop(CISTERN.ORDINAL, None)
+
+        if current_record is not None:
+            yield current_key, current_record
@@ -2,6 +2,8 @@
 import token
 # CONTINUUM: Tokenizes a text stream in-line with Python  syntax 
 import tokenize
+# CONTINUUM: presents a decoded passage of source text to the tokenizer as a text stream
+import io
 
 '''
 THROUGHLINE:
@@ -92,6 +94,30 @@ class CODEX:
     def objectify(source):
         return tokenize.tokenize(source.readline)
 
+    '''
+    MECHANISM:
+    Decodes source bytes into text just as the tokenisation itself would (honouring any coding cookie or BOM)
+    '''
+    @staticmethod
+    def transcode(source_bytes):
+        encoding, _ = tokenize.detect_encoding(io.BytesIO(source_bytes).readline)
+        return source_bytes.decode(encoding)
+
+    '''
+    MECHANISM:
+    Encapsulates the tokenisation of a passage of (decoded) source text, taken from the given line of a longer source.
+    Each token is placed as it would be in the longer source (and sheds its copy of the source line, which we never read).
+    '''
+    @staticmethod
+    def objectify_passage(text, first_line):
+        offset = first_line - 1
+        for token in tokenize.generate_tokens(io.StringIO(text).readline):
+            yield token._replace(
+                start=(token.start[0] + offset, token.start[1]),
+                end=(token.end[0] + offset, token.end[1]),
+                line=''
+            )
+
     '''
     MECHANISM:
     We want to contain ALL token structure knowledge to the base CODEX
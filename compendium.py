@@ -0,0 +1,360 @@
+# CONTINUUM: packs and unpacks the fixed-width header and contents table of the bound store
+import struct
+# CONTINUUM: lets a reader map the bound store into memory and only touch the pages it needs
+import mmap
+# CONTINUUM: each folio is a small JSON record, so it decodes exactly like the classic JSON store
+import json
+# CONTINUUM: holds the folios aside while the contents table is still being gathered
+import tempfile
+# CONTINUUM: copies the set-aside folios into the bound store
+import shutil
+# CONTINUUM: gives the reader the familiar read-only dictionary face
+from collections.abc import Mapping
+# CONTINUUM: the classic JSON store may be written (and is always read) compressed
+import gzip
+import lzma
+# CONTINUUM: for the stores found under a base name, and their sizes
+import os
+# CONTINUUM: to time the benchmark of each store's format
+import time
+
+from chronicle import CHRONICLE
+
+'''
+THROUGHLINE:
+The JSON lexeme store is a scroll: to read any part of it you must unroll the whole thing, and `json.load` does just that, building every lexeme as a Python object even though a narrative arc only ever calls upon a handful of them.
+
+A COMPENDIUM is the same knowledge bound as a book. It opens with a short colophon (the header: a mark of the bindery, an edition number, and where each section begins), then a contents table listing every lexeme key in sorted order alongside where its folio may be found, and finally the folios themselves (the content heap).
+
+Readers map the book into memory and, by bisecting the contents table, turn straight to the folio they want; only that folio is ever decoded.
+
+Layout (all integers little-endian):
+- colophon: magic(8) edition(u16) flags(u16) count(u32) keys_at(u64) folios_at(u64)
+- contents: count x [key_offset(u64) key_length(u32) folio_offset(u64) folio_length(u32)], sorted by utf-8 key
+- keys: the utf-8 keys, back-to-back
+- folios: one utf-8 JSON record per lexeme
+'''
+
+'''
+AFFORDANCE:
+A bound, memory-mappable lexeme store - written in one pass, read a folio at a time.
+
+It behaves as a read-only dictionary of key -> record, where each record is exactly the dictionary the JSON store holds for that key.
+'''
+class COMPENDIUM(Mapping):
+    # KNOWLEDGE: The bindery mark every compendium opens with
+    MAGIC = b'CASCOMP\x00'
+
+    # KNOWLEDGE: The edition of the layout this code binds and reads
+    EDITION = 1
+
+    # KNOWLEDGE: The conventional file extension of a compendium, sitting alongside the JSON and TXT stores
+    EXTENSION = '.compendium'
+
+    # KNOWLEDGE: The compressions a classic JSON store may be written with, as name -> (file suffix, the mark its files open with)
+    COMPRESSIONS = {
+        'gzip': ('.gz', b'\x1f\x8b'),
+        'lzma': ('.xz', b'\xfd7zXZ\x00'),
+    }
+
+    # KNOWLEDGE: The shapes of the colophon and of each line in the contents table
+    COLOPHON = struct.Struct('<8sHHIQQ')
+    CONTENTS_LINE = struct.Struct('<QIQI')
+
+    def __init__(self, path):
+        self.path = path
+        self._file = open(path, 'rb')
+        try:
+            self._pages = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+        except ValueError:
+            self._file.close()
+            raise ValueError(f"'{path}' is empty, so cannot be a compendium.")
+
+        if len(self._pages) < self.COLOPHON.size:
+            self.close()
+            raise ValueError(f"'{path}' is too short to be a compendium.")
+
+        magic, edition, _, count, keys_at, folios_at = self.COLOPHON.unpack_from(self._pages, 0)
+        if magic != self.MAGIC:
+            self.close()
+            raise ValueError(f"'{path}' is not a compendium.")
+        if edition != self.EDITION:
+            self.close()
+            raise ValueError(f"'{path}' is a compendium of edition {edition}, but only edition {self.EDITION} can be read.")
+
+        # KNOWLEDGE: How many lexemes are bound, and where the keys and folios sections begin
+        self._count = count
+        self._keys_at = keys_at
+        self._folios_at = folios_at
+
+    '''
+    BEHAVIOUR:
+    Binds a sequence of (key, record) pairs into a compendium at the given path.
+
+    The pairs may arrive in any order, and from a generator; each folio is set aside on disk as soon as it arrives, so only the keys are held in memory while the contents table is gathered.
+    Should a key arrive more than once, the last arrival wins - just as it would when updating a dictionary.
+    '''
+    @staticmethod
+    def bind(path, records):
+        contents = []
+        with tempfile.TemporaryFile() as folios:
+            # PROSE: On binding a compendium...
+            # Every folio is written aside as it arrives, remembering its key, position and length
+            folio_offset = 0
+            for arrival, (key, record) in enumerate(records):
+                folio = json.dumps(record, ensure_ascii=False).encode('utf-8')
+                folios.write(folio)
+                contents.append((str(key).encode('utf-8'), arrival, folio_offset, len(folio)))
+                folio_offset += len(folio)
+
+            # Then the contents are ordered by key, and only the latest arrival of any key is kept
+            contents.sort()
+            contents = [
+                line for i, line in enumerate(contents)
+                if i == len(contents) - 1 or contents[i + 1][0] != line[0]
+            ]
+
+            # The keys section follows the contents table, and the folios follow the keys
+            keys_at = COMPENDIUM.COLOPHON.size + COMPENDIUM.CONTENTS_LINE.size * len(contents)
+            folios_at = keys_at + sum(len(key) for key, _, _, _ in contents)
+
+            with open(path, 'wb') as book:
+                book.write(COMPENDIUM.COLOPHON.pack(
+                    COMPENDIUM.MAGIC, COMPENDIUM.EDITION, 0, len(contents), keys_at, folios_at
+                ))
+                key_offset = 0
+                for key, _, offset, length in contents:
+                    book.write(COMPENDIUM.CONTENTS_LINE.pack(key_offset, len(key), offset, length))
+                    key_offset += len(key)
+                for key, _, _, _ in contents:
+                    book.write(key)
+
+                # Finally the folios are copied in, whole, in the order they arrived - the contents table knows where each one lies
+                folios.seek(0)
+                shutil.copyfileobj(folios, book)
+
+    '''
+    MECHANISM:
+    Reads one line of the contents table
+    '''
+    def _contents_line(self, index):
+        return self.CONTENTS_LINE.unpack_from(self._pages, self.COLOPHON.size + index * self.CONTENTS_LINE.size)
+
+    '''
+    MECHANISM:
+    Reads the key named on one line of the contents table, as raw utf-8
+    '''
+    def _key_at(self, index):
+        key_offset, key_length, _, _ = self._contents_line(index)
+        start = self._keys_at + key_offset
+        return self._pages[start:start + key_length]
+
+    '''
+    MECHANISM:
+    Decodes the folio named on one line of the contents table
+    '''
+    def _folio_at(self, index):
+        _, _, folio_offset, folio_length = self._contents_line(index)
+        start = self._folios_at + folio_offset
+        return json.loads(self._pages[start:start + folio_length].decode('utf-8'))
+
+    '''
+    SKILL:
+    Bisects the contents table for a key, giving its line number, or -1 if the key is not bound here
+    '''
+    def _find(self, key):
+        wanted = str(key).encode('utf-8')
+        low, high = 0, self._count
+        while low < high:
+            middle = (low + high) // 2
+            if self._key_at(middle) < wanted:
+                low = middle + 1
+            else:
+                high = middle
+        if low < self._count and self._key_at(low) == wanted:
+            return low
+        return -1
+
+    def __getitem__(self, key):
+        index = self._find(key)
+        if index < 0:
+            raise KeyError(key)
+        return self._folio_at(index)
+
+    def __contains__(self, key):
+        return self._find(key) >= 0
+
+    def __len__(self):
+        return self._count
+
+    def __iter__(self):
+        for index in range(self._count):
+            yield self._key_at(index).decode('utf-8')
+
+    '''
+    MECHANISM:
+    Walks the whole compendium, in key order, decoding each folio in turn
+    '''
+    def folios(self):
+        for index in range(self._count):
+            yield self._key_at(index).decode('utf-8'), self._folio_at(index)
+
+    '''
+    MECHANISM:
+    Releases the mapped pages and the underlying file
+    '''
+    def close(self):
+        if getattr(self, '_pages', None) is not None:
+            self._pages.close()
+            self._pages = None
+        if not self._file.closed:
+            self._file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    '''
+    BEHAVIOUR:
+    Opens any lexeme store as a read-only dictionary of key -> record: a compendium is mapped, a chronicle is indexed, anything else is read as the classic JSON store (compressed or not)
+    '''
+    @staticmethod
+    def consult(path):
+        if str(path).endswith(CHRONICLE.EXTENSION):
+            return CHRONICLE(path)
+        with open(path, 'rb') as f:
+            is_compendium = f.read(len(COMPENDIUM.MAGIC)) == COMPENDIUM.MAGIC
+        if is_compendium:
+            return COMPENDIUM(path)
+        with COMPENDIUM.scroll(path) as jf:
+            return json.load(jf)
+
+    '''
+    MECHANISM:
+    Opens a classic JSON store as text.
+    For reading, any compression is recognised by the mark its file opens with; for writing, the compression is chosen by the path's suffix (e.g. expo.json.gz).
+    '''
+    @staticmethod
+    def scroll(path, mode='r'):
+        compression = None
+        if mode == 'r':
+            with open(path, 'rb') as f:
+                opening = f.read(8)
+            compression = next((name for name, (_, mark) in COMPENDIUM.COMPRESSIONS.items() if opening.startswith(mark)), None)
+        else:
+            compression = next((name for name, (suffix, _) in COMPENDIUM.COMPRESSIONS.items() if str(path).endswith(suffix)), None)
+
+        if compression == 'gzip':
+            # (the middling level: most of the shrinkage, at a fraction of the time of the highest)
+            return gzip.open(path, mode + 't', encoding='utf-8', compresslevel=6)
+        if compression == 'lzma':
+            return lzma.open(path, mode + 't', encoding='utf-8')
+        return open(path, mode, encoding='utf-8')
+
+    '''
+    SKILL:
+    Finds the freshest lexeme store a scan left under a base name: the classic JSON (however compressed), the chronicle or the compendium, whichever was written last (the compendium, should they tie); None if there is none.
+    Any stores passed over (e.g. a chronicle the running scan has just begun) are not considered.
+    '''
+    @staticmethod
+    def latest(basefile, passing_over=()):
+        candidates = [f"{basefile}.json{suffix}" for suffix in ['', *(suffix for suffix, _ in COMPENDIUM.COMPRESSIONS.values())]]
+        candidates.append(f"{basefile}{CHRONICLE.EXTENSION}")
+        candidates.append(f"{basefile}{COMPENDIUM.EXTENSION}")
+        existing = [(os.path.getmtime(path), path.endswith(COMPENDIUM.EXTENSION), path) for path in candidates if os.path.exists(path) and path not in passing_over]
+        return max(existing)[2] if existing else None
+
+    '''
+    MECHANISM:
+    Converts a classic JSON lexeme store (compressed or not) into a compendium
+    '''
+    @staticmethod
+    def from_json(json_path, compendium_path):
+        with COMPENDIUM.scroll(json_path) as jf:
+            COMPENDIUM.bind(compendium_path, json.load(jf).items())
+
+    '''
+    MECHANISM:
+    Converts a compendium back into a classic JSON lexeme store (in key order)
+    '''
+    @staticmethod
+    def to_json(compendium_path, json_path):
+        with COMPENDIUM(compendium_path) as book:
+            with COMPENDIUM.scroll(json_path, 'w') as jf:
+                json.dump(dict(book.folios()), jf, indent=2)
+
+    '''
+    SKILL:
+    Times how long a lexeme store takes to load in full (every record decoded), giving (seconds, records)
+    '''
+    @staticmethod
+    def time_load(path):
+        started = time.perf_counter()
+        store = COMPENDIUM.consult(path)
+        try:
+            records = sum(1 for _ in (store.folios() if hasattr(store, 'folios') else store.items()))
+        finally:
+            if hasattr(store, 'close'):
+                store.close()
+        return time.perf_counter() - started, records
+
+    '''
+    BEHAVIOUR:
+    Benchmarks every format of lexeme store for the same records: each is written aside, then loaded back in full.
+    Gives, for each format, its (size in bytes, seconds to write, seconds to load).
+    '''
+    @staticmethod
+    def benchmark(path):
+        store = COMPENDIUM.consult(path)
+        try:
+            records = dict(store.folios()) if hasattr(store, 'folios') else store
+        finally:
+            if hasattr(store, 'close'):
+                store.close()
+
+        formats = {
+            'json': '.json',
+            **{name: f".json{suffix}" for name, (suffix, _) in COMPENDIUM.COMPRESSIONS.items()},
+            'chronicle': CHRONICLE.EXTENSION,
+            'compendium': COMPENDIUM.EXTENSION,
+        }
+        results = {}
+        with tempfile.TemporaryDirectory() as aside:
+            for name, suffix in formats.items():
+                written = os.path.join(aside, f"benchmark{suffix}")
+                started = time.perf_counter()
+                if name == 'compendium':
+                    COMPENDIUM.bind(written, records.items())
+                elif name == 'chronicle':
+                    CHRONICLE.write(written, records.items())
+                else:
+                    with COMPENDIUM.scroll(written, 'w') as jf:
+                        json.dump(records, jf, indent=2)
+                write_seconds = time.perf_counter() - started
+                load_seconds, _ = COMPENDIUM.time_load(written)
+                results[name] = (os.path.getsize(written), write_seconds, load_seconds)
+        return results
+
+
+if __name__ == '__main__':
+    import sys
+
+    conversions = {
+        'to-compendium': COMPENDIUM.from_json,
+        'to-json': COMPENDIUM.to_json,
+    }
+    if len(sys.argv) == 3 and sys.argv[1] == 'benchmark':
+        print(f"{'Format':<12} {'Bytes':>12} {'Write (s)':>10} {'Load (s)':>10}")
+        for name, (size, write_seconds, load_seconds) in COMPENDIUM.benchmark(sys.argv[2]).items():
+            print(f"{name:<12} {size:>12,} {write_seconds:>10.3f} {load_seconds:>10.3f}")
+        sys.exit(0)
+
+    if len(sys.argv) != 4 or sys.argv[1] not in conversions:
+        print("Usage: python compendium.py to-compendium <expo.json[.gz|.xz]> <expo.compendium>")
+        print("       python compendium.py to-json <expo.compendium> <expo.json[.gz|.xz]>")
+        print("       python compendium.py benchmark <any lexeme store>")
+        sys.exit(1)
+
+    conversions[sys.argv[1]](sys.argv[2], sys.argv[3])
@@ -0,0 +1,177 @@
+# CONTINUUM: allows us to create a named structure for each usage found
+from dataclasses import dataclass
+from typing import Tuple
+# CONTINUUM: for the machine-readable form of the usages
+import json
+# CONTINUUM: to read the CLI and issue exit status
+import sys
+import argparse
+
+from granulator import GrainType
+from compendium import COMPENDIUM
+
+'''
+THROUGHLINE:
+A concordance is the scholar's alphabetical list of every word in a work, alongside every place the word is found.
+
+The GRANULATOR already finds every sighting of every identity (as IDENTITY grains), but until now they were thrown away as soon as the lexicographer had extracted its lexemes. The CONCORDANCE keeps them: during a scan every sighting is noted, and at the end the whole concordance is bound (as a COMPENDIUM) alongside the lexeme store, e.g. `expo.concordance.compendium`.
+
+Then "where is this used?" is answered by turning straight to one folio, rather than by granulating the whole code base again.
+
+Each folio is headed by a name (the last part of a dotted lexical, so `GRANULATOR.refine`, `self.refine` and `refine` are all found under `refine`), and lists every sighting of that name as:
+- the lexical as written (e.g. `self.refine`)
+- the script it was found in
+- its attestation (the lineage in which it was found)
+- its location (line, column) in the script
+- whether it is the definition (the very name a `class` or `def` gives to an heir), or just a use
+'''
+
+# KNOWLEDGE: A single sighting of an identity
+@dataclass(frozen=True)
+class Usage:
+    lexical: str
+    script: str
+    attestation: str
+    location: Tuple[int, int]
+    definition: bool
+
+    def __str__(self):
+        marker = '!' if self.definition else ''
+        return f"{marker}{self.script}:{self.location[0]}:{self.location[1]} {self.attestation}: {self.lexical}"
+
+
+'''
+FIGURATION:
+Notes every sighting of every identity during a scan, and binds them into a store that can be consulted name by name.
+'''
+class CONCORDANCE:
+    # KNOWLEDGE: The conventional file extension of a bound concordance, sitting alongside the lexeme stores
+    EXTENSION = f".concordance{COMPENDIUM.EXTENSION}"
+
+    def __init__(self):
+        # KNOWLEDGE: Every sighting so far, as name -> list of [lexical, script, attestation, line, column, definition]
+        self._sightings = {}
+
+    '''
+    MECHANISM:
+    The name a lexical is filed under: its last part
+    '''
+    @staticmethod
+    def name_of(lexical):
+        return lexical.rpartition('.')[2]
+
+    '''
+    BEHAVIOUR:
+    Notes every IDENTITY sighting in a script's granulated entries
+    '''
+    def note(self, script, entries):
+        script = str(script)
+        for lexical, attestation, location, definition in CONCORDANCE._identities(entries):
+            self._sightings.setdefault(self.name_of(lexical), []).append(
+                [lexical, script, attestation, location[0], location[1], definition]
+            )
+
+    '''
+    BEHAVIOUR:
+    Takes in every sighting noted by another concordance (e.g. one kept apart, in a quarantined process)
+    '''
+    def absorb(self, other):
+        for name, sightings in other._sightings.items():
+            self._sightings.setdefault(name, []).extend(sightings)
+
+    '''
+    MECHANISM:
+    Gives (lexical, attestation, location, definition) for every IDENTITY entry.
+    An Inventory can answer this straight from its columns; any other list of entries is asked entry by entry.
+    '''
+    @staticmethod
+    def _identities(entries):
+        if hasattr(entries, 'identities'):
+            yield from entries.identities()
+            return
+
+        for entry in entries:
+            semantics = entry.semantics()
+            if semantics['category'] == GrainType.IDENTITY.name:
+                yield semantics['semantic'], semantics['attestation'], semantics['reference'], semantics.get('is_heir', False)
+
+    def __len__(self):
+        return sum(len(sightings) for sightings in self._sightings.values())
+
+    '''
+    BEHAVIOUR:
+    Binds the concordance into a compendium at the given path
+    '''
+    def save(self, path):
+        COMPENDIUM.bind(path, self._sightings.items())
+
+    '''
+    BEHAVIOUR:
+    Consults a bound concordance (or an open one) for the usages of a lexical.
+    A bare name gives every sighting filed under it; a dotted lexical gives only the sightings written just so.
+    '''
+    @staticmethod
+    def usages(store, lexical, definitions_only=False):
+        if isinstance(store, str):
+            with COMPENDIUM(store) as opened:
+                return CONCORDANCE.usages(opened, lexical, definitions_only)
+
+        found = []
+        for written, script, attestation, line, column, definition in store.get(CONCORDANCE.name_of(lexical), []):
+            if '.' in lexical and written != lexical:
+                continue
+            if definitions_only and not definition:
+                continue
+            found.append(Usage(written, script, attestation, (line, column), bool(definition)))
+        return found
+
+    '''
+    BEHAVIOUR:
+    Consults a bound (or open) concordance for the uses of the very heir a lexeme key tells of - not of every heir that shares its name.
+    The heir of `/granulator.GRANULATOR.granulate` is defined in `/granulator.GRANULATOR`, so a use is of that heir when:
+    - it is written bare, or on `self` or `cls`, within that scope (e.g. `self.granulate` in a GRANULATOR method)
+    - it is written on the scope's own name (e.g. `GRANULATOR.granulate`)
+    - it is written bare or on anything else (e.g. imported, or on `granulator`, an instance) elsewhere, and no other heir anywhere shares the name
+    '''
+    @staticmethod
+    def uses_of(store, key):
+        scope, _, name = key.rpartition('.')
+        sightings = CONCORDANCE.usages(store, name)
+        definitions = {usage.attestation for usage in sightings if usage.definition}
+        sole = definitions == {scope}
+
+        uses = []
+        for usage in sightings:
+            if usage.definition:
+                continue
+            qualifier = usage.lexical.rpartition('.')[0]
+            within = usage.attestation == scope or usage.attestation.startswith(f"{scope}.")
+            if qualifier in ('self', 'cls'):
+                relevant = within
+            elif not qualifier:
+                relevant = within or sole
+            else:
+                relevant = qualifier.rpartition('.')[2] == scope.rpartition('.')[2].lstrip('/') or sole
+            if relevant:
+                uses.append(usage)
+        return uses
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Answers 'where is this used?' from the concordance bound during a scan (narrate.py --concordance).")
+    parser.add_argument('store', help=f"the bound concordance, e.g. expo{CONCORDANCE.EXTENSION}")
+    parser.add_argument('lexical', help="a name (every sighting of it) or a dotted lexical (only sightings written just so)")
+    parser.add_argument('--definitions', action='store_true', help="only the definitions, not the uses")
+    parser.add_argument('--json', action='store_true', help="print the usages as JSON")
+    args = parser.parse_args()
+
+    usages = CONCORDANCE.usages(args.store, args.lexical, args.definitions)
+    if args.json:
+        print(json.dumps([
+            {'lexical': u.lexical, 'script': u.script, 'attestation': u.attestation, 'location': list(u.location), 'definition': u.definition}
+            for u in usages
+        ], indent=2))
+    else:
+        for usage in usages:
+            print(usage)
+    sys.exit(0 if usages else 1)
@@ -0,0 +1,163 @@
+# CONTINUUM: to find where each class and def begins and ends
+import ast
+# CONTINUUM: for the scripts' paths, relative to the scan root
+import os
+# CONTINUUM: each script is mapped into memory, so an excerpt is just a slice of it
+import mmap
+# CONTINUUM: to read the CLI and issue exit status
+import sys
+
+from granulator import GRANULATOR
+from lexicographics import line_starts_of
+from compendium import COMPENDIUM
+
+'''
+THROUGHLINE:
+An excerpt is the passage quoted from a work, set beside the commentary upon it.
+
+The story told of a class or def is all the better for the code it tells of. The grains only know where each heir begins, so during a scan (`narrate.py --excerpts`) the EXCERPTS note where every class and def begins (with its first decorator) and ends, and, for every script, the byte offset at which each of its lines starts. These are bound (as a COMPENDIUM) alongside the lexeme store, e.g. `expo.excerpts.compendium`, holding:
+- `<key>` folios: the script (relative to the scan root), and the first and last lines of the class or def that the lexeme keyed so tells of
+- `script:<path>` folios: the script's size, and the offset of the start of each of its lines
+
+So the narration can set each lexeme's source beside its story (`narration.py --excerpts`) by turning to two folios and taking a single slice of the script, mapped into memory - nothing is re-read or re-tokenised. A script that has changed size since the scan is not excerpted at all, rather than excerpted wrongly.
+'''
+
+'''
+FIGURATION:
+Notes where every class and def of each script lies, and binds them into a store that excerpts can be sliced by.
+'''
+class EXCERPTS:
+    # KNOWLEDGE: The conventional file extension of bound excerpts, sitting alongside the lexeme stores
+    EXTENSION = f".excerpts{COMPENDIUM.EXTENSION}"
+
+    # KNOWLEDGE: How the folios of a script's line offsets are headed
+    SCRIPT = 'script:'
+
+    # KNOWLEDGE: The definitions that can be excerpted
+    DEFINITIONS = (ast.ClassDef, ast.FunctionDef, ast.AsyncFunctionDef)
+
+    def __init__(self):
+        # KNOWLEDGE: Every folio noted so far, as heading -> folio
+        self._folios = {}
+
+    '''
+    BEHAVIOUR:
+    Notes every class and def of a script on disk (named just as the scan named it), giving how many were noted.
+    A script that cannot be parsed is passed over.
+    '''
+    def note(self, full_path, root):
+        with open(full_path, 'rb') as f:
+            source = f.read()
+        try:
+            tree = ast.parse(source)
+        except (SyntaxError, ValueError):
+            return 0
+
+        relative = os.path.relpath(full_path, root).replace(os.sep, '/')
+        self._folios[f"{EXCERPTS.SCRIPT}{relative}"] = {'size': len(source), 'lines': line_starts_of(source)}
+
+        bx_id = GRANULATOR.identity_of(full_path)
+        noted = 0
+        for qualified, node in EXCERPTS._definitions(tree):
+            first = min([node.lineno] + [decorator.lineno for decorator in node.decorator_list])
+            self._folios[f"{bx_id}.{qualified}"] = [relative, first, node.end_lineno]
+            noted += 1
+        return noted
+
+    '''
+    MECHANISM:
+    Gives (qualified name, node) for every class and def in a tree, however deeply nested (e.g. in a class, or under an `if`)
+    '''
+    @staticmethod
+    def _definitions(node, qualifier=''):
+        for child in ast.iter_child_nodes(node):
+            if isinstance(child, EXCERPTS.DEFINITIONS):
+                qualified = f"{qualifier}.{child.name}" if qualifier else child.name
+                yield qualified, child
+                yield from EXCERPTS._definitions(child, qualified)
+            else:
+                yield from EXCERPTS._definitions(child, qualifier)
+
+    def __len__(self):
+        return sum(1 for heading in self._folios if not heading.startswith(EXCERPTS.SCRIPT))
+
+    '''
+    BEHAVIOUR:
+    Binds the excerpts into a compendium at the given path
+    '''
+    def save(self, path):
+        COMPENDIUM.bind(path, self._folios.items())
+
+
+'''
+FIGURATION:
+Slices excerpts from the scripts of a scan, by the excerpts bound during it.
+'''
+class EXCERPTER:
+    def __init__(self, path, root=None):
+        self._store = COMPENDIUM(path)
+        # KNOWLEDGE: The scan root the scripts are named relative to (by default, where the excerpts are bound)
+        self._root = root if root is not None else os.path.dirname(os.path.abspath(path))
+        # KNOWLEDGE: The scripts mapped so far, as relative path -> pages (None, for a script that is gone or has changed)
+        self._mapped = {}
+
+    '''
+    BEHAVIOUR:
+    Gives the source of the class or def a lexeme key tells of (whole lines, decorators and all), or None if there is none to give
+    '''
+    def excerpt(self, key):
+        found = self._store.get(key)
+        if found is None:
+            return None
+        script, first, last = found
+        table = self._store.get(f"{EXCERPTS.SCRIPT}{script}")
+        pages = self._pages(script, table['size'])
+        if pages is None:
+            return None
+
+        lines = table['lines']
+        start = lines[first - 1]
+        end = lines[last] if last < len(lines) else len(pages)
+        return pages[start:end].decode('utf-8', errors='replace')
+
+    '''
+    MECHANISM:
+    Maps a script into memory, just once - unless it is gone, or is no longer the size it was when scanned
+    '''
+    def _pages(self, script, size):
+        if script not in self._mapped:
+            pages = None
+            try:
+                with open(os.path.join(self._root, script), 'rb') as f:
+                    if os.fstat(f.fileno()).st_size == size and size:
+                        pages = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+            except OSError:
+                pass
+            self._mapped[script] = pages
+        return self._mapped[script]
+
+    def close(self):
+        for pages in self._mapped.values():
+            if pages is not None:
+                pages.close()
+        self._mapped = {}
+        self._store.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+
+if __name__ == '__main__':
+    if len(sys.argv) != 3:
+        print(f"Usage: python excerpts.py <expo{EXCERPTS.EXTENSION}> <key>")
+        sys.exit(1)
+
+    with EXCERPTER(sys.argv[1]) as excerpter:
+        excerpt = excerpter.excerpt(sys.argv[2])
+    if excerpt is None:
+        print(f"No excerpt of '{sys.argv[2]}'")
+        sys.exit(1)
+    print(excerpt, end='')
@@ -0,0 +1,138 @@
+# CONTINUUM: for telling paths (of scripts, or of directories) from in-memory sources
+import os
+# CONTINUUM: to present in-memory sources as binary file-like bulk material
+import io
+
+from granulator import GRANULATOR, Lineages
+from lexicographer import LEXICOGRAPHER
+from quarry import QUARRY
+
+'''
+THROUGHLINE:
+`narrate.py` tells the tale to a terminal: it walks a directory on disk, asks before overwriting anything, chatters as it goes, and leaves its findings in files (via the module-wide `all_expositions`). That suits a person at a prompt, but not a program - a doc build wanting the lexemes had to shell out to it, then read the JSON back in.
+
+The EXPOSITOR is the same telling, as a library: hand it sources and it hands back Lexemes, script by script, as soon as each script is extracted - no prompts, no prints, no files written, and no state beyond its own.
+
+Sources may be:
+- a path to a script, or to a directory of scripts (quarried just as `narrate.py` quarries it)
+- in-memory bytes (of a single, unnamed script)
+- an iterable of any of these, or of (name, source) pairs, where the source is bytes, text or a binary file-like object
+
+For example:
+    from exposition import EXPOSITOR, lexemes
+
+    for lexeme in lexemes([('story.py', source_text)]):
+        print(lexeme.category.name, lexeme.canonical, lexeme.content)
+
+    for script, expositions in EXPOSITOR().expound('src'):
+        ...
+'''
+
+'''
+SKILL:
+Seeks out the Python scripts of interest beneath the root, in a sorted (and so repeatable) walk order
+By default the QUARRY skips names starting with underscore (probs holding areas for regressions, opaque support files or transients), version control and virtual environments, and honours .gitignore files.
+'''
+def seek_scripts(root, quarry=None):
+    return (quarry or QUARRY()).seek(root)
+
+
+'''
+FIGURATION:
+Tells the tale of any sources handed to it, giving back their lexemes script by script - a narrator that never speaks, only answers.
+'''
+class EXPOSITOR:
+    # KNOWLEDGE: The name given to a script handed over as bare bytes
+    UNNAMED = '<memory>'
+
+    def __init__(self, workers=None, quarry=None):
+        # KNOWLEDGE: how many processes may granulate a huge script (as narrate.py's --intra-file-workers)
+        self._workers = workers
+
+        # KNOWLEDGE: how directories amongst the sources are surveyed for scripts
+        self._quarry = quarry or QUARRY()
+
+        # PROSE:
+        # As in narrate.py, one lexicographer is re-used for every script, and the lineages met are registered just once for all of them.
+        # Both belong to this expositor alone, so expositors never share state.
+        self._lexicographer = LEXICOGRAPHER()
+        self._lineages = Lineages()
+
+    '''
+    BEHAVIOUR:
+    Gives (script name, expositions) for each script amongst the sources, in order, where the expositions are a dictionary of key -> Lexeme.
+    A script with nothing to granulate gives no expositions, and is passed over.
+    '''
+    def expound(self, sources):
+        for name, bulk_material in self.specimens(sources):
+            with bulk_material:
+                granulated = GRANULATOR(bulk_material, name, self._lineages, self._workers).granulate()
+            if granulated:
+                yield name, self._lexicographer.extract(granulated)
+
+    '''
+    BEHAVIOUR:
+    Gives every Lexeme of the sources, script by script, as each script is extracted
+    '''
+    def lexemes(self, sources):
+        for _, expositions in self.expound(sources):
+            yield from expositions.values()
+
+    '''
+    MECHANISM:
+    Gives (name, binary file-like bulk material) for each script amongst the sources; scripts on disk are only opened as they are reached
+    '''
+    def specimens(self, sources):
+        if EXPOSITOR._is_path(sources) or isinstance(sources, (bytes, bytearray, memoryview)):
+            sources = [sources]
+
+        for source in sources:
+            if isinstance(source, (bytes, bytearray, memoryview)):
+                yield EXPOSITOR.UNNAMED, io.BytesIO(bytes(source))
+            elif EXPOSITOR._is_path(source):
+                if os.path.isdir(source):
+                    for full_path in self._quarry.seek(source):
+                        yield full_path, open(full_path, 'rb')
+                else:
+                    yield os.fspath(source), open(source, 'rb')
+            elif isinstance(source, tuple) and len(source) == 2:
+                name, content = source
+                yield str(name), EXPOSITOR._as_bulk(content)
+            else:
+                # Note: we raise errors in the native (Python) metaphor, since they cross the boundary of our module metaphor
+                raise TypeError(f"Cannot expound a source of type {type(source).__name__}: give a path, bytes, or a (name, source) pair.")
+
+    @staticmethod
+    def _is_path(source):
+        return isinstance(source, (str, os.PathLike))
+
+    '''
+    MECHANISM:
+    Presents the content of a named source (bytes, text, or a binary file-like object) as binary file-like bulk material
+    '''
+    @staticmethod
+    def _as_bulk(content):
+        if isinstance(content, str):
+            return io.BytesIO(content.encode('utf-8'))
+        if isinstance(content, (bytes, bytearray, memoryview)):
+            return io.BytesIO(bytes(content))
+        if hasattr(content, 'read'):
+            # (read in full, so the caller's own file is left to the caller)
+            return io.BytesIO(content.read())
+        raise TypeError(f"Cannot expound content of type {type(content).__name__}: give bytes, text, or a binary file-like object.")
+
+
+'''
+BEHAVIOUR:
+Gives every Lexeme of the sources, as a fresh expositor would
+'''
+def lexemes(sources, workers=None):
+    return EXPOSITOR(workers).lexemes(sources)
+
+
+'''
+BEHAVIOUR:
+Gives (script name, expositions) for each script amongst the sources, as a fresh expositor would
+'''
+def expound(sources, workers=None):
+    return EXPOSITOR(workers).expound(sources)
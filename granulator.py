@@ -1,15 +1,29 @@
 # CONTINUUM: allows conversion of an underlying filepath to a batch identity
 from os import path
+# CONTINUUM: there is no sense in more parallel workers than there are CPUs to run them
+from os import cpu_count
 
 # CONTINUUM: allows us to create a named structure for the final substance list we produce
 from dataclasses import dataclass
 from dataclasses import field
 from enum import Enum
 from typing import List, Tuple
+# CONTINUUM: compact, typed columns for the inventory of grains
+from array import array
+# CONTINUUM: lets the passages of a huge batch be granulated side by side, in separate processes
+from concurrent.futures import ProcessPoolExecutor
+# CONTINUUM: to keep the whole batch in hand, should the parallel granulation have to fall back on a single pass
+import io
+# CONTINUUM: batches are known by the digest of their bulk, so a batch met again (e.g. a vendored copy) is recognised
+import hashlib
+# CONTINUUM: the batches remembered, least recently met first
+from collections import OrderedDict
+# CONTINUUM: to recognise the strings that might yet carry exposition
+import re
 
 
 from codices import CODEX, ENTITY
-from registrar import REGISTRAR as BX_RECORD
+from registrar import REGISTRAR as BX_RECORD, LINEAGE
 
 '''
 THROUGHLINE:
@@ -21,11 +35,16 @@ Through a series of processing steps, we generate an inventory of 'grains'—eac
 - substance: the found TEXT or IDENTITY itself
 - location: in the original source material
 - progenitor: is it the first of a new line?
+- heir: is it the very name a `class` or `def` gives to a new family line (i.e. a definition, rather than a use)?
 
 Metaphorically, the Python source code is the bulk_material we work on.
 It is tokenized into a powder of token particles, which are then purified and mixed into a precursor for refinement into grains.
 
+Most strings are inert: ordinary literals (data tables, SQL, messages) that can never carry exposition. As the powder is purified they are skimmed off, so they are never traced, classified or refined - but only where no other grain would miss them (an exposition looks ahead to the grain that follows it, and the registrar awards a pending title on the next particle it records).
+
 Particles are tracked through a batch record, capturing the Pythonic scope in which each particle is found.
+The same lineages recur across thousands of particles, so each is registered just once per run (in the Lineages) and thereafter known by a small number.
+The same batches recur too (vendored copies of a module), so the Lineages also remember the inventory of each batch by the digest of its bulk; a batch met again is not granulated afresh, its remembered inventory is just rebased onto the new batch's identity.
 
 Particles are distilled into grains such that a sequence like:
 >NAME.string='self' OP.string='.' NAME.string='powder'
@@ -35,6 +54,9 @@ becomes an IDENTITY grain with substance='self.powder'.
 NOTE: I discovered that tokens flow around such that DEDENTS arise not after the last line of indentation but immediately before the first dedented line...
 Subtle, upshot is in-line comments don't always turn up in the token stream as one might expect. 
 To counter this I have added the 'suspension/bubble-up' concept during the fine-mix so that in-line semantics more reliably associate with the correct lineage.
+
+A huge batch can be granulated in parallel: it is split into passages at top-level (column-0) `def`, `class` and decorator lines, and each passage is powdered, purified, mixed and traced in its own process, by its own registrar. The traced passages are then classified and refined, in order, as one.
+This only holds if each passage is traced from just where its predecessor left off (any sludge still clumped, and the standing of the registrar). Not knowing that in advance, every passage is first traced as if from the start of the batch; any passage that turns out to have begun elsewhere is traced again from where its predecessor was seen to end - until every passage has been traced from its true beginning.
 '''
 
 '''
@@ -46,17 +68,35 @@ Uses the SAMPLE test bed to inspect each particle and applies track&trace (via t
 Then refines particles into grains
 '''
 class GRANULATOR:
-    def __init__(self, bulk_material, source):
+    # KNOWLEDGE: Batches of fewer lines than this are always granulated in a single pass - for them, setting up the parallel passages costs more than it saves
+    PARALLEL_THRESHOLD = 20000
+
+    # KNOWLEDGE: How many passages each worker is given (on average), so that one long passage does not hold up the rest
+    PASSAGES_PER_WORKER = 2
+
+    # KNOWLEDGE: The top-level lines a batch may be split before (a decorator, and the def or class it decorates, stay together)
+    PASSAGE_OPENINGS = ('def ', 'class ', 'async def ', '@')
+
+    def __init__(self, bulk_material, source, lineages=None, workers=None):
         # KNOWLEDGE: identity of the overall package of materials
-        bx_id = path.splitext(source)[0]
-        bx_id = bx_id.replace('\\','.').strip('.')
+        bx_id = GRANULATOR.identity_of(source)
+        self._bx_id = bx_id
         self._track_and_trace = BX_RECORD(bx_id)
 
+        # KNOWLEDGE: how many processes may granulate the passages of a huge batch side by side (None, or 1, for a single pass)
+        self._workers = workers
+
+        # KNOWLEDGE: the register of lineages met during this run, shared by every batch granulated in the run (if so given)
+        self._lineages = lineages if lineages is not None else Lineages()
+
         self._bulk_material = bulk_material
 
-        # KNOWLEDGE: Full catalogue of the original material, as particles
+        # KNOWLEDGE: Full catalogue of the original material, as particles (never gathered in one place when granulated in parallel)
         self.powder = None
 
+        # KNOWLEDGE: how many particles the original material was powdered into
+        self.particles = 0
+
         # KNOWLEDGE: list of purified particles
         self.purified = None
 
@@ -100,12 +140,12 @@ class GRANULATOR:
     def _dump_materials(self, material_list):
         widest = 0
         for material in material_list:
-            widest = max(widest, len(material[0]))
+            widest = max(widest, len(str(material[0])))
 
         for material in material_list:
             for i, part in enumerate(material):
                 if i == 0:
-                    print(f"{material[i]:<{widest}}", end = '|')
+                    print(f"{str(material[i]):<{widest}}", end = '|')
                 elif i < len(material) - 1:
                     print(f"{material[i]}", end = '|')
                 else:
@@ -116,10 +156,40 @@ class GRANULATOR:
     Assay's the material and performs the granulation. 
     This is a distinct step from initiating the Granulator in case there are any startup issues
     (Pythonic mantra: __init__ must succeed)
+    A batch whose bulk has already been granulated during the run is recollected rather than granulated afresh.
     '''
     def granulate(self):
+        try:
+            bulk = self._bulk_material.read()
+        except:
+            # Note: we raise errors in the native (Python) metaphor, since they cross the boundary of our module metaphor
+            raise TypeError("Input must be a binary file-like object with a .readline() method returning bytes.")
+        # the batch is kept in hand, to be granulated should it not be one already met
+        self._bulk_material = io.BytesIO(bulk)
+
+        digest = hashlib.blake2b(bulk, digest_size=16).digest()
+        recollected = self._lineages.recollect(digest, self._bx_id)
+        if recollected is not None:
+            self.refined, self.particles = recollected
+            return self.refined
+
+        refined = self._granulate()
+        self._lineages.remember(digest, self._bx_id, refined, self.particles)
+        return refined
+
+    '''
+    MECHANISM:
+    Granulates the batch afresh: in parallel passages where it is worth it, otherwise in a single pass
+    '''
+    def _granulate(self):
+        if min(self._workers or 1, cpu_count() or 1) > 1:
+            refined = self._granulate_in_parallel()
+            if refined is not None:
+                return refined
+
         try:
             self.powder = SAMPLE.assay(self._bulk_material)
+            self.particles = len(self.powder)
             if not self.powder:
                 return []
         except:
@@ -127,11 +197,156 @@ class GRANULATOR:
             raise TypeError("Input must be a binary file-like object with a .readline() method returning bytes.")
 
         self.purified = self.purify(self.powder)
-        self.intermediate = self.fine_mix(self.purified, self._track_and_trace)
-        self.refined = self.refine(self.intermediate)
+        self.intermediate = self.fine_mix(self.purified, self._track_and_trace, self._lineages)
+        self.refined = self.refine(self.intermediate, self._lineages)
 
         return self.refined
 
+    '''
+    BEHAVIOUR:
+    Granulates a huge batch passage by passage, in parallel, giving None whenever it cannot be done (so a single pass must be made)
+    '''
+    def _granulate_in_parallel(self):
+        try:
+            bulk = self._bulk_material.read()
+        except:
+            raise TypeError("Input must be a binary file-like object with a .readline() method returning bytes.")
+        # the batch is kept in hand, should we have to fall back on a single pass
+        self._bulk_material = io.BytesIO(bulk)
+
+        passages = self.apportion(bulk, self._workers * GRANULATOR.PASSAGES_PER_WORKER)
+        if passages is None:
+            return None
+
+        # PROSE: On granulating in parallel...
+        # The batch begins with no sludge, and a fresh registrar
+        outset = (False, self._track_and_trace.standing())
+        beginnings = [outset] * len(passages)
+        traced_passages = [None] * len(passages)
+        settled = 0
+
+        try:
+            with ProcessPoolExecutor(max_workers=min(self._workers, cpu_count(), len(passages))) as workers:
+                while settled < len(passages):
+                    # Each unsettled passage is traced (in its own process) from where its predecessor was last seen to end
+                    retrace = [k for k in range(settled, len(passages)) if traced_passages[k] is None or traced_passages[k][0] != beginnings[k]]
+                    results = workers.map(
+                        GRANULATOR._trace_passage,
+                        [passages[k][0] for k in retrace], [passages[k][1] for k in retrace], [beginnings[k] for k in retrace]
+                    )
+                    for k, result in zip(retrace, results):
+                        if result is None:
+                            return None
+                        traced_passages[k] = (beginnings[k],) + result
+
+                    # A passage is settled once its predecessor is, and it began just where its predecessor ended
+                    # (the first unsettled passage is always traced from its true beginning, so every round settles at least one more)
+                    while settled < len(passages) and traced_passages[settled][0] == (traced_passages[settled - 1][1] if settled else outset):
+                        settled += 1
+                    for k in range(settled, len(passages)):
+                        beginnings[k] = traced_passages[k - 1][1]
+        except (OSError, RuntimeError):
+            # (e.g. no processes may be started here)
+            return None
+
+        # The passages are joined up again, in order, and classified and refined as one
+        traced = []
+        # (the batch as a whole has one ENCODING particle, which no passage has, and one ENDMARKER, which every passage has)
+        self.particles = 1 - (len(traced_passages) - 1)
+        for _, _, particles, passage in traced_passages:
+            self.particles += particles
+            traced.extend(passage)
+
+        self.intermediate = self._classify(traced, self._lineages)
+        self.refined = self.refine(self.intermediate, self._lineages)
+        return self.refined
+
+    '''
+    SKILL:
+    The identity of the batch from a source (its path, less its extension) - every lexeme extracted from the batch is keyed beneath it
+    '''
+    @staticmethod
+    def identity_of(source):
+        return path.splitext(source)[0].replace('\\','.').strip('.')
+
+    '''
+    SKILL:
+    Splits a batch (as bytes) into about so many passages of (text, first line), each opening with a top-level def, class or decorator; None if the batch is too small, cannot be decoded, or offers too few openings.
+    Openings inside a triple-quoted string are passed over (a rough, but cheap, look-out: a wrong guess just means a fall back on a single pass)
+    '''
+    @staticmethod
+    def apportion(bulk, passages):
+        try:
+            text = CODEX.transcode(bulk)
+        except (SyntaxError, UnicodeDecodeError):
+            return None
+
+        lines = io.StringIO(text).readlines()
+        if len(lines) < GRANULATOR.PARALLEL_THRESHOLD:
+            return None
+
+        openings = []
+        quoted = None
+        decorated = False
+        for number, line in enumerate(lines):
+            if quoted is None and number > 0 and line.startswith(GRANULATOR.PASSAGE_OPENINGS):
+                if not decorated:
+                    openings.append(number)
+                decorated = line.startswith('@')
+            for quote in GRANULATOR._triple_quotes(line):
+                if quoted is None:
+                    quoted = quote
+                elif quoted == quote:
+                    quoted = None
+
+        # The batch is cut at the openings nearest (at or after) evenly spaced marks
+        cuts = []
+        for mark in range(1, passages):
+            ideal = len(lines) * mark // passages
+            cut = next((opening for opening in openings if opening >= ideal), None)
+            if cut is not None and (not cuts or cut > cuts[-1]):
+                cuts.append(cut)
+        if not cuts:
+            return None
+
+        bounds = [0] + cuts + [len(lines)]
+        return [(''.join(lines[start:end]), start + 1) for start, end in zip(bounds, bounds[1:])]
+
+    '''
+    MECHANISM:
+    The triple quotes found in a line, in order
+    '''
+    @staticmethod
+    def _triple_quotes(line):
+        found = []
+        index = 0
+        while True:
+            single, double = line.find("'''", index), line.find('"""', index)
+            candidates = [position for position in (single, double) if position >= 0]
+            if not candidates:
+                return found
+            index = min(candidates)
+            found.append(line[index:index + 3])
+            index += 3
+
+    '''
+    BEHAVIOUR:
+    A worker's part in a parallel granulation: powders, purifies, mixes and traces a single passage from the given beginning (sludge, registrar standing).
+    Gives (ending, particles, traced) - or None if the passage could not be powdered.
+    '''
+    @staticmethod
+    def _trace_passage(text, first_line, beginning):
+        try:
+            powder = SAMPLE.assay_passage(text, first_line)
+        except Exception:
+            return None
+
+        sludge, standing = beginning
+        purified, sludge = GRANULATOR._purify(powder, sludge)
+        bx_record = BX_RECORD.resuming(standing)
+        traced = list(GRANULATOR._trace(GRANULATOR._mix(purified), purified, bx_record))
+        return (sludge, bx_record.standing()), len(powder), traced
+
     '''
     BEHAVIOUR:
     Purifies the powder by sieving for particles of interest
@@ -142,8 +357,15 @@ class GRANULATOR:
     '''
     @staticmethod
     def purify(hopper):
+        return GRANULATOR._purify(hopper)[0]
+
+    '''
+    MECHANISM:
+    Purifies the powder (perhaps starting amid sludge), giving the purified powder along with whether sludge was still clumped at the end
+    '''
+    @staticmethod
+    def _purify(hopper, sludge=False):
         purified_powder = []
-        sludge = False
 
         for particle in hopper:
             # PROSE: Interlude in a poet's voice...
@@ -168,7 +390,41 @@ class GRANULATOR:
                 if SAMPLE.is_filtrate(particle):
                     purified_powder.append(particle)
 
-        return purified_powder
+        return GRANULATOR._skim(purified_powder), sludge
+
+    '''
+    MECHANISM:
+    Skims the inert strings off the purified powder - wherever doing so changes nothing for the grains that remain:
+    - the grain before must be an IDENTITY (a TEXT would otherwise find a different grain following it) - and a NAME after an accessor is distilled onto the grain before, so `'KNOWLEDGE: a'.join` is still a TEXT
+    - the particle after must not be a DENT, or a COMMENT in suspension (the registrar would otherwise award any pending title later than it should)
+    - nor may it be an accessor (`'.'`), which would otherwise be distilled onto the IDENTITY before - so `joined = ', '.join(items)` would give `joined.join`
+    '''
+    @staticmethod
+    def _skim(purified):
+        skimmed = []
+        # (whether the last particle to become a grain would be an IDENTITY - DENTs and honourifics never become grains)
+        after_identity = False
+        # (whether the particle is being distilled onto the grain before, just as REFINE would - in which case no new grain is begun)
+        distil = False
+        last = len(purified) - 1
+        for index, particle in enumerate(purified):
+            if after_identity and SAMPLE.is_inert(particle):
+                if index == last or not (SAMPLE.is_unsettling(purified[index + 1]) or REFINE.is_distillant(purified[index + 1])):
+                    continue
+
+            skimmed.append(particle)
+            if SAMPLE.BUBBLE_UP.is_entity(particle):
+                continue
+            if not distil:
+                distil = REFINE.is_distillant(particle)
+            if distil:
+                distil = REFINE.is_distillant(particle)
+            elif LINEAGE.IDENTITIES.is_entity(particle):
+                after_identity = after_identity or LINEAGE.is_true_identity(particle)
+            else:
+                after_identity = False
+
+        return skimmed
 
     '''
     BEHAVIOUR:
@@ -176,13 +432,13 @@ class GRANULATOR:
     Mixing allows the DENTs to bubble up so they evapourate as we inspect and classify the remainder
     '''
     @staticmethod
-    def fine_mix(hopper, bx_record):
+    def fine_mix(hopper, bx_record, lineages):
         # PROSE: On the fine mix process...
         # Break up suspensions so the DENTs don't come between TEXTs and NAMEs
         powder_mix = GRANULATOR._mix(hopper)
 
         # Evapourate the DENTs so the remainder can be classified
-        intermediate = GRANULATOR._evapourate(powder_mix, hopper, bx_record)
+        intermediate = GRANULATOR._evapourate(powder_mix, hopper, bx_record, lineages)
 
         # No longer just a powder, the intermediate is ready to be refined into grains
         return intermediate
@@ -205,20 +461,41 @@ class GRANULATOR:
     '''
     MECHANISM:
     Applies track&trace while condensing the intermediate to just the components that will make up the refined IDENTITY and TEXT grains.
+    Each classification (lineage) is registered, so the intermediate carries just its number.
     '''
     @staticmethod
-    def _evapourate(powder_mix, hopper, bx_record):
-        classifications = {}
-        intermediate = []
+    def _evapourate(powder_mix, hopper, bx_record, lineages):
+        return GRANULATOR._classify(GRANULATOR._trace(powder_mix, hopper, bx_record), lineages)
+
+    '''
+    MECHANISM:
+    Applies track&trace to the mixed powder, giving (as_new_line, classification, particle) for each particle that is classified
+    '''
+    @staticmethod
+    def _trace(powder_mix, hopper, bx_record):
         for index in powder_mix:
             particle = hopper[index]
             as_new_line, classification = bx_record.record_history(particle)
             if classification is not None:
-                if not as_new_line:
-                    if classification not in classifications.keys():
-                        classifications[classification] = True
-                        as_new_line = True
-                intermediate.append(Precursor(classification, as_new_line, particle))
+                yield as_new_line, classification, particle
+
+    '''
+    MECHANISM:
+    Registers each traced classification, and makes the first particle of each classification the start of a new line
+    '''
+    @staticmethod
+    def _classify(traced, lineages):
+        classifications = {}
+        intermediate = []
+        for as_new_line, classification, particle in traced:
+            # (only the registrar's own new lines are heirs - a first sighting of a classification is not)
+            heir = as_new_line
+            classification = lineages.register(classification)
+            if not as_new_line:
+                if classification not in classifications.keys():
+                    classifications[classification] = True
+                    as_new_line = True
+            intermediate.append(Precursor(classification, as_new_line, particle, heir))
 
         return intermediate
 
@@ -228,14 +505,16 @@ class GRANULATOR:
     and split Identities with sequences of NAME(.NAME...)s
 
     Refines NAMEs through distillation
+
+    The refined grains are stocked, column by column, into an Inventory
     '''
     @staticmethod
-    def refine(hopper):
-        refined_grains = []
+    def refine(hopper, lineages):
+        refined_grains = Inventory(lineages)
 
         distil = False
-        refined = Grain('', None, '', (0,0), False)
-        for classification, new_product_line, particle in hopper:
+        refined = None
+        for classification, new_product_line, particle, heir in hopper:
             # PROSE: On the distillation process
             # If we are not already distilling, see if we should
             if not distil:
@@ -243,23 +522,29 @@ class GRANULATOR:
 
             # If we are distilling, condense into previous grain
             if distil:
-                refined_grains[-1].substance += SAMPLE.particle_name(particle)
+                refined[2] += SAMPLE.particle_name(particle)
                 distil = REFINE.is_distillant(particle)
                 continue
 
-            # Otherwise create a new grain
+            # Otherwise create a new grain (stocking the previous one, now it is fully condensed)
             else:
                 refined_type = REFINE.get_grain_type(particle)
                 if not refined_type:
                     continue
 
-                refined.lineage = classification
-                refined.type = refined_type
-                refined.substance = SAMPLE.particle_name(particle)
-                refined.location = SAMPLE.particle_location(particle)
-                refined.progenitor = new_product_line
-                refined_grains.append(refined)
-                refined = Grain('', None, '', (0,0), False)
+                if refined:
+                    refined_grains.stock(*refined)
+                refined = [
+                    classification,
+                    refined_type,
+                    SAMPLE.particle_name(particle),
+                    SAMPLE.particle_location(particle),
+                    new_product_line,
+                    heir
+                ]
+
+        if refined:
+            refined_grains.stock(*refined)
 
         return refined_grains
 
@@ -296,6 +581,10 @@ class SAMPLE(CODEX):
     BUBBLE_UP = ENTITY('DEDENT')
     BUBBLE_UP.add('INDENT')
 
+    # KNOWLEDGE: Strings are inert unless they might carry exposition: delimiting quotes, then a tag and its colon
+    INERTS = ENTITY('STRING')
+    EXPOSITORY = re.compile(r'[\'"]{1,3}\s*[A-Za-z]+:')
+
     '''
     MECHANISM:
     creates the powder from the bulk material
@@ -304,6 +593,14 @@ class SAMPLE(CODEX):
     def assay(bulk_material):
         return list(CODEX.objectify(bulk_material))
 
+    '''
+    MECHANISM:
+    creates the powder from a passage of (decoded) bulk material, starting at the given line of the batch
+    '''
+    @staticmethod
+    def assay_passage(text, first_line):
+        return list(CODEX.objectify_passage(text, first_line))
+
     '''
     SKILL:
     Blocks powder particles that don't fall through the sieve for collection
@@ -312,6 +609,22 @@ class SAMPLE(CODEX):
     def sieved(particle):
         return SAMPLE.SIEVE.is_entity(particle)
 
+    '''
+    SKILL:
+    Detects a string that cannot carry exposition
+    '''
+    @staticmethod
+    def is_inert(particle):
+        return SAMPLE.INERTS.is_entity(particle) and not SAMPLE.EXPOSITORY.match(SAMPLE.particle_name(particle))
+
+    '''
+    DISPOSITION:
+    Detects a particle the registrar (or the fine mix) treats out of the ordinary: a DENT, or a COMMENT that may be in suspension
+    '''
+    @staticmethod
+    def is_unsettling(particle):
+        return SAMPLE.BUBBLE_UP.is_entity(particle) or SAMPLE.SUSPENSIONS.is_entity(particle)
+
     '''
     DISPOSITION:
     Detects the emergence of a clump of sludge
@@ -370,20 +683,22 @@ class SAMPLE(CODEX):
         # return next_particle and SAMPLE.SUSPENSIONS.is_entity(this_particle) and SAMPLE.BUBBLE_UP.is_entity(next_particle)
 
 
-# KNOWLEDGE: Classified particles ready to be refined (particles + classification)
+# KNOWLEDGE: Classified particles ready to be refined (particles + classification, and whether the particle names an heir)
 @dataclass
 class Precursor:
     classification: str
     as_new_line: bool
     particle: object
+    heir: bool = field(default=False)
 
     def __iter__(self):
         yield self.classification
         yield self.as_new_line
         yield self.particle
+        yield self.heir
 
     def __len__(self):
-        return 3
+        return 4
 
     def __getitem__(self, index):
         return list(iter(self))[index]
@@ -406,6 +721,7 @@ class GrainType(Enum):
 
 
 # KNOWLEDGE: just what a grain looks like - i.e. lineage, type, content, canonicalism and original bulk material reference
+# (and whether it names an heir; which, being an afterthought, a grain does not give up when unpacked)
 @dataclass
 class Grain:
     lineage: str
@@ -413,6 +729,7 @@ class Grain:
     substance: str
     location: Tuple[int, int]
     progenitor: bool = field(default=False)
+    heir: bool = field(default=False)
 
     '''
     MECHANISM:
@@ -424,7 +741,8 @@ class Grain:
             'category': self.type.name,
             'semantic': self.substance,
             'reference': self.location,
-            'is_canonical': self.progenitor
+            'is_canonical': self.progenitor,
+            'is_heir': self.heir
         }
 
     def __iter__(self):
@@ -451,6 +769,209 @@ class Grain:
         return self.substance
 
 
+# KNOWLEDGE: The lineages met during a run, each registered just once and thereafter known by its number; and the batches granulated during the run, each known by the digest of its bulk
+class Lineages:
+    # KNOWLEDGE: How many batches are remembered before the least recently met are forgotten (0 to remember none)
+    BATCHES_REMEMBERED = 256
+
+    # KNOWLEDGE: How many grains the remembered batches may hold between them before the least recently met are forgotten; and the most grains a single batch may hold and still be remembered (so one huge batch can neither be held for the whole run, nor push every other out)
+    GRAINS_REMEMBERED = 1000000
+    BATCH_GRAINS_REMEMBERED = GRAINS_REMEMBERED // 4
+
+    def __init__(self):
+        self._titles = []
+        self._numbers = {}
+
+        # KNOWLEDGE: The batches remembered, as digest -> (batch identity, inventory, particles), and how many grains they hold between them
+        self._batches = OrderedDict()
+        self._grains_remembered = 0
+
+    '''
+    MECHANISM:
+    Gives the number of a lineage, registering it if it has not been met before
+    '''
+    def register(self, title):
+        number = self._numbers.get(title)
+        if number is None:
+            number = len(self._titles)
+            self._numbers[title] = number
+            self._titles.append(title)
+        return number
+
+    '''
+    MECHANISM:
+    Gives the full (dotted) title of a numbered lineage
+    '''
+    def title(self, number):
+        return self._titles[number]
+
+    def __len__(self):
+        return len(self._titles)
+
+    '''
+    MECHANISM:
+    Remembers the inventory (and particle count) a batch was granulated into, by the digest of its bulk - unless it holds too many grains to be worth holding on to
+    '''
+    def remember(self, digest, bx_id, inventory, particles):
+        grains = len(inventory)
+        if Lineages.BATCHES_REMEMBERED <= 0 or grains > Lineages.BATCH_GRAINS_REMEMBERED:
+            return
+        if digest in self._batches:
+            self._grains_remembered -= len(self._batches[digest][1])
+        self._batches[digest] = (bx_id, inventory, particles)
+        self._batches.move_to_end(digest)
+        self._grains_remembered += grains
+        while len(self._batches) > Lineages.BATCHES_REMEMBERED or self._grains_remembered > Lineages.GRAINS_REMEMBERED:
+            _, (_, forgotten, _) = self._batches.popitem(last=False)
+            self._grains_remembered -= len(forgotten)
+
+    '''
+    SKILL:
+    Recollects the inventory (and particle count) of a batch already met, rebased onto the identity of the batch now in hand; None if it was never met (or is forgotten)
+    '''
+    def recollect(self, digest, bx_id):
+        remembered = self._batches.get(digest)
+        if remembered is None:
+            return None
+        self._batches.move_to_end(digest)
+
+        remembered_bx_id, inventory, particles = remembered
+        if not inventory:
+            return [], particles
+        return inventory.rebased(remembered_bx_id, bx_id), particles
+
+
+# KNOWLEDGE: The inventory of refined grains, held column-wise (lineage number, type, line, column, progenitor, heir, plus a pool of distinct substances); it reads as a list of Grains, each only made up when called for
+class Inventory:
+    # KNOWLEDGE: The grain types, in the order of their codes in the type column
+    GRAIN_TYPES = list(GrainType)
+    GRAIN_CODES = {grain_type: code for code, grain_type in enumerate(GrainType)}
+
+    def __init__(self, lineages):
+        self.lineages = lineages
+        self._lineage = array('I')
+        self._type = array('B')
+        self._line = array('I')
+        self._column = array('I')
+        self._substance = array('I')
+        self._progenitor = array('B')
+        self._heir = array('B')
+
+        # KNOWLEDGE: Each distinct substance is pooled just once
+        self._substances = []
+        self._substance_numbers = {}
+
+    '''
+    MECHANISM:
+    Adds a grain to the end of the inventory
+    '''
+    def stock(self, lineage, grain_type, substance, location, progenitor, heir=False):
+        number = self._substance_numbers.get(substance)
+        if number is None:
+            number = len(self._substances)
+            self._substance_numbers[substance] = number
+            self._substances.append(substance)
+
+        self._lineage.append(lineage)
+        self._type.append(Inventory.GRAIN_CODES[grain_type])
+        self._line.append(location[0])
+        self._column.append(location[1])
+        self._substance.append(number)
+        self._progenitor.append(1 if progenitor else 0)
+        self._heir.append(1 if heir else 0)
+
+    '''
+    MECHANISM:
+    Shows a grain as a semantic entity (as per Grain.semantics) without making up the grain itself
+    '''
+    def semantics(self, index):
+        return {
+            'attestation': self.lineages.title(self._lineage[index]),
+            'category': Inventory.GRAIN_TYPES[self._type[index]].name,
+            'semantic': self._substances[self._substance[index]],
+            'reference': (self._line[index], self._column[index]),
+            'is_canonical': bool(self._progenitor[index]),
+            'is_heir': bool(self._heir[index])
+        }
+
+    '''
+    BEHAVIOUR:
+    Gives the semantics of every TEXT grain, alongside those of the grain that follows it (or None at the end)
+    '''
+    def texts_with_successors(self):
+        text_code = Inventory.GRAIN_CODES[GrainType.TEXT]
+        last = len(self) - 1
+        for index, type_code in enumerate(self._type):
+            if type_code == text_code:
+                yield self.semantics(index), self.semantics(index + 1) if index < last else None
+
+    '''
+    BEHAVIOUR:
+    Gives (substance, attestation, location, is_heir) for every IDENTITY grain, in order - every sighting of every identity
+    '''
+    def identities(self):
+        identity_code = Inventory.GRAIN_CODES[GrainType.IDENTITY]
+        for index, type_code in enumerate(self._type):
+            if type_code == identity_code:
+                yield (
+                    self._substances[self._substance[index]],
+                    self.lineages.title(self._lineage[index]),
+                    (self._line[index], self._column[index]),
+                    bool(self._heir[index])
+                )
+
+    '''
+    MECHANISM:
+    Copies the inventory over to another batch identity: every lineage descended from one batch is re-registered as descended from the other.
+    (Lineages traced once the registrar has let go of the batch itself do not name it, so are kept just as they are.)
+    '''
+    def rebased(self, bx_id, new_bx_id):
+        renumbered = {}
+        for number in dict.fromkeys(self._lineage):
+            title = self.lineages.title(number)
+            if title == bx_id or (bx_id and title.startswith(bx_id + '.')):
+                title = new_bx_id + title[len(bx_id):]
+            renumbered[number] = self.lineages.register(title)
+
+        inventory = Inventory(self.lineages)
+        inventory._lineage = array('I', (renumbered[number] for number in self._lineage))
+        inventory._type = array('B', self._type)
+        inventory._line = array('I', self._line)
+        inventory._column = array('I', self._column)
+        inventory._substance = array('I', self._substance)
+        inventory._progenitor = array('B', self._progenitor)
+        inventory._heir = array('B', self._heir)
+        inventory._substances = list(self._substances)
+        inventory._substance_numbers = dict(self._substance_numbers)
+        return inventory
+
+    def _grain(self, index):
+        return Grain(
+            self.lineages.title(self._lineage[index]),
+            Inventory.GRAIN_TYPES[self._type[index]],
+            self._substances[self._substance[index]],
+            (self._line[index], self._column[index]),
+            bool(self._progenitor[index]),
+            bool(self._heir[index])
+        )
+
+    def __len__(self):
+        return len(self._lineage)
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return [self._grain(i) for i in range(*index.indices(len(self)))]
+        if index < 0:
+            index += len(self)
+        if not 0 <= index < len(self):
+            raise IndexError('inventory index out of range')
+        return self._grain(index)
+
+    def __iter__(self):
+        for index in range(len(self)):
+            yield self._grain(index)
+
+
 '''
 AFFORDANCE:
 Casts the symbolic LEXICON of the base CODEX into grain parlance, allowing us to identify how we refine the particles
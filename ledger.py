@@ -0,0 +1,231 @@
+# CONTINUUM: to time the run, its throughput, and how often the progress line is redrawn
+import time
+# CONTINUUM: the progress line is drawn on stderr, leaving stdout to the tale itself
+import sys
+# CONTINUUM: for the machine-readable (JSON) form of the ledger
+import json
+
+'''
+THROUGHLINE:
+Narrating a big tree is a long walk, and until now the only sign of progress was the chatter of every script's header (twice over) and every lexeme's summary - on a big tree, that chatter was itself a real share of the run time, and told us nothing we could use.
+
+The LEDGER keeps the accounts of a run instead: how many scripts were found, narrated, skipped (nothing to granulate) or in error; how many tokens and grains passed through the granulator; and how many lexemes of each ExpoTags category were extracted.
+
+It can also keep quiet: rather than the chatter, a single live progress line (scripts done of the total, scripts per second, and the time remaining).
+
+At the end of the run the accounts are written out for machines to read - both as JSON and in the Prometheus text exposition format.
+'''
+
+'''
+FIGURATION:
+Keeps the accounts of a narration run, and reports its progress.
+'''
+class LEDGER:
+    # KNOWLEDGE: Redraw the progress line no more often than this (seconds)
+    REDRAW_INTERVAL = 0.1
+
+    # KNOWLEDGE: The namespace of every Prometheus metric we write
+    PROMETHEUS_PREFIX = 'code_as_story'
+
+    def __init__(self, quiet=False):
+        # DISPOSITION: are we keeping quiet (progress line only), or chattering about every script
+        self.quiet = quiet
+
+        # KNOWLEDGE: The accounts themselves
+        self.scripts_total = 0
+        self.scripts_done = 0
+        self.scripts_narrated = 0
+        self.scripts_skipped = 0
+        self.errors = 0
+        self.tokens = 0
+        self.grains = 0
+        self.lexemes = {}
+
+        # KNOWLEDGE: The scripts in error, and what went wrong with each
+        self.failures = []
+
+        # KNOWLEDGE: How long the stores took to save, and each store's size and time to load back in full
+        self.save_seconds = 0.0
+        self.stores = []
+
+        self._started = time.monotonic()
+        self._finished = None
+        self._last_drawn = 0.0
+
+    '''
+    MECHANISM:
+    Opens the accounts, knowing how many scripts there are to narrate
+    '''
+    def begin(self, scripts_total):
+        self.scripts_total = scripts_total
+        self._started = time.monotonic()
+        self._draw_progress(force=True)
+
+    '''
+    MECHANISM:
+    Announces a script about to be narrated (unless keeping quiet)
+    '''
+    def herald(self, full_path):
+        if not self.quiet:
+            print(f"=== Narrate {full_path}:")
+
+    '''
+    MECHANISM:
+    Enters a narrated script into the accounts
+    '''
+    def narrated(self, tokens, grains, expositions):
+        self.scripts_narrated += 1
+        self.tokens += tokens
+        self.grains += grains
+        for lexeme in expositions.values():
+            category = lexeme.category.name
+            self.lexemes[category] = self.lexemes.get(category, 0) + 1
+        self._done()
+
+    '''
+    MECHANISM:
+    Enters a script that had nothing to granulate into the accounts
+    '''
+    def skipped(self, full_path):
+        self.scripts_skipped += 1
+        self._done()
+
+    '''
+    MECHANISM:
+    Enters a script that could not be narrated into the accounts, with the kind of failure it was (an error, or - when quarantined - a timeout, running out of memory, or a crash).
+    The error may be the exception itself, or as already told.
+    '''
+    def failed(self, full_path, error, kind='error'):
+        self.errors += 1
+        told = error if isinstance(error, str) else f"{type(error).__name__}: {error}"
+        self.failures.append({'script': str(full_path), 'error': told, 'kind': kind})
+        self._done()
+
+    '''
+    MECHANISM:
+    Enters a saved store into the accounts: its size, and (if it was timed) how long it takes to load back in full
+    '''
+    def stored(self, path, size, load_seconds=None):
+        self.stores.append({'store': str(path), 'bytes': size, 'load_seconds': round(load_seconds, 6) if load_seconds is not None else None})
+
+    def _done(self):
+        self.scripts_done += 1
+        self._draw_progress()
+
+    '''
+    MECHANISM:
+    Closes the accounts, finishing off the progress line
+    '''
+    def conclude(self):
+        self._finished = time.monotonic()
+        self._draw_progress(force=True)
+        if self.quiet:
+            sys.stderr.write('\n')
+            sys.stderr.flush()
+
+    '''
+    SKILL:
+    The run's elapsed time and throughput so far
+    '''
+    @property
+    def elapsed(self):
+        return (self._finished or time.monotonic()) - self._started
+
+    @property
+    def throughput(self):
+        return self.scripts_done / self.elapsed if self.elapsed > 0 else 0.0
+
+    '''
+    MECHANISM:
+    Redraws the live progress line (only when keeping quiet, and not too often)
+    '''
+    def _draw_progress(self, force=False):
+        if not self.quiet:
+            return
+        now = time.monotonic()
+        if not force and now - self._last_drawn < LEDGER.REDRAW_INTERVAL:
+            return
+        self._last_drawn = now
+
+        remaining = max(0, self.scripts_total - self.scripts_done)
+        rate = self.throughput
+        eta = remaining / rate if rate > 0 else 0
+        minutes, seconds = divmod(int(eta), 60)
+        hours, minutes = divmod(minutes, 60)
+        width = len(str(self.scripts_total))
+        sys.stderr.write(
+            f"\r[{self.scripts_done:>{width}}/{self.scripts_total}] {rate:7.1f} scripts/s"
+            f"  ETA {hours:02d}:{minutes:02d}:{seconds:02d}  errors {self.errors}"
+        )
+        sys.stderr.flush()
+
+    '''
+    MECHANISM:
+    The accounts as plain data
+    '''
+    def as_dict(self):
+        return {
+            'scripts': {
+                'found': self.scripts_total,
+                'narrated': self.scripts_narrated,
+                'skipped': self.scripts_skipped,
+                'errors': self.errors,
+            },
+            'tokens': self.tokens,
+            'grains': self.grains,
+            'lexemes': dict(sorted(self.lexemes.items())),
+            'elapsed_seconds': round(self.elapsed, 6),
+            'scripts_per_second': round(self.throughput, 3),
+            'save_seconds': round(self.save_seconds, 6),
+            'stores': self.stores,
+            'failures': self.failures,
+        }
+
+    '''
+    MECHANISM:
+    The accounts in the Prometheus text exposition format
+    '''
+    def as_prometheus(self):
+        prefix = LEDGER.PROMETHEUS_PREFIX
+        lines = []
+
+        def metric(name, kind, description, samples):
+            lines.append(f"# HELP {prefix}_{name} {description}")
+            lines.append(f"# TYPE {prefix}_{name} {kind}")
+            for labels, value in samples:
+                lines.append(f"{prefix}_{name}{labels} {value}")
+
+        metric('scripts_found_total', 'counter', 'Python scripts found to narrate.', [('', self.scripts_total)])
+        metric('scripts_narrated_total', 'counter', 'Python scripts narrated.', [('', self.scripts_narrated)])
+        metric('scripts_skipped_total', 'counter', 'Python scripts with nothing to granulate.', [('', self.scripts_skipped)])
+        metric('errors_total', 'counter', 'Python scripts that could not be narrated.', [('', self.errors)])
+        metric('tokens_total', 'counter', 'Tokens powdered by the granulator.', [('', self.tokens)])
+        metric('grains_total', 'counter', 'Grains refined by the granulator.', [('', self.grains)])
+        metric('lexemes_total', 'counter', 'Lexemes extracted, by ExpoTags category.',
+               [(f'{{category="{category}"}}', count) for category, count in sorted(self.lexemes.items())])
+        metric('elapsed_seconds', 'gauge', 'Wall time of the run.', [('', f"{self.elapsed:.6f}")])
+        metric('scripts_per_second', 'gauge', 'Throughput of the run.', [('', f"{self.throughput:.3f}")])
+        metric('save_seconds', 'gauge', 'Time taken to save the stores.', [('', f"{self.save_seconds:.6f}")])
+        metric('store_bytes', 'gauge', 'Size of each store saved.',
+               [(f'{{store="{LEDGER.label(store["store"])}"}}', store['bytes']) for store in self.stores])
+        metric('store_load_seconds', 'gauge', 'Time taken to load each saved store back in full.',
+               [(f'{{store="{LEDGER.label(store["store"])}"}}', f"{store['load_seconds']:.6f}") for store in self.stores if store['load_seconds'] is not None])
+        return '\n'.join(lines) + '\n'
+
+    '''
+    MECHANISM:
+    A label value, escaped as the Prometheus text format requires (backslashes, double quotes and line feeds) - a Windows path, say
+    '''
+    @staticmethod
+    def label(value):
+        return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+    '''
+    BEHAVIOUR:
+    Writes the accounts out, as JSON and in the Prometheus text format
+    '''
+    def save(self, json_path, prometheus_path):
+        with open(json_path, 'w', encoding='utf-8') as f:
+            json.dump(self.as_dict(), f, indent=2)
+        with open(prometheus_path, 'w', encoding='utf-8') as f:
+            f.write(self.as_prometheus())
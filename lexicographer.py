@@ -4,10 +4,19 @@ import re
 
 # CONTINUUM: allows us to detect if we are creating or updating the index TXT file
 import os
+# CONTINUUM: shared stores are updated under a lock and swapped in whole
+import tempfile
+import shutil
+from contextlib import contextmanager
+# CONTINUUM: to find the modules a key may belong to, from its dotted prefixes
+from itertools import accumulate
 
 from granulator import GrainType as LexicalCategory
+from granulator import GRANULATOR
 
-from lexicographics import LEXICOGRAPHICS, LexicalOccurence, Lexeme, ExpoTags
+from lexicographics import LEXICOGRAPHICS, LexicalOccurence, Lexeme, ExpoTags, MANUSCRIPTS, span_of, line_starts_of
+from compendium import COMPENDIUM
+from chronicle import CHRONICLE
 
 '''
 THROUGHLINE:
@@ -36,10 +45,21 @@ Sifts through a given set of 'entries' to generate:
     - the linguistical set of those things that have meaning
 '''
 class LEXICOGRAPHER(LEXICOGRAPHICS):
+    # KNOWLEDGE: The field, added to each record of a merged store, naming the module (the identity of the script) it was extracted from
+    MODULE = 'module'
+
+    # KNOWLEDGE: The lock files this process already holds, so a store locked for a whole save (and whatever must happen alongside) can be locked again within it
+    _held = set()
+
     def __init__(self):
         self.lexemes = {}
         self._latest_lexeme = None
 
+        # the script whose lexemes' content is deferred (if any), its raw bytes and where each of its lines starts
+        self._script = None
+        self._raw = None
+        self._line_starts = None
+
         # a package into which we build-up texts to be merged.
         self.package_semantic = []
         self.package_lexical = None
@@ -48,22 +68,207 @@ class LEXICOGRAPHER(LEXICOGRAPHICS):
     '''
     BEHAVIOUR:
     Creates a json file containing the full linguistic set and a text file listing the canonicals
+    The json file is compressed if its name asks for it (expo.json.gz, or expo.json.xz)
+    Optionally also binds the linguistic set into a memory-mappable COMPENDIUM
+    Should the modules (scripts) scanned be given, the stores are merged into rather than rewritten (see save_records)
+    Distinct keys may be written alike, so only the last collated (see collate) of those written alike is stored - just as a CISTERN's latest batch wins - though every one of them is still indexed (as is every lexeme collate gave as shadowed).
+    The lexemes are written in key order, as a drained CISTERN's are, and each is only transcribed as it is written.
     '''
-    def save_to_file(lexemes, dictout, indexout):
-        serializable = {
-            str(key): {
-                'category': value.category.name,
-                'canonical': str(value.canonical),
-                'content': re.sub(r'\r\n', '\n\n', value.content),
-                'reference': str(value.reference)
-            }
-            for key, value in lexemes.items()
-        }
-        with open(dictout, 'w', encoding='utf-8') as f:
-            json.dump(serializable, f, indent=2)
+    def save_to_file(lexemes, dictout, indexout, storeout=None, modules=None, shadowed=None):
+        written = {}
+        shadowed = set(shadowed or ())
+        for key, lexeme in lexemes.items():
+            name = str(key)
+            if name in written:
+                shadowed.add(f"{name}:{written[name].category.name}")
+            written[name] = lexeme
+        records = ((name, LEXICOGRAPHER.transcribe(written[name])) for name in sorted(written))
+        LEXICOGRAPHER.save_records(records, dictout, indexout, storeout, modules, shadowed)
+
+    '''
+    BEHAVIOUR:
+    Collates one script's lexemes into the full linguistic set, as a CISTERN would: a lexeme collated again is moved to the end, so the set always runs in the order the lexemes were last collated.
+    Should a set be given, the index entry of every lexeme replaced is noted in it (a CISTERN indexes every lexeme poured in, even one that loses out).
+    '''
+    @staticmethod
+    def collate(collated, expositions, shadowed=None):
+        for key in expositions.keys() & collated.keys():
+            if shadowed is not None:
+                shadowed.add(f"{key}:{collated[key].category.name}")
+            del collated[key]
+        collated.update(expositions)
+
+    '''
+    BEHAVIOUR:
+    As save_to_file, but from a stream of already transcribed (key, record) pairs.
+    Each record is written out as it arrives, so the full linguistic set never needs to be held in memory at once.
+    Any further index entries given (e.g. of lexemes shadowed by another written alike) are only read once the stream has run dry, so they may be gathered as it flows.
+
+    The stores may be shared by several runs at once (e.g. CI jobs each scanning their own subtree), so they are only ever updated under a lock, and each is written aside then swapped in whole - a reader never sees half a store.
+    Should the modules (scripts) scanned be given, the existing store is merged into: only the lexemes of those modules are replaced, and every other lexeme is kept.
+    (So that a lexeme can be told apart by its module, each record merged in ought to name it - see MODULE.)
+    '''
+    @staticmethod
+    def save_records(records, dictout, indexout, storeout=None, modules=None, entries=None):
+        with LEXICOGRAPHER.locked(dictout):
+            if modules is not None:
+                records = LEXICOGRAPHER._merged(records, dictout, modules)
+
+            indexed = set()
+            with LEXICOGRAPHER._aside(dictout) as dict_aside, LEXICOGRAPHER._aside(storeout) as store_aside:
+                with COMPENDIUM.scroll(dict_aside, 'w') as f:
+                    scribed = LEXICOGRAPHER._scribe_json(records, f, indexed)
+                    if storeout:
+                        COMPENDIUM.bind(store_aside, scribed)
+                    else:
+                        for _ in scribed:
+                            pass
+
+            LEXICOGRAPHER._update_index(indexed | set(entries or ()), indexout)
+
+    '''
+    MECHANISM:
+    Holds the lock of a shared store for as long as the store is being updated, waiting for any other holder to let go first.
+    The lock is a file named for the store's base (e.g. `expo.lock`, whether the store is `expo.json` or `expo.json.gz`), so every writer of the base takes the same lock; it is left in place after, as removing it could let two writers each lock a different file.
+    A lock this process already holds is simply held on (taking it again would wait on ourselves).
+    '''
+    @staticmethod
+    @contextmanager
+    def locked(path):
+        lock_path = LEXICOGRAPHER.lock_of(path)
+        if lock_path in LEXICOGRAPHER._held:
+            yield
+            return
+
+        # (the lock is fcntl's where there is one, msvcrt's on Windows - each imported only here, since a block at the top of a script loses the registrar its module's lineage)
+        with open(lock_path, 'a+b') as lock:
+            if os.name != 'nt':
+                import fcntl
+                fcntl.flock(lock.fileno(), fcntl.LOCK_EX)
+            else:
+                import msvcrt
+                # (msvcrt gives up after ten tries, so we keep trying)
+                lock.seek(0)
+                while True:
+                    try:
+                        msvcrt.locking(lock.fileno(), msvcrt.LK_LOCK, 1)
+                        break
+                    except OSError:
+                        pass
+            LEXICOGRAPHER._held.add(lock_path)
+            try:
+                yield
+            finally:
+                LEXICOGRAPHER._held.discard(lock_path)
+                if os.name != 'nt':
+                    fcntl.flock(lock.fileno(), fcntl.LOCK_UN)
+                else:
+                    lock.seek(0)
+                    msvcrt.locking(lock.fileno(), msvcrt.LK_UNLCK, 1)
+
+    '''
+    MECHANISM:
+    The lock file of a store: its base, with a `.lock` extension
+    '''
+    @staticmethod
+    def lock_of(path):
+        return f"{LEXICOGRAPHER.base_of(path)}.lock"
+
+    '''
+    MECHANISM:
+    The base of a store: its path without the `.json` extension, compressed or not (e.g. `expo`, for `expo.json.gz`)
+    '''
+    @staticmethod
+    def base_of(path):
+        path = str(path)
+        for suffix in [f".json{suffix}" for suffix, _ in COMPENDIUM.COMPRESSIONS.values()] + ['.json']:
+            if path.endswith(suffix):
+                return path[:-len(suffix)]
+        return path
 
-        entries = {f"{str(key)}:{value.category.name}" for key, value in lexemes.items()}
+    '''
+    MECHANISM:
+    Gives a path beside the given one (keeping its name, and so its extension) to write into; once written, it is swapped into place whole.
+    Should the writing fail, the original is left untouched. (None is given for no path.)
+    '''
+    @staticmethod
+    @contextmanager
+    def _aside(path):
+        if not path:
+            yield None
+            return
+        directory, name = os.path.split(os.path.abspath(path))
+        descriptor, aside = tempfile.mkstemp(dir=directory, prefix='.', suffix=f".{name}")
+        os.close(descriptor)
+        # (a temporary file is private to its writer, but the store it becomes keeps the permissions a store would have)
+        if os.path.exists(path):
+            shutil.copymode(path, aside)
+        else:
+            umask = os.umask(0)
+            os.umask(umask)
+            os.chmod(aside, 0o666 & ~umask)
+        try:
+            yield aside
+        except BaseException:
+            os.remove(aside)
+            raise
+        os.replace(aside, path)
 
+    '''
+    MECHANISM:
+    Merges fresh records into a store: the fresh records pass first, then every record already stored that neither belongs to a module scanned nor was given afresh.
+    The store merged into is whichever full store was written last under the base, however compressed (a chronicle only ever holds one run's lexemes, so is passed over).
+    (A lexeme belongs to the module its record names; a record stored before modules were named belongs to a module when its key is the module's identity, or is dotted beneath it)
+    '''
+    @staticmethod
+    def _merged(records, dictout, modules):
+        written = set()
+        for key, record in records:
+            written.add(key)
+            yield key, record
+
+        base = LEXICOGRAPHER.base_of(dictout)
+        stored = COMPENDIUM.latest(base, passing_over=[f"{base}{CHRONICLE.EXTENSION}"])
+        if stored is None:
+            return
+        identities = {GRANULATOR.identity_of(str(module)) for module in modules}
+        store = COMPENDIUM.consult(stored)
+        try:
+            for key, record in (store.folios() if hasattr(store, 'folios') else store.items()):
+                if key in written:
+                    continue
+                module = record.get(LEXICOGRAPHER.MODULE)
+                if module is not None and module in identities:
+                    continue
+                if module is None and any(prefix in identities for prefix in accumulate(key.split('.'), lambda a, b: f"{a}.{b}")):
+                    continue
+                yield key, record
+        finally:
+            if hasattr(store, 'close'):
+                store.close()
+
+    '''
+    MECHANISM:
+    Writes each record into an open json file as it passes through, laid out exactly as `json.dump(..., indent=2)` would lay out the whole dictionary.
+    Notes the index entry of every record on the way.
+    '''
+    @staticmethod
+    def _scribe_json(records, f, entries):
+        separator = '{\n'
+        for key, record in records:
+            body = json.dumps(record, indent=2).replace('\n', '\n  ')
+            f.write(f"{separator}  {json.dumps(key)}: {body}")
+            separator = ',\n'
+            entries.add(f"{key}:{record['category']}")
+            yield key, record
+        f.write('{}' if separator == '{\n' else '\n}')
+
+    '''
+    MECHANISM:
+    Appends any new entries to the index, creating it if need be - existing entries (and any editorialisation around them) are left untouched
+    '''
+    @staticmethod
+    def _update_index(entries, indexout):
         update_mode = 'w'
         if os.path.exists(indexout):
             update_mode = 'a'
@@ -78,6 +283,19 @@ class LEXICOGRAPHER(LEXICOGRAPHICS):
                 for entry in sorted(entries):
                     f.write(entry + '\n')
 
+    '''
+    MECHANISM:
+    Transcribes a lexeme into the plain record that the lexeme stores hold
+    '''
+    @staticmethod
+    def transcribe(lexeme):
+        return {
+            'category': lexeme.category.name,
+            'canonical': str(lexeme.canonical),
+            'content': re.sub(r'\r\n', '\n\n', lexeme.content),
+            'reference': str(lexeme.reference)
+        }
+
     '''
     BEHAVIOUR:
     returns a list of lexeme summaries from a linguistical set
@@ -164,32 +382,51 @@ class LEXICOGRAPHER(LEXICOGRAPHICS):
     BEHAVIOUR:
     Sifts through the entries for TEXTs to generate the semantics which are combined to lexicals to ppprovide our lexemes
     '''
-    def extract(self, entries):
+    def extract(self, entries, script=None):
         texts = []
 
         if not entries:
             return {}, {}
 
+        # Should the script on disk be named, the content of each lexeme is deferred: just the span of its text in the script is held, to be read back when wanted
+        self._script = script
+        self._raw = MANUSCRIPTS.raw(script) if script else None
+        self._line_starts = line_starts_of(self._raw) if script else None
+
         # PROSE: On the extraction of meaning...
+        # Every entry has some kind of meaning, for meaning is a layered construct - but at this point we only care about each TEXT's semantic content and the next IDENTITY's lexical value
+        for this_entry, next_entry in LEXICOGRAPHER._texts_with_successors(entries):
+            unpacked_text_entry = LEXICOGRAPHICS.unpack_text_entry(this_entry, next_entry)
+            if unpacked_text_entry is not None:
+                texts.append((*unpacked_text_entry, this_entry['semantic']))
+
+        # clean-up the extracted semantics...
+        lexemes = self._package_prose(texts)
+
+        # (the raw script is let go of, once every span has been found in it)
+        self._raw = self._line_starts = None
+        return lexemes
+
+    '''
+    MECHANISM:
+    Gives the meaning of every TEXT entry alongside the meaning of the entry that follows it (since, when the meaning relates to one of our lexemes, we're gonna need to find the following lexical - probably).
+    An Inventory can answer this straight from its columns; any other list of entries is asked entry by entry.
+    '''
+    @staticmethod
+    def _texts_with_successors(entries):
+        if hasattr(entries, 'texts_with_successors'):
+            yield from entries.texts_with_successors()
+            return
+
         for i, entry in enumerate(entries):
-            # Every entry has some kind of meaning, for meaning is a layered construct
             this_entry = entry.semantics()
+            if this_entry['category'] != LexicalCategory.TEXT.name:
+                continue
 
-            # when the meaning relates to one of our lexemes, we're gonna need to find the following lexical (probably)
             next_entry = None
             if i < len(entries) - 1:
                 next_entry = entries[i + 1].semantics()
-
-            # At this point we only care about this TEXT's semantic content and the next IDENTITY's lexical value
-            if this_entry['category'] == LexicalCategory.TEXT.name:
-                unpacked_text_entry = LEXICOGRAPHICS.unpack_text_entry(this_entry, next_entry)
-                if unpacked_text_entry is not None:
-                    texts.append(unpacked_text_entry)
-
-        # clean-up the extracted semantics...
-        lexemes = self._package_prose(texts)
-
-        return lexemes
+            yield this_entry, next_entry
 
     '''
     BEHAVIOUR:
@@ -212,7 +449,7 @@ class LEXICOGRAPHER(LEXICOGRAPHICS):
 
         # Now looking at each text, we initially have no impetus to merge them together...
         merging = False
-        for lexical, semantic, reference in texts:
+        for lexical, semantic, reference, text in texts:
             # We will start merging if this is an in-line comment that introduces PROSE
             merging = LEXICOGRAPHICS.is_prose_transition(merging, semantic)
 
@@ -221,7 +458,7 @@ class LEXICOGRAPHER(LEXICOGRAPHICS):
                 self._update_semantic_package(lexical, semantic, reference)
 
             else:
-                self._update_survivors(lexical, semantic, reference)
+                self._update_survivors(lexical, semantic, reference, text)
 
         # AND... a final flush if prose block reaches EOF
         if self.package_semantic:
@@ -241,7 +478,7 @@ class LEXICOGRAPHER(LEXICOGRAPHICS):
     Adds any package of semantics we have been collating to the latest survivor before adding this survivor also
     unless this survivor is just  some itinerant programmer's comment (outside of a prose block)
     '''
-    def _update_survivors(self, lexical, semantic, reference):
+    def _update_survivors(self, lexical, semantic, reference, text=None):
 
         if self.package_semantic:
             self._latest_lexeme = LEXICOGRAPHICS.extend_content(
@@ -255,7 +492,19 @@ class LEXICOGRAPHER(LEXICOGRAPHICS):
 
         if not semantic.startswith('#'):
             self._latest_lexeme = lexical
-            self.lexemes[lexical] = Lexeme.from_parts(lexical, semantic, reference)
+            self.lexemes[lexical] = self._lexeme(lexical, semantic, reference, text)
+
+    '''
+    MECHANISM:
+    Creates a survivor's lexeme - deferring its content to the span of its text in the script, where the script is on disk and the text is found just so
+    '''
+    def _lexeme(self, lexical, semantic, reference, text):
+        span = None
+        if self._raw is not None and text is not None:
+            span = span_of(self._script, self._raw, self._line_starts, text, reference)
+        if span is None:
+            return Lexeme.from_parts(lexical, semantic, reference)
+        return Lexeme.from_span(lexical, semantic, reference, span)
 
     '''
     MECHANISM:
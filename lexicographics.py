@@ -2,12 +2,19 @@
 from dataclasses import dataclass
 from dataclasses import field
 from typing import List, Tuple
+# CONTINUUM: remembers the texts already cleaned and dedented, since boilerplate recurs across a code base
+from functools import lru_cache
+# CONTINUUM: the scripts deferred texts are read back from, least recently read first
+from collections import OrderedDict
 
 # CONTINUUM: allows us to create the ExpoTags (Enum) list
 from enum import Enum
 
 from granulator import GrainType as LexicalCategory
 
+# KNOWLEDGE: How many distinct texts are remembered (once cleaned, or categorised and dedented) before the least recently met are forgotten
+TEXTS_REMEMBERED = 4096
+
 # KNOWLEDGE: The types of semantic meaning we can use to adorn our code-base.
 class ExpoTags(Enum):
     # PROSE:
@@ -79,6 +86,7 @@ class LEXICOGRAPHICS:
     Also removes commentary markers from in-line semantics (except PROSE which is cleaned up later)
     '''
     @staticmethod
+    @lru_cache(maxsize=TEXTS_REMEMBERED)
     def _nonjudgemental_clean(text):
         unclean = text
 
@@ -221,11 +229,31 @@ class Lexeme:
     '''
     @classmethod
     def from_parts(cls, lexical: LexicalOccurence, semantic: str, reference: str) -> 'Lexeme':
-        head, _, tail = semantic.partition(':')
-        category = ExpoTags.from_string(head.strip())
-        content = cls._dedent(tail.strip())
+        category, content = cls._categorise(semantic)
         return cls(category, lexical, content, reference)
 
+    '''
+    MECHANISM:
+    Creates a lexeme whose content is deferred: only the span of its text in the script is held, and the content is read back (and cleaned and dedented) whenever it is wanted
+    '''
+    @staticmethod
+    def from_span(lexical: LexicalOccurence, semantic: str, reference: str, span: 'Span') -> 'Lexeme':
+        # (just the category is taken now - the content is not split off, lest it be remembered)
+        category = ExpoTags.from_string(semantic.partition(':')[0].strip())
+        lexeme = DeferredLexeme(category, lexical, None, reference)
+        lexeme._content = span
+        return lexeme
+
+    '''
+    SKILL:
+    Splits a semantic text into its category and (dedented) content; an identical text (e.g. boilerplate) is only ever split once
+    '''
+    @staticmethod
+    @lru_cache(maxsize=TEXTS_REMEMBERED)
+    def _categorise(semantic):
+        head, _, tail = semantic.partition(':')
+        return ExpoTags.from_string(head.strip()), Lexeme._dedent(tail.strip())
+
 
     '''
     SKILL:
@@ -277,3 +305,121 @@ class Lexeme:
 
     def __str__(self):
         return f"[{self.reference}]{self.cataegory.name}: {str(self.canonical)}; '{self.content}'"
+
+
+# KNOWLEDGE: Where a text lies in its script, as byte offsets - so the text need not be held, only read back when wanted
+@dataclass(frozen=True)
+class Span:
+    __slots__ = ('script', 'start', 'end')
+    script: str
+    start: int
+    end: int
+
+    def read(self):
+        return MANUSCRIPTS.passage(self.script, self.start, self.end)
+
+    # (a frozen dataclass with slots cannot be unpickled field by field, so a span is rebuilt whole - e.g. when sent back from a quarantined cell)
+    def __reduce__(self):
+        return Span, (self.script, self.start, self.end)
+
+
+'''
+FIGURATION:
+The scripts that deferred texts are read back from: each is kept open (just the most recently read), so a span costs a seek and a read.
+'''
+class MANUSCRIPTS:
+    # KNOWLEDGE: How many scripts are kept open at once
+    KEPT_OPEN = 64
+
+    # KNOWLEDGE: The scripts open, least recently read first
+    _open = OrderedDict()
+
+    '''
+    MECHANISM:
+    The open script, opening it (and closing the least recently read, should too many be open) if need be
+    '''
+    @staticmethod
+    def _opened(script):
+        manuscript = MANUSCRIPTS._open.pop(script, None)
+        if manuscript is None:
+            manuscript = open(script, 'rb')
+            while len(MANUSCRIPTS._open) >= MANUSCRIPTS.KEPT_OPEN:
+                MANUSCRIPTS._open.popitem(last=False)[1].close()
+        MANUSCRIPTS._open[script] = manuscript
+        return manuscript
+
+    '''
+    BEHAVIOUR:
+    Reads the text between two byte offsets of a script
+    '''
+    @staticmethod
+    def passage(script, start, end):
+        manuscript = MANUSCRIPTS._opened(script)
+        manuscript.seek(start)
+        return manuscript.read(end - start).decode('utf-8')
+
+    '''
+    BEHAVIOUR:
+    Gives the raw bytes of a script, for the spans of its texts to be found in
+    '''
+    @staticmethod
+    def raw(script):
+        manuscript = MANUSCRIPTS._opened(script)
+        manuscript.seek(0)
+        return manuscript.read()
+
+    '''
+    BEHAVIOUR:
+    Closes every script kept open (a span read afterwards simply opens its script again)
+    '''
+    @staticmethod
+    def release():
+        while MANUSCRIPTS._open:
+            MANUSCRIPTS._open.popitem()[1].close()
+
+
+'''
+SKILL:
+Finds the span of a text within the raw bytes of its script, from where its token starts (line, and column in characters) - None, unless the bytes found there are exactly the text (e.g. a script in some other encoding than utf-8 is never deferred)
+'''
+def span_of(script, raw, line_starts, text, location):
+    line, column = location
+    if not 0 < line <= len(line_starts):
+        return None
+    line_start = line_starts[line - 1]
+    line_end = line_starts[line] if line < len(line_starts) else len(raw)
+    try:
+        start = line_start + len(raw[line_start:line_end].decode('utf-8')[:column].encode('utf-8'))
+        encoded = text.encode('utf-8')
+    except UnicodeError:
+        return None
+    if raw[start:start + len(encoded)] != encoded:
+        return None
+    return Span(script, start, start + len(encoded))
+
+
+'''
+SKILL:
+The byte offset at which each line of a script's raw bytes starts (the first line starts after any byte order mark, just as the tokeniser reads it)
+'''
+def line_starts_of(raw):
+    starts = [3 if raw.startswith(b'\xef\xbb\xbf') else 0]
+    position = raw.find(b'\n')
+    while position >= 0:
+        starts.append(position + 1)
+        position = raw.find(b'\n', position + 1)
+    return starts
+
+
+# KNOWLEDGE: A lexeme whose content is deferred: only the span of its text is held (in place of the content), and the content is cleaned and dedented from it afresh whenever it is read.
+# (Should the content be set - e.g. extended with PROSE - it is held from then on, just as any other lexeme's.)
+class DeferredLexeme(Lexeme):
+    @property
+    def content(self):
+        if not isinstance(self._content, Span):
+            return self._content
+        return Lexeme._categorise(LEXICOGRAPHICS._nonjudgemental_clean(self._content.read()))[1]
+
+    @content.setter
+    def content(self, content):
+        self._content = content
@@ -34,63 +34,240 @@ import sys
 import os
 # CONTINUUM: to make o/s independant path from string
 from pathlib import Path
+# CONTINUUM: to read the scene (CLI args) we are asked to narrate
+import argparse
+# CONTINUUM: to present scripts recovered from git as binary file-like bulk material
+import io
+# CONTINUUM: to time the saving of the stores
+import time
 
 '''
 THROUGHLINE:
 A lash-up script in-lieu of real workflow support.
 No metaphor here! We're just providing scafolding for the workhorse narrate scripts.
 '''
-from granulator import GRANULATOR
+from granulator import GRANULATOR, Lineages
 from lexicographer import LEXICOGRAPHER
+from lexicographics import MANUSCRIPTS
+from compendium import COMPENDIUM
+from chronicle import CHRONICLE, CHRONICLER
+from cistern import CISTERN
+from recension import RECENSION
+from scriptorium import SCRIPTORIUM
+from palimpsest import PALIMPSEST
+from ledger import LEDGER
+from concordance import CONCORDANCE
+from catalogue import CATALOGUE
+from excerpts import EXCERPTS
+from quarantine import QUARANTINE
+# (the walk of a scan directory is the library's own - see exposition.py)
+from exposition import seek_scripts
+from quarry import QUARRY
 
 # KNOWLEDGE: An initially empty dictionary that comes to hold the full linguistic set as Python script files are processed
 all_expositions = {}
 
+'''
+MECHANISM:
+Gives (full_path, blob) for each script to narrate: from the directory walk (with no blob, since the script is read from disk), or else as recovered from a git revision
+Either way, only the scripts the quarry admits are given.
+'''
+def seek_specimens(root, palimpsest=None, quarry=None):
+    if palimpsest is None:
+        for full_path in seek_scripts(root, quarry):
+            yield full_path, None
+    else:
+        quarry = quarry or QUARRY()
+        for full_path, blob in palimpsest.scripts():
+            if quarry.admits(Path(os.path.relpath(full_path, root)).as_posix()):
+                yield full_path, blob
+
+'''
+BEHAVIOUR:
+Granulates a single script so the lexicographer can extract its expositions; None if there was nothing to granulate
+The script is read from disk, unless its content (bulk) is already in hand. Its outcome is entered into the ledger.
+A huge script may be granulated by several workers at once, and its every identity sighting noted in a concordance.
+The content of its lexemes may be deferred (if the script is read from disk): only the span of each text in the script is held, to be read back when wanted.
+'''
+def narrate_script(full_path, lexicographer, bulk=None, lineages=None, ledger=None, workers=None, concordance=None, defer=False):
+    ledger = ledger if ledger is not None else LEDGER()
+    ledger.herald(full_path)
+
+    with (open(full_path, 'rb') if bulk is None else io.BytesIO(bulk)) as f:
+        # We create a GRANULATOR instance for each file, but once we have the granulate we don't need it anymore - so these are just transient objects.
+        granulator = GRANULATOR(f, full_path, lineages, workers)
+        try:
+            granulated = granulator.granulate()
+        except Exception as e:
+            ledger.failed(full_path, e)
+            raise
+        if not granulated:
+            ledger.skipped(full_path)
+            return None
+
+    if concordance is not None:
+        concordance.note(full_path, granulated)
+
+    # Once we have the granulate we employ the lexicographer to extract a dictionary of lexemes for this file
+    expositions = lexicographer.extract(granulated, full_path if defer and bulk is None else None)
+    ledger.narrated(granulator.particles, len(granulated), expositions)
+    return expositions
+
 '''
 BEHAVIOUR:
 Seeks out files of interest that are then granulated so that expositions can be extracted into the full linguistic set.
 '''
-def scan_files(root, dictout, indexout):
+def scan_files(root, dictout, indexout, storeout=None, spill_threshold=None, palimpsest=None, ledger=None, workers=None, concordanceout=None, catalogueout=None, quarry=None, chronicleout=None, merge=False, changesout=None, defer=False, excerptsout=None, quarantine=None, timed=False):
     # PROSE:
     # During extraction the lexicographer is stateful, so we create an instance for it - BUT once we have the expositions for a given script we no longer need that state (since expositions are collated here) so we re-use the instance for each script.
     lexicographer = LEXICOGRAPHER()
+    # Likewise, the lineages met are registered just once for the whole run
+    lineages = Lineages()
+    # And the accounts of the run are kept in a ledger (which also decides whether we chatter, or keep quiet)
+    ledger = ledger if ledger is not None else LEDGER()
+    # And, if asked for, every identity sighting is kept in a concordance
+    concordance = CONCORDANCE() if concordanceout else None
+    # And the words of every lexeme's content catalogued, module by module
+    catalogue = CATALOGUE() if catalogueout else None
+    # And where every class and def begins and ends noted, so the narration can excerpt their source
+    excerpts = EXCERPTS() if excerptsout else None
+    # And each script's lexemes chronicled as soon as they are extracted, so readers need not wait for the end of the run
+    chronicler = CHRONICLER(chronicleout) if chronicleout else None
 
-    footer = '=' * 80
-    # We walk sub-directories, excluding those that start with underscore which are probs holding areas for regressions etc...
-    for dirpath, dirnames, filenames in os.walk(root):
-        dirnames[:] = [d for d in dirnames if not d.startswith('_')]
+    # In bounded-memory mode the expositions are collated into a CISTERN, which spills to disk rather than growing with the tree
+    # (as they are when merging into a shared store, since each record must then name its module - see LEXICOGRAPHER.save_records)
+    collated = all_expositions
+    if spill_threshold or merge:
+        collated = CISTERN(spill_threshold or sys.maxsize)
+    # (the index entries of lexemes replaced by a later script's, which are indexed all the same)
+    shadowed = set()
 
-        # We scan for Python scripts that do not start with underscore, since they're probably opaque suport files or some kind of transient
-        for file in filenames:
-            if file.startswith('_'):
+    footer = '=' * 80
+    # The walk is gathered up front (it is cheap beside the narration) so the ledger knows how far there is to go
+    specimens = list(seek_specimens(root, palimpsest, quarry))
+    # (when merging into a shared store, every script scanned - even one with nothing to tell - has its old lexemes replaced)
+    scanned = [] if merge else None
+    ledger.begin(len(specimens))
+    try:
+        for full_path, blob in specimens:
+            bulk = palimpsest.unearth(blob) if blob else None
+            # (in quarantine, each script is examined in a cell apart, and one that fails is entered in the ledger rather than ending the run)
+            if quarantine is not None:
+                expositions = quarantine.examine(full_path, ledger, bulk, concordance)
+            else:
+                expositions = narrate_script(full_path, lexicographer, bulk, lineages, ledger, workers, concordance, defer)
+            if merge:
+                scanned.append(full_path)
+            if expositions is None:
                 continue
-            if file.endswith(".py"):
-                full_path = os.path.join(dirpath, file)
-                header = f"=== Narrate {full_path}:"
-                print(header)
-
-                with open(full_path, 'rb') as f:
-                    # We create a GRANULATOR instance for each file, but once we have the granulate we don't need it anymore - so these are just transient objects.
-                    granulator = GRANULATOR(f, full_path)
-                    granulated = granulator.granulate()
-                    if not granulated:
-                        header += "- not granulated"
-                        continue
-
-                print(header)
-
-                # Once we have the granulate we employ the lexicographer to extract a dictionary of lexemes for this file...
-                expositions = lexicographer.extract(granulated)
-                # ...which we collate into our master dictionary
-                all_expositions.update(expositions)
+
+            # Each script's dictionary of lexemes is collated into our master dictionary (or cistern)
+            if collated is all_expositions:
+                LEXICOGRAPHER.collate(collated, expositions, shadowed)
+            else:
+                collated.update(expositions, module=GRANULATOR.identity_of(str(full_path)) if merge else None)
+            if catalogue is not None:
+                catalogue.update(full_path, expositions)
+            if excerpts is not None:
+                excerpts.note(full_path, root)
+            if chronicler is not None:
+                chronicler.record((key, LEXICOGRAPHER.transcribe(lexeme)) for key, lexeme in expositions.items())
+    finally:
+        ledger.conclude()
+        if chronicler is not None:
+            chronicler.close()
+        if quarantine is not None:
+            quarantine.close()
+
+    if concordance is not None:
+        concordance.save(concordanceout)
+    if catalogue is not None:
+        catalogue.save(catalogueout)
+    if excerpts is not None:
+        excerpts.save(excerptsout)
+
+    # The store is held locked from the moment the one it replaces is digested (should a change feed be wanted) until the new one is collated against it, so no other run's save can come between
+    with LEXICOGRAPHER.locked(dictout):
+        # (the store replaced is whichever was written last under the base, however compressed - but not the chronicle this very scan began)
+        previous = RECENSION.digest_of(COMPENDIUM.latest(LEXICOGRAPHER.base_of(dictout), passing_over=[chronicleout])) if changesout else None
 
         # Once all files have been processed we get the LEXICOGRAPHER to list and save the full set of extracted lexemes
-        print(f"=== ALL FOUND EXPOSITIONS:")
-        LEXICOGRAPHER.list_expositions(all_expositions)
-        print(footer)
+        if collated is not all_expositions:
+            # (a drained cistern flows straight into the outputs, so there is no full set to list)
+            if not ledger.quiet:
+                print(f"=== ALL FOUND EXPOSITIONS: merged from {len(collated.runs)} spilled runs")
+                print(footer)
+            started = time.perf_counter()
+            LEXICOGRAPHER.save_records(collated.drain(), dictout, indexout, storeout, scanned, collated.shadowed)
+        else:
+            # (when keeping quiet, the full set is only saved, not listed)
+            if not ledger.quiet:
+                print(f"=== ALL FOUND EXPOSITIONS:")
+                LEXICOGRAPHER.list_expositions(all_expositions)
+                print(footer)
+            started = time.perf_counter()
+            LEXICOGRAPHER.save_to_file(all_expositions, dictout, indexout, storeout, scanned, shadowed)
+        ledger.save_seconds = time.perf_counter() - started
+
+        if changesout:
+            tally = RECENSION().collate(previous, RECENSION.digest_of(dictout)).write_feed(changesout)
+
+    # (every deferred content has now been read back, so the scripts can be let go of)
+    MANUSCRIPTS.release()
+    account_for_stores(ledger, [dictout, chronicleout, storeout], timed)
+
+    if changesout:
+        if not ledger.quiet:
+            print(f"=== CHANGES: {', '.join(f'{count} {event}' for event, count in tally.items())} (fed to {changesout})")
+
+'''
+MECHANISM:
+Enters each saved store into the ledger - its size, and (only if asked, since it means loading the whole store back in) the time it takes to load back in full - and (unless keeping quiet) sums them up
+'''
+def account_for_stores(ledger, paths, timed=False):
+    for path in paths:
+        if path:
+            load_seconds = COMPENDIUM.time_load(path)[0] if timed else None
+            ledger.stored(path, os.path.getsize(path), load_seconds)
 
+    if not ledger.quiet:
+        print(f"=== STORES: saved in {ledger.save_seconds:.3f}s")
+        for store in ledger.stores:
+            loads = f", loads in {store['load_seconds']:.3f}s" if store['load_seconds'] is not None else ''
+            print(f"{store['store']}: {store['bytes']:,} bytes{loads}")
 
-        LEXICOGRAPHER.save_to_file(all_expositions, dictout, indexout)
+'''
+BEHAVIOUR:
+The scribe's part in a shared-out scan (the "map"): only this shard's scripts are narrated, and their lexemes are bound into a partial compendium - each noting its script's place in the full walk - for the SCRIPTORIUM to collate later.
+'''
+def map_files(root, partout, shard=None, manifest=None, spill_threshold=None, palimpsest=None, ledger=None, workers=None, quarry=None, quarantine=None):
+    lexicographer = LEXICOGRAPHER()
+    lineages = Lineages()
+    ledger = ledger if ledger is not None else LEDGER()
+    collated = CISTERN(spill_threshold or sys.maxsize)
+
+    specimens = list(seek_specimens(root, palimpsest, quarry))
+    blobs = dict(specimens)
+    allotted = list(SCRIPTORIUM.allot([full_path for full_path, _ in specimens], root, shard, manifest))
+    ledger.begin(len(allotted))
+    try:
+        for ordinal, full_path in allotted:
+            bulk = palimpsest.unearth(blobs[full_path]) if blobs[full_path] else None
+            if quarantine is not None:
+                expositions = quarantine.examine(full_path, ledger, bulk)
+            else:
+                expositions = narrate_script(full_path, lexicographer, bulk, lineages, ledger, workers)
+            if expositions is None:
+                continue
+            collated.update(expositions, ordinal)
+    finally:
+        ledger.conclude()
+        if quarantine is not None:
+            quarantine.close()
+
+    COMPENDIUM.bind(partout, collated.drain(with_ordinals=True))
+    if not ledger.quiet:
+        print(f"=== PARTIAL EXPOSITIONS: {partout}")
 
 '''
 MECHANISM:
@@ -100,6 +277,24 @@ def confirm_overwrite(path):
     response = input(f"File '{path}' already exists. Overwrite? [y/N]: ").strip().lower()
     return response == 'y'
 
+'''
+MECHANISM:
+Writes out the ledger's accounts, if they were asked for
+'''
+def publish_metrics(ledger, metrics_base):
+    if metrics_base:
+        ledger.save(f"{metrics_base}.json", f"{metrics_base}.prom")
+
+'''
+MECHANISM:
+Writes out the error report of a quarantined run (if it was quarantined), and says how many scripts failed
+'''
+def report_failures(ledger, errors_path):
+    if errors_path:
+        QUARANTINE.report(errors_path, ledger)
+        if ledger.errors:
+            print(f"=== FAILURES: {ledger.errors} scripts could not be narrated (reported in {errors_path})", file=sys.stderr)
+
 '''
 BEHAVIOUR:
 Nothing fancy here, scopes out the scene and tells the tale of any found scripts
@@ -107,30 +302,136 @@ Nothing fancy here, scopes out the scene and tells the tale of any found scripts
 def tell_the_tale():
     # PROSE:
     # Are we sitting comfortably? Do we know who's story we are telling, and where we are recording it?
-    if len(sys.argv) != 3:
-        print("Usage: python narrate.py <scan_dir> <base_filename>")
-        sys.exit(1)
+    parser = argparse.ArgumentParser(description="Extracts the narratival exposition of the Python scripts in a directory.")
+    parser.add_argument('scan_dir', help="directory of Python scripts to narrate")
+    parser.add_argument('base_filename', help="base name of the JSON and TXT files written into scan_dir")
+    parser.add_argument('--compendium', action='store_true',
+                        help=f"also bind the lexemes into a memory-mappable <base_filename>{COMPENDIUM.EXTENSION} store")
+    parser.add_argument('--compress', choices=sorted(COMPENDIUM.COMPRESSIONS),
+                        help="write the JSON store compressed, as <base_filename>.json.gz (gzip) or .json.xz (lzma); every reader reads either transparently")
+    parser.add_argument('--defer-content', action='store_true',
+                        help="hold only where each lexeme's text lies in its script, reading the content back when it is wanted (less memory on large scans; the scripts must not change until the scan is saved)")
+    parser.add_argument('--merge', action='store_true',
+                        help="update a store shared with other runs: replace only the lexemes of the scripts scanned, keeping the rest (without asking before overwriting)")
+    parser.add_argument('--changes', action='store_true',
+                        help=f"also write a <base_filename>{RECENSION.FEED_EXTENSION} change feed: an event for every lexeme added, updated or removed since the store this scan replaces")
+    parser.add_argument('--excerpts', action='store_true',
+                        help=f"also bind where every class and def lies into a <base_filename>{EXCERPTS.EXTENSION} store, so `narration.py --excerpts` can show their source")
+    parser.add_argument('--chronicle', action='store_true',
+                        help=f"also append each script's lexemes, as soon as they are extracted, to a <base_filename>{CHRONICLE.EXTENSION} (JSON Lines) store")
+    parser.add_argument('--concordance', action='store_true',
+                        help=f"also bind every identity sighting into a <base_filename>{CONCORDANCE.EXTENSION} store, for `concordance.py`")
+    parser.add_argument('--catalogue', action='store_true',
+                        help=f"also bind a full-text index of lexeme content into a <base_filename>{CATALOGUE.EXTENSION} store, for `catalogue.py`")
+    parser.add_argument('--spill-threshold', type=int, metavar='LEXEMES',
+                        help="bounded-memory mode: spill held lexemes to a temporary on-disk run whenever this many are held")
+    parser.add_argument('--map', action='store_true',
+                        help="map mode: narrate only a shard of the scripts into a partial compendium, for `scriptorium.py reduce`")
+    parser.add_argument('--shard', metavar='K/N', help="in map mode, narrate the K-th of N hash-allotted shares of the scripts")
+    parser.add_argument('--manifest', metavar='FILE', help="in map mode, narrate only the scripts listed (relative to scan_dir) in FILE")
+    parser.add_argument('--revision', metavar='REV',
+                        help="narrate the scripts as they were at this git revision, read from git's objects rather than the working tree")
+    parser.add_argument('--include', action='append', metavar='GLOB',
+                        help=f"narrate only the scripts matching GLOB (may be repeated; default {' '.join(QUARRY.DEFAULT_INCLUDES)})")
+    parser.add_argument('--exclude', action='append', default=[], metavar='GLOB',
+                        help=f"never descend into (or narrate) anything matching GLOB (may be repeated; always excluded: {' '.join(QUARRY.DEFAULT_EXCLUDES)})")
+    parser.add_argument('--no-gitignore', action='store_true', help="do not honour the .gitignore files of the scan directory")
+    parser.add_argument('--intra-file-workers', type=int, metavar='N',
+                        help=f"granulate each huge script (of {GRANULATOR.PARALLEL_THRESHOLD} lines or more) in N processes at once, split at its top-level defs and classes")
+    parser.add_argument('--isolate', action='store_true',
+                        help=f"narrate each script in a process apart, bounded in time and memory: a script that fails (or stalls) is reported in <base_filename>{QUARANTINE.EXTENSION}, and the run goes on")
+    parser.add_argument('--time-limit', type=float, metavar='SECONDS',
+                        help=f"with --isolate, give up on any script not narrated within this time (default {QUARANTINE.SECONDS})")
+    parser.add_argument('--memory-limit', type=int, metavar='MIB',
+                        help=f"with --isolate, give up on any script needing more than this much memory (default {QUARANTINE.MEMORY}; where the platform can limit it)")
+    parser.add_argument('--quiet', action='store_true',
+                        help="rather than narrating every script (and listing every lexeme), show a single live progress line")
+    parser.add_argument('--metrics', metavar='BASE',
+                        help="at the end of the run, write its metrics to BASE.json and (in Prometheus text format) BASE.prom")
+    args = parser.parse_args()
+    # (the stores that are only ever made of a whole scan)
+    for option in ('concordance', 'catalogue', 'chronicle', 'merge', 'changes', 'excerpts'):
+        if args.map and getattr(args, option):
+            parser.error(f"--{option} is for whole scans, not for a scribe's share (--map)")
+    if (args.time_limit or args.memory_limit) and not args.isolate:
+        parser.error("--time-limit and --memory-limit bound each script's process apart, so are only for isolated scans (--isolate)")
+    if args.revision and args.excerpts:
+        parser.error("--excerpts are sliced from the scripts on disk, so cannot be taken at a git revision (--revision)")
 
-    scan_dir = Path(sys.argv[1])
-    basefile = sys.argv[2]
+    scan_dir = Path(args.scan_dir)
+    basefile = args.base_filename
 
     if not scan_dir.is_dir():
         print(f"Scan directory '{scan_dir}' does not exist.")
         sys.exit(1)
 
-    json_path = os.path.join(scan_dir, f"{basefile}.json")
+    # When telling the tale of an earlier revision, its scripts are recovered straight from git
+    palimpsest = None
+    if args.revision:
+        try:
+            palimpsest = PALIMPSEST(scan_dir, args.revision)
+        except (ValueError, OSError) as e:
+            print(f"Cannot read revision '{args.revision}': {e}")
+            sys.exit(1)
+
+    # Which scripts are worth narrating, and which subtrees are never worth descending into
+    quarry = QUARRY(args.include, args.exclude, not args.no_gitignore)
+
+    # The accounts of the run are kept whether or not anyone asks to see them
+    ledger = LEDGER(quiet=args.quiet)
+
+    # In quarantine, no script can end (or stall) the run
+    quarantine = QUARANTINE(args.time_limit, args.memory_limit, args.intra_file_workers, args.defer_content) if args.isolate else None
+
+    # A scribe in map mode only writes its partial compendium, and never needs to ask before doing so
+    if args.map:
+        partial_path = os.path.join(scan_dir, SCRIPTORIUM.partial_name(basefile, args.shard))
+        errors_path = f"{partial_path[:-len(COMPENDIUM.EXTENSION)]}{QUARANTINE.EXTENSION}" if args.isolate else None
+        try:
+            map_files(root=scan_dir, partout=partial_path, shard=args.shard, manifest=args.manifest,
+                      spill_threshold=args.spill_threshold, palimpsest=palimpsest, ledger=ledger,
+                      workers=args.intra_file_workers, quarry=quarry, quarantine=quarantine)
+        finally:
+            publish_metrics(ledger, args.metrics)
+            report_failures(ledger, errors_path)
+            if palimpsest:
+                palimpsest.close()
+        return
+
+    json_suffix = COMPENDIUM.COMPRESSIONS[args.compress][0] if args.compress else ''
+    json_path = os.path.join(scan_dir, f"{basefile}.json{json_suffix}")
     txt_path  = os.path.join(scan_dir, f"{basefile}.txt")
+    store_path = os.path.join(scan_dir, f"{basefile}{COMPENDIUM.EXTENSION}") if args.compendium else None
+    concordance_path = os.path.join(scan_dir, f"{basefile}{CONCORDANCE.EXTENSION}") if args.concordance else None
+    catalogue_path = os.path.join(scan_dir, f"{basefile}{CATALOGUE.EXTENSION}") if args.catalogue else None
+    chronicle_path = os.path.join(scan_dir, f"{basefile}{CHRONICLE.EXTENSION}") if args.chronicle else None
+    changes_path = os.path.join(scan_dir, f"{basefile}{RECENSION.FEED_EXTENSION}") if args.changes else None
+    excerpts_path = os.path.join(scan_dir, f"{basefile}{EXCERPTS.EXTENSION}") if args.excerpts else None
+    errors_path = os.path.join(scan_dir, f"{basefile}{QUARANTINE.EXTENSION}") if args.isolate else None
 
     # Did we tell this tale before and are we happy to overwrite or update it?
-    if Path(json_path).exists() and not confirm_overwrite(json_path):
+    # (a merge only ever updates the store, so there is nothing to ask)
+    if Path(json_path).exists() and not args.merge and not confirm_overwrite(json_path):
         print("Aborting to preserve existing JSON and TXT files.")
         sys.exit(1)
 
     # Then we will begin...
-    print(f"Scan directory: {scan_dir}")
-    print(f"Output base filename: {basefile}")
+    if not args.quiet:
+        print(f"Scan directory: {scan_dir}")
+        print(f"Output base filename: {basefile}")
 
-    scan_files(root=scan_dir, dictout=json_path, indexout=txt_path)
+    try:
+        scan_files(root=scan_dir, dictout=json_path, indexout=txt_path, storeout=store_path,
+                   spill_threshold=args.spill_threshold, palimpsest=palimpsest, ledger=ledger,
+                   workers=args.intra_file_workers, concordanceout=concordance_path,
+                   catalogueout=catalogue_path, quarry=quarry, chronicleout=chronicle_path, merge=args.merge, changesout=changes_path, defer=args.defer_content, excerptsout=excerpts_path,
+                   quarantine=quarantine, timed=bool(args.metrics))
+    finally:
+        # (the metrics are written even when the run is cut short - that is when they are most wanted)
+        publish_metrics(ledger, args.metrics)
+        report_failures(ledger, errors_path)
+        if palimpsest:
+            palimpsest.close()
 
 if __name__ == '__main__':
     tell_the_tale()
@@ -1,12 +1,42 @@
 import sys
-import os
 from pathlib import Path
-import json
 
-def rehydrate_and_render(path, output_path):
+from compendium import COMPENDIUM
+from concordance import CONCORDANCE
+from excerpts import EXCERPTS, EXCERPTER
+
+def load_lexemes(path):
+    # Prefer the memory-mapped compendium, unless the JSON store (compressed or not) or the chronicle has been written since
+    # (a chronicle still being written during a scan is read as far as it goes)
+    return COMPENDIUM.consult(COMPENDIUM.latest(path) or path + '.json')
+
+def render_usages(concordance, key):
+    # Every use of the very heir the lexeme tells of (not of every heir sharing its name), wherever it was sighted
+    uses = CONCORDANCE.uses_of(concordance, key)
+    if not uses:
+        return ''
+    return '_used at_: ' + ', '.join(f"{usage.attestation} ({usage.location[0]})" for usage in uses) + '\n\n'
+
+def render_excerpt(excerpter, key):
+    # The source of the class or def the lexeme tells of, sliced straight from its script
+    excerpt = excerpter.excerpt(key)
+    if excerpt is None:
+        return ''
+    return f"```python\n{excerpt.rstrip()}\n```\n\n"
+
+def rehydrate_and_render(path, output_path, with_usages=False, with_excerpts=False):
     # Load lexeme data
-    with open(path + '.json', 'r', encoding='utf-8') as jf:
-        lexeme_dict = json.load(jf)
+    lexeme_dict = load_lexemes(path)
+
+    # Load the concordance, if usages are wanted (and one was bound during the scan)
+    concordance = None
+    if with_usages and Path(path + CONCORDANCE.EXTENSION).exists():
+        concordance = COMPENDIUM(path + CONCORDANCE.EXTENSION)
+
+    # And the excerpts, if the source is wanted beside the story (and they were bound during the scan)
+    excerpter = None
+    if with_excerpts and Path(path + EXCERPTS.EXTENSION).exists():
+        excerpter = EXCERPTER(path + EXCERPTS.EXTENSION)
 
     # Load editorial lines
     with open(path + '.txt', 'r', encoding='utf-8') as tf:
@@ -27,6 +57,10 @@ def rehydrate_and_render(path, output_path):
             key = key.strip()
             category = category.strip()
             lexeme = lexeme_dict.get(key)
+            if lexeme is None and hasattr(lexeme_dict, 'refresh'):
+                # A chronicle may have grown since it was opened
+                lexeme_dict.refresh()
+                lexeme = lexeme_dict.get(key)
 
             if lexeme:
                 # depth = max(2, key.count('.'))
@@ -41,6 +75,10 @@ def rehydrate_and_render(path, output_path):
                     separator = ': '
 
                 out.write(f"_{lexeme['reference']}{category.lower()}_:{key}{separator}{lexeme['content'].rstrip()}\n\n")
+                if concordance is not None:
+                    out.write(render_usages(concordance, key))
+                if excerpter is not None:
+                    out.write(render_excerpt(excerpter, key))
             else:
                 out.write(line.rstrip() + '\n\n')
 
@@ -50,13 +88,16 @@ def confirm_overwrite(path):
     return response == 'y'
 
 if __name__ == '__main__':
-    if len(sys.argv) != 2:
-        print("Usage: python narrate.py <base_filename>")
+    with_usages = '--usages' in sys.argv[1:]
+    with_excerpts = '--excerpts' in sys.argv[1:]
+    arguments = [argument for argument in sys.argv[1:] if argument not in ('--usages', '--excerpts')]
+    if len(arguments) != 1:
+        print("Usage: python narration.py <base_filename> [--usages] [--excerpts]")
         sys.exit(1)
 
-    basefile = sys.argv[1]
+    basefile = arguments[0]
 
-    json_path = f"{basefile}.json"
+    json_path = COMPENDIUM.latest(basefile) or f"{basefile}.json"
     txt_path = f"{basefile}.txt"
     md_path = f"{basefile}.md"
 
@@ -72,4 +113,10 @@ if __name__ == '__main__':
     print(f"Inputs: {json_path}, {txt_path}")
     print(f"Output: {md_path}")
 
-    rehydrate_and_render(basefile, md_path)
\ No newline at end of file
+    if with_usages and not Path(f"{basefile}{CONCORDANCE.EXTENSION}").exists():
+        print(f"No concordance ({basefile}{CONCORDANCE.EXTENSION}) to give usages from - run narrate.py with --concordance.")
+
+    if with_excerpts and not Path(f"{basefile}{EXCERPTS.EXTENSION}").exists():
+        print(f"No excerpts ({basefile}{EXCERPTS.EXTENSION}) to give source from - run narrate.py with --excerpts.")
+
+    rehydrate_and_render(basefile, md_path, with_usages, with_excerpts)
\ No newline at end of file
@@ -0,0 +1,129 @@
+# CONTINUUM: to converse with git - both for the list of a revision's scripts and the long-lived stream of their contents
+import subprocess
+# CONTINUUM: for joining the recovered paths just as a directory walk would
+import os
+
+'''
+THROUGHLINE:
+A palimpsest is a manuscript scraped clean and written over, yet with the earlier text still recoverable beneath.
+
+A git repository is just such a thing: every past revision of every script still lies within it. Rather than checking out a revision (rewriting the whole working tree just to read it), we recover the scripts straight from git's objects and pour them into the GRANULATOR as in-memory bulk material.
+
+Two conversations with git suffice:
+- `git ls-tree` lists a revision's scripts, and the blob (content) id of each
+- a single long-lived `git cat-file --batch` hands over each blob's content on request
+
+The recovered scripts are named exactly as a directory walk of a checkout would name them (scan root joined to the relative path, in the same sorted walk order, with the same exclusions), so their lexemes attest to precisely the same lineages.
+'''
+
+'''
+FIGURATION:
+Recovers a revision's Python scripts from a git repository, without a checkout.
+'''
+class PALIMPSEST:
+    def __init__(self, root, revision):
+        # KNOWLEDGE: The scan root, within a git work tree, just as it would be given for a directory walk
+        self.root = str(root)
+
+        # KNOWLEDGE: The commit whose scripts we recover
+        self.revision = self._git('rev-parse', '--verify', f"{revision}^{{commit}}").decode('ascii').strip()
+
+        # KNOWLEDGE: The long-lived `git cat-file --batch` conversation, started on first need
+        self._reader = None
+
+    '''
+    MECHANISM:
+    Has a short conversation with git, from within the scan root
+    '''
+    def _git(self, *args):
+        try:
+            return subprocess.run(
+                ['git', *args], cwd=self.root, check=True,
+                stdout=subprocess.PIPE, stderr=subprocess.PIPE
+            ).stdout
+        except subprocess.CalledProcessError as e:
+            # Note: we raise errors in the native (Python) metaphor, since they cross the boundary of our module metaphor
+            raise ValueError(f"git {' '.join(args)} failed: {e.stderr.decode(errors='replace').strip()}")
+
+    '''
+    SKILL:
+    Decides if a path (relative to the scan root) is a script of interest - by the same rules as the directory walk
+    '''
+    @staticmethod
+    def is_script(relative_path):
+        parts = relative_path.split('/')
+        if any(part.startswith('_') for part in parts):
+            return False
+        return parts[-1].endswith('.py')
+
+    '''
+    MECHANISM:
+    Orders relative paths as a sorted directory walk would meet them: a directory's own files, then each sub-directory in turn
+    '''
+    @staticmethod
+    def walk_order(relative_path):
+        parts = relative_path.split('/')
+        return parts[:-1], parts[-1]
+
+    '''
+    BEHAVIOUR:
+    Lists the revision's scripts beneath the scan root as (full_path, blob id) pairs, in walk order
+    '''
+    def scripts(self):
+        listing = self._git('ls-tree', '-r', '-z', self.revision, '--', '.')
+
+        found = []
+        for entry in listing.split(b'\0'):
+            if not entry:
+                continue
+            details, _, relative_path = entry.partition(b'\t')
+            mode, kind, blob = details.decode('ascii').split()
+            relative_path = relative_path.decode('utf-8', errors='surrogateescape')
+            # only plain files (not symlinks or submodules) hold scripts
+            if kind != 'blob' or mode == '120000':
+                continue
+            if self.is_script(relative_path):
+                found.append((relative_path, blob))
+
+        found.sort(key=lambda script: self.walk_order(script[0]))
+        return [(os.path.join(self.root, *relative_path.split('/')), blob) for relative_path, blob in found]
+
+    '''
+    BEHAVIOUR:
+    Recovers the content of one blob, as bytes, through the long-lived `git cat-file --batch` conversation
+    '''
+    def unearth(self, blob):
+        if self._reader is None:
+            self._reader = subprocess.Popen(
+                ['git', 'cat-file', '--batch'], cwd=self.root,
+                stdin=subprocess.PIPE, stdout=subprocess.PIPE
+            )
+
+        self._reader.stdin.write(blob.encode('ascii') + b'\n')
+        self._reader.stdin.flush()
+
+        header = self._reader.stdout.readline().split()
+        if len(header) != 3 or header[1] != b'blob':
+            raise ValueError(f"git could not recover blob {blob} ({b' '.join(header).decode(errors='replace')})")
+
+        content = self._reader.stdout.read(int(header[2]))
+        # every blob is followed by a lone newline
+        self._reader.stdout.read(1)
+        return content
+
+    '''
+    MECHANISM:
+    Ends the conversation with git
+    '''
+    def close(self):
+        if self._reader is not None:
+            self._reader.stdin.close()
+            self._reader.wait()
+            self._reader.stdout.close()
+            self._reader = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
@@ -0,0 +1,241 @@
+# CONTINUUM: each script is narrated in a process apart, which can be let go of (or put down) without harm to the run
+import multiprocessing
+# CONTINUUM: to present scripts recovered from git as binary file-like bulk material
+import io
+# CONTINUUM: for the error report
+import json
+
+from granulator import GRANULATOR, Lineages
+from lexicographer import LEXICOGRAPHER
+from concordance import CONCORDANCE
+
+'''
+THROUGHLINE:
+What might carry contagion is kept apart, in quarantine, until it is known to be harmless - so one sick arrival cannot lay low the whole city.
+
+An error in any one script (the GRANULATOR turns every tokenizer failure into a TypeError) aborts a whole scan, and a pathological script (a huge generated one, say) can stall it indefinitely. Overnight scans of a whole code base die on a single bad script.
+
+So, in quarantine (`narrate.py --isolate`), every script is examined in a cell apart: a process of its own that granulates the script and extracts its lexemes, then hands them back. Each examination is bounded:
+- in time: a script that gives no tale within the time limit has its cell put down
+- in memory: before each script, the cell's address space is limited to what it already holds plus the memory limit (where the platform allows), so a script that needs more fails with a MemoryError rather than taking the host down with it
+
+Whatever goes wrong - an error, a timeout, running out of memory, or the cell dying outright - the script is entered as failed in the ledger, the failure is kept for the error report (e.g. `expo.errors.json`), and the run goes on; every lexeme already extracted is kept. A cell is only raised once and kept for script after script (so the cost of a process is paid once, not per script), unless something went wrong in it - then a fresh cell is raised for the next.
+'''
+
+'''
+FIGURATION:
+Examines each script in a cell apart, bounded in time and memory, so no script can abort (or stall) the run.
+'''
+class QUARANTINE:
+    # KNOWLEDGE: The conventional file extension of the error report, sitting alongside the lexeme stores
+    EXTENSION = '.errors.json'
+
+    # KNOWLEDGE: The default bounds of each examination: wall time (seconds) and memory (MiB, beyond what the cell already holds)
+    SECONDS = 300
+    MEMORY = 2048
+
+    # KNOWLEDGE: How long a cell is given to go quietly before it is killed
+    GRACE = 5
+
+    def __init__(self, seconds=None, memory=None, workers=None, defer=False):
+        self._seconds = seconds or QUARANTINE.SECONDS
+        self._memory = (memory or QUARANTINE.MEMORY) << 20
+        # KNOWLEDGE: How many processes a huge script is granulated by (within its cell), and whether lexeme content is deferred
+        self._workers = workers
+        self._defer = defer
+        # (cells are spawned rather than forked, so each starts clean of whatever the run holds)
+        self._context = multiprocessing.get_context('spawn')
+        self._cell = None
+        self._line = None
+
+    '''
+    BEHAVIOUR:
+    Examines a script in its cell, entering the outcome into the ledger; gives its expositions, or None if it had nothing to tell or could not be narrated.
+    Should a concordance be kept, the script's identity sightings are taken into it.
+    '''
+    def examine(self, full_path, ledger, bulk=None, concordance=None):
+        ledger.herald(full_path)
+        self._raise_cell()
+        try:
+            self._line.send((str(full_path), bulk, concordance is not None))
+            if not self._line.poll(self._seconds):
+                self._put_down()
+                ledger.failed(full_path, TimeoutError(f"gave no tale within {self._seconds}s"), 'timeout')
+                return None
+            outcome, *findings = self._line.recv()
+        except (EOFError, OSError):
+            exitcode = self._put_down()
+            ledger.failed(full_path, ChildProcessError(f"the cell died (exit code {exitcode})"), 'crash')
+            return None
+
+        if outcome == 'skipped':
+            ledger.skipped(full_path)
+            return None
+        if outcome == 'failed':
+            kind, error = findings
+            # (whatever went wrong may have left the cell unsound, so the next script is given a fresh one)
+            self._put_down()
+            ledger.failed(full_path, error, kind)
+            return None
+
+        particles, grains, expositions, sightings = findings
+        if sightings is not None:
+            concordance.absorb(sightings)
+        ledger.narrated(particles, grains, expositions)
+        return expositions
+
+    '''
+    MECHANISM:
+    Raises a cell (waiting until it is ready), unless one is already standing
+    '''
+    def _raise_cell(self):
+        if self._cell is not None:
+            return
+        self._line, far_end = self._context.Pipe()
+        self._cell = self._context.Process(target=_cell, args=(far_end, self._memory, self._workers, self._defer))
+        self._cell.start()
+        far_end.close()
+        # (the cell tells when it is ready, so the time it takes to rise is not counted against the first script it examines)
+        try:
+            self._line.recv()
+        except EOFError:
+            self._cell.join(QUARANTINE.GRACE)
+            exitcode = self._put_down()
+            raise RuntimeError(f"the cell could not be raised (exit code {exitcode})")
+
+    '''
+    MECHANISM:
+    Puts down the standing cell (if any), giving its exit code
+    '''
+    def _put_down(self):
+        if self._cell is None:
+            return None
+        self._line.close()
+        if self._cell.is_alive():
+            self._cell.kill()
+        self._cell.join()
+        exitcode = self._cell.exitcode
+        self._cell = self._line = None
+        return exitcode
+
+    '''
+    MECHANISM:
+    Lets the standing cell go, once there are no more scripts to examine (putting it down, should it not go quietly)
+    '''
+    def close(self):
+        if self._cell is None:
+            return
+        self._line.close()
+        self._cell.join(QUARANTINE.GRACE)
+        self._put_down()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    '''
+    BEHAVIOUR:
+    Writes the error report: how the scripts fared, and every failure (script, error and kind - error, timeout, memory or crash)
+    '''
+    @staticmethod
+    def report(path, ledger):
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump({'scripts': ledger.as_dict()['scripts'], 'failures': ledger.failures}, f, indent=2)
+
+
+'''
+MECHANISM:
+The life of a cell: examines each script sent down the line until the line is closed, or something goes wrong.
+(The lexicographer and lineages are kept from script to script, just as in a scan that is not quarantined.)
+'''
+def _cell(line, memory, workers, defer):
+    lexicographer = LEXICOGRAPHER()
+    lineages = Lineages()
+    # (the bound the cell was raised with, restored after every examination)
+    ceiling = _bound()
+    line.send(('ready',))
+    while True:
+        try:
+            full_path, bulk, sighted = line.recv()
+        except EOFError:
+            return
+
+        _bound(memory)
+        try:
+            findings = _examine(full_path, bulk, sighted, lexicographer, lineages, workers, defer)
+        except Exception as e:
+            # (the GRANULATOR turns whatever went wrong into a TypeError, so the error is traced back to where it began)
+            causes = list(_causes(e))
+            if any(isinstance(cause, MemoryError) for cause in causes):
+                findings = ('failed', 'memory', f"MemoryError: needed more than {memory >> 20} MiB")
+            else:
+                # (the error is sent as told, since not every exception survives the journey back)
+                findings = ('failed', 'error', ' <- '.join(f"{type(cause).__name__}: {cause}" for cause in causes))
+        finally:
+            _bound(ceiling)
+
+        # (the findings are sent once the bound is lifted, so sending them cannot run out of memory)
+        line.send(findings)
+        if findings[0] == 'failed':
+            return
+
+'''
+MECHANISM:
+Gives an error, then each error it was raised in the face of, back to where it all began
+'''
+def _causes(error):
+    while error is not None:
+        yield error
+        error = error.__cause__ or error.__context__
+
+'''
+MECHANISM:
+Granulates a single script and extracts its lexemes (and, if asked, its identity sightings), giving the findings to send back
+'''
+def _examine(full_path, bulk, sighted, lexicographer, lineages, workers, defer):
+    with (open(full_path, 'rb') if bulk is None else io.BytesIO(bulk)) as f:
+        granulator = GRANULATOR(f, full_path, lineages, workers)
+        granulated = granulator.granulate()
+    if not granulated:
+        return ('skipped',)
+
+    sightings = None
+    if sighted:
+        sightings = CONCORDANCE()
+        sightings.note(full_path, granulated)
+    expositions = lexicographer.extract(granulated, full_path if defer and bulk is None else None)
+    return ('narrated', granulator.particles, len(granulated), expositions, sightings)
+
+'''
+MECHANISM:
+Bounds the cell's address space to what it already holds plus the given memory (or restores a bound given as (soft, hard)), giving the bound as it was.
+(Only where the platform has address space limits; where the cell cannot tell what it already holds, the memory is its whole bound.)
+'''
+def _bound(memory=None):
+    # (resource is imported only here, since a block at the top of a script loses the registrar its module's lineage)
+    try:
+        import resource
+    except ImportError:
+        return None
+    if not hasattr(resource, 'RLIMIT_AS'):
+        return None
+    was = resource.getrlimit(resource.RLIMIT_AS)
+    if memory is None:
+        return was
+    if isinstance(memory, tuple):
+        resource.setrlimit(resource.RLIMIT_AS, memory)
+        return was
+
+    hard = was[1]
+    try:
+        with open('/proc/self/statm') as f:
+            held = int(f.read().split()[0]) * resource.getpagesize()
+    except (OSError, ValueError, IndexError):
+        held = 0
+    soft = held + memory
+    if hard != resource.RLIM_INFINITY:
+        soft = min(soft, hard)
+    resource.setrlimit(resource.RLIMIT_AS, (soft, hard))
+    return was
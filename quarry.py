@@ -0,0 +1,247 @@
+# CONTINUUM: for the scandir walk, the stat of each directory, and joining paths
+import os
+# CONTINUUM: each glob is compiled, just once, into a regular expression
+import re
+# CONTINUUM: allows us to create a named structure for each compiled glob
+from dataclasses import dataclass
+
+'''
+THROUGHLINE:
+Our scripts must be quarried before they can be granulated - and most of a quarry is spoil. The old walk went everywhere but `_`-prefixed names: down into `.git`, virtual environments, `node_modules` and build outputs, where our sources never lie.
+
+The QUARRY surveys first, and only digs where there is ore:
+- include and exclude globs are compiled just once (defaults: include `*.py`; exclude `_*`, version control, tox/nox, `node_modules` and egg-info)
+- every `.gitignore` met on the way down is honoured, for its own directory and all beneath it (negations, anchored and directory-only patterns, and `**`, as git reads them)
+- a directory holding a `pyvenv.cfg` is a virtual environment, and is left alone
+- an excluded directory is pruned before it is ever descended into, as each directory is surveyed just once (with `os.scandir`)
+- every directory and script is known by its device and inode, so a tree reached again through a symlink (or a symlink loop) is never dug twice
+
+The walk order is exactly that of the old walk: each directory's scripts in sorted order, then each of its sub-directories (sorted) in turn. Symlinked directories (which the old walk never followed) are only dug once the rest of the tree is done - so a script is always named by its real path where it has one.
+'''
+
+# KNOWLEDGE: A glob, compiled. An anchored glob (with a '/' before its end) matches a path relative to its base; any other matches a name at any depth.
+@dataclass(frozen=True)
+class Vein:
+    pattern: str
+    regex: object
+    anchored: bool
+    negated: bool = False
+    directory_only: bool = False
+
+    '''
+    SKILL:
+    Matches a path (relative to the vein's base, '/'-separated) and its name
+    '''
+    def matches(self, relative_path, name, is_dir):
+        if self.directory_only and not is_dir:
+            return False
+        return self.regex.match(relative_path if self.anchored else name) is not None
+
+    '''
+    MECHANISM:
+    Compiles a glob (or a .gitignore line) into a vein
+    '''
+    @staticmethod
+    def compile(pattern, ignore_syntax=False):
+        glob = pattern
+        negated = ignore_syntax and glob.startswith('!')
+        if negated:
+            glob = glob[1:]
+        if ignore_syntax and glob.startswith('\\') and glob[1:2] in ('!', '#'):
+            glob = glob[1:]
+        directory_only = glob.endswith('/')
+        glob = glob.rstrip('/')
+        anchored = '/' in glob
+        return Vein(pattern, re.compile(Vein._translate(glob.lstrip('/')) + r'\Z', re.DOTALL), anchored, negated, directory_only)
+
+    @staticmethod
+    def _translate(glob):
+        parts, i = [], 0
+        while i < len(glob):
+            c = glob[i]
+            if glob.startswith('**/', i):
+                parts.append('(?:.*/)?')
+                i += 3
+                continue
+            if glob.startswith('**', i):
+                parts.append('.*')
+                i += 2
+                continue
+            if c == '*':
+                parts.append('[^/]*')
+            elif c == '?':
+                parts.append('[^/]')
+            elif c == '[' and glob.find(']', i + 2) > 0:
+                close = glob.find(']', i + 2)
+                body = glob[i + 1:close]
+                if body.startswith('!'):
+                    body = '^' + body[1:]
+                parts.append('[' + body.replace('\\', '\\\\') + ']')
+                i = close + 1
+                continue
+            elif c == '\\' and i + 1 < len(glob):
+                parts.append(re.escape(glob[i + 1]))
+                i += 2
+                continue
+            else:
+                parts.append(re.escape(c))
+            i += 1
+        return ''.join(parts)
+
+
+'''
+FIGURATION:
+Surveys a tree for the scripts worth narrating, pruning the spoil before digging into it.
+'''
+class QUARRY:
+    # KNOWLEDGE: What is dug for, and what is never dug into, unless told otherwise
+    DEFAULT_INCLUDES = ('*.py',)
+    DEFAULT_EXCLUDES = ('_*', '.git', '.hg', '.svn', '.tox', '.nox', 'node_modules', '*.egg-info')
+
+    # KNOWLEDGE: The file that marks a directory as a virtual environment
+    VIRTUALENV_MARKER = 'pyvenv.cfg'
+
+    # KNOWLEDGE: The file of ignore patterns honoured in each directory
+    GITIGNORE = '.gitignore'
+
+    def __init__(self, includes=None, excludes=(), gitignore=True):
+        self._includes = [Vein.compile(pattern) for pattern in (includes or QUARRY.DEFAULT_INCLUDES)]
+        self._excludes = [Vein.compile(pattern) for pattern in (*QUARRY.DEFAULT_EXCLUDES, *excludes)]
+        # DISPOSITION: do we honour the .gitignore files met on the way down
+        self._gitignore = gitignore
+
+    '''
+    BEHAVIOUR:
+    Gives the path of every script of interest beneath the root, in walk order
+    '''
+    def seek(self, root):
+        surveyed = set()
+        dug = set()
+        # (each directory still to survey, as its path, its path relative to the root, and the .gitignore layers above it)
+        unsurveyed = [(root, '', ())]
+        # (the symlinked directories, left until the rest of the tree is done)
+        deferred = []
+        while unsurveyed or deferred:
+            if not unsurveyed:
+                unsurveyed.append(deferred.pop(0))
+            dirpath, relative, layers = unsurveyed.pop()
+            try:
+                stat = os.stat(dirpath)
+                with os.scandir(dirpath) as scan:
+                    entries = sorted(scan, key=lambda entry: entry.name)
+            except OSError:
+                continue
+
+            if (stat.st_dev, stat.st_ino) in surveyed:
+                continue
+            surveyed.add((stat.st_dev, stat.st_ino))
+
+            names = {entry.name for entry in entries}
+            if relative and QUARRY.VIRTUALENV_MARKER in names:
+                continue
+            if self._gitignore and QUARRY.GITIGNORE in names:
+                layers = layers + ((relative, QUARRY.read_ignores(os.path.join(dirpath, QUARRY.GITIGNORE))),)
+
+            subdirectories = []
+            for entry in entries:
+                entry_relative = f"{relative}/{entry.name}" if relative else entry.name
+                try:
+                    is_dir = entry.is_dir()
+                    is_file = not is_dir and entry.is_file()
+                except OSError:
+                    continue
+                if not (is_dir or is_file) or self._excluded(entry_relative, entry.name, is_dir, layers):
+                    continue
+
+                if is_dir:
+                    (deferred if entry.is_symlink() else subdirectories).append((entry.path, entry_relative, layers))
+                    continue
+                if not self._included(entry_relative, entry.name):
+                    continue
+                try:
+                    identity = QUARRY._identity(entry, stat.st_dev)
+                except OSError:
+                    continue
+                if identity in dug:
+                    continue
+                dug.add(identity)
+                yield os.path.join(dirpath, entry.name)
+
+            unsurveyed.extend(reversed(subdirectories))
+
+    '''
+    SKILL:
+    Whether a path (relative to the scan root, '/'-separated) passes the include and exclude globs - every directory along it, and the script itself.
+    (No .gitignore is consulted: this is for listings, such as a git revision's, that have none of the ignored files in them anyway.)
+    '''
+    def admits(self, relative_path):
+        names = relative_path.split('/')
+        for depth in range(1, len(names) + 1):
+            if self._excluded('/'.join(names[:depth]), names[depth - 1], depth < len(names), ()):
+                return False
+        return self._included(relative_path, names[-1])
+
+    def _included(self, relative_path, name):
+        return any(vein.matches(relative_path, name, False) for vein in self._includes)
+
+    '''
+    SKILL:
+    Whether an entry is spoil: excluded by a glob, or ignored by the .gitignore layers above it (the last matching pattern of the deepest layer has the final say)
+    '''
+    def _excluded(self, relative_path, name, is_dir, layers):
+        if any(vein.matches(relative_path, name, is_dir) for vein in self._excludes):
+            return True
+
+        ignored = False
+        for base, veins in layers:
+            layer_path = relative_path[len(base) + 1:] if base else relative_path
+            for vein in veins:
+                if vein.matches(layer_path, name, is_dir):
+                    ignored = not vein.negated
+        return ignored
+
+    '''
+    MECHANISM:
+    A script's identity on disk: its device and inode (those of its target, for a symlink)
+    '''
+    @staticmethod
+    def _identity(entry, device):
+        if entry.is_symlink() or not entry.inode():
+            stat = entry.stat()
+            return stat.st_dev, stat.st_ino
+        return device, entry.inode()
+
+    '''
+    MECHANISM:
+    Compiles the patterns of a .gitignore file (blank lines and comments are passed over)
+    '''
+    @staticmethod
+    def read_ignores(path):
+        try:
+            with open(path, 'r', encoding='utf-8', errors='replace') as f:
+                lines = f.read().splitlines()
+        except OSError:
+            return ()
+
+        veins = []
+        for line in lines:
+            if not line.endswith('\\ '):
+                line = line.rstrip()
+            if not line or line.startswith('#'):
+                continue
+            veins.append(Vein.compile(line, ignore_syntax=True))
+        return tuple(veins)
+
+
+if __name__ == '__main__':
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Lists the scripts a scan would narrate, in walk order.")
+    parser.add_argument('scan_dir', help="directory to survey")
+    parser.add_argument('--include', action='append', metavar='GLOB', help="dig for these scripts (may be repeated; default *.py)")
+    parser.add_argument('--exclude', action='append', default=[], metavar='GLOB', help="never dig into these (may be repeated)")
+    parser.add_argument('--no-gitignore', action='store_true', help="do not honour .gitignore files")
+    args = parser.parse_args()
+
+    for full_path in QUARRY(args.include, args.exclude, not args.no_gitignore).seek(args.scan_dir):
+        print(full_path)
@@ -0,0 +1,289 @@
+# CONTINUUM: the raconteur and its listeners converse over a local (Unix domain) socket
+import socket
+# CONTINUUM: each request and reply is a single line of JSON
+import json
+# CONTINUUM: for socket paths, the listener's working directory, and the scripts' vital statistics
+import os
+# CONTINUUM: to read the CLI and issue exit status
+import sys
+# CONTINUUM: to find somewhere private for the socket to live
+import tempfile
+# CONTINUUM: the scripts remembered, least recently told (or recalled) first
+from collections import OrderedDict
+
+'''
+THROUGHLINE:
+Every telling of the tale through `narrate.py` starts from cold: Python itself starts, every module is imported, every class-level ENTITY of SAMPLE, LINEAGE and REFINE is built, and every script is granulated afresh - even though, from one run to the next (an editor saving, a pre-commit hook), barely any script has changed.
+
+A raconteur is a storyteller who is always ready with the tale. Started once (`python raconteur.py serve`), it stays warm in the background: modules imported, codices built, and every script it has already told remembered alongside the size and modification time it had when told.
+
+The listener (`python raconteur.py scan ...`) is deliberately tiny - it imports nothing of the pipeline, just asks over the socket and prints the reply - so a repeated run costs little more than Python's own start-up plus the telling of whatever scripts actually changed.
+
+Requests are carried out one at a time, in the listener's own working directory, so the scripts are named (and their lexemes attested) exactly as `narrate.py` would name them.
+'''
+
+'''
+MECHANISM:
+The default meeting place of the raconteur and its listeners: private to this user
+'''
+def default_socket():
+    runtime = os.environ.get('XDG_RUNTIME_DIR') or tempfile.gettempdir()
+    user = os.getuid() if hasattr(os, 'getuid') else os.environ.get('USERNAME', 'user')
+    return os.path.join(runtime, f"code-as-story-{user}.sock")
+
+
+'''
+FIGURATION:
+The long-lived storyteller: holds the pipeline warm, and remembers every script it has told.
+'''
+class RACONTEUR:
+    # KNOWLEDGE: How many scripts are remembered before the least recently told (or recalled) are forgotten
+    SCRIPTS_REMEMBERED = 20000
+
+    # KNOWLEDGE: How many lineages are registered before they are let go of, and registered afresh
+    LINEAGES_KEPT = 1000000
+
+    def __init__(self, socket_path):
+        # PROSE: On warming up...
+        # The pipeline is only imported here, by the raconteur itself - never by its listeners
+        from granulator import GRANULATOR, Lineages
+        from lexicographer import LEXICOGRAPHER
+        from compendium import COMPENDIUM
+        import narrate
+        import narration
+
+        self._granulator = GRANULATOR
+        self._lexicographer = LEXICOGRAPHER
+        self._compendium = COMPENDIUM
+        self._narrate = narrate
+        self._narration = narration
+
+        # KNOWLEDGE: The lineages met, across every telling (until there are too many to keep)
+        self._lineages_kind = Lineages
+        self._lineages = Lineages()
+
+        # KNOWLEDGE: The scripts told most recently: (absolute path, path as named) -> (size, mtime, expositions)
+        self._memory = OrderedDict()
+
+        # KNOWLEDGE: Where the raconteur listens
+        self.socket_path = socket_path
+
+    '''
+    BEHAVIOUR:
+    Listens for requests until asked to stop
+    '''
+    def serve(self):
+        if os.path.exists(self.socket_path):
+            if ask(self.socket_path, {'command': 'ping'}) is not None:
+                raise RuntimeError(f"A raconteur is already listening on '{self.socket_path}'.")
+            os.unlink(self.socket_path)
+
+        listener = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        listener.bind(self.socket_path)
+        os.chmod(self.socket_path, 0o600)
+        listener.listen()
+        print(f"Raconteur listening on {self.socket_path}")
+
+        try:
+            listening = True
+            while listening:
+                connection, _ = listener.accept()
+                with connection:
+                    listening = self._converse(connection)
+        finally:
+            listener.close()
+            os.unlink(self.socket_path)
+
+    '''
+    MECHANISM:
+    Hears out a single listener and replies, giving whether to go on listening.
+    No listener can silence the raconteur but by asking it to stop: a request that cannot be read is answered with an error, and a listener gone before the reply is just let go.
+    '''
+    def _converse(self, connection):
+        try:
+            request = json.loads(connection.makefile('rb').readline() or b'{}')
+            if not isinstance(request, dict):
+                raise ValueError("a request must be a JSON object")
+        except ValueError as e:
+            request, reply = {}, {'ok': False, 'error': f"Unreadable request: {e}"}
+        else:
+            reply = self.respond(request)
+
+        try:
+            connection.sendall(json.dumps(reply).encode('utf-8') + b'\n')
+        except OSError:
+            pass
+        return request.get('command') != 'stop'
+
+    '''
+    BEHAVIOUR:
+    Carries out a single request, in the listener's working directory, giving the reply
+    '''
+    def respond(self, request):
+        command = request.get('command')
+        try:
+            if command in ('ping', 'stop'):
+                return {'ok': True, 'remembered': len(self._memory)}
+
+            os.chdir(request['cwd'])
+            if command == 'scan':
+                return self.scan(request['scan_dir'], request['base_filename'], request.get('compendium', False))
+            if command == 'narrate':
+                return self.narrate(request['base_filename'])
+            return {'ok': False, 'error': f"Unknown command '{command}'."}
+        except Exception as e:
+            return {'ok': False, 'error': f"{type(e).__name__}: {e}"}
+
+    '''
+    BEHAVIOUR:
+    Tells the tale of a scan directory, as `narrate.py` would - retelling only those scripts that have changed since last told
+    '''
+    def scan(self, scan_dir, basefile, with_compendium=False):
+        lexicographer = self._lexicographer()
+        collated = {}
+        shadowed = set()
+        scripts, retold = 0, 0
+
+        for full_path in self._narrate.seek_scripts(scan_dir):
+            scripts += 1
+            expositions = self._recall(full_path)
+            if expositions is None:
+                retold += 1
+                expositions = self._tell(full_path, lexicographer)
+            self._lexicographer.collate(collated, expositions, shadowed)
+
+        json_path = os.path.join(scan_dir, f"{basefile}.json")
+        txt_path = os.path.join(scan_dir, f"{basefile}.txt")
+        store_path = os.path.join(scan_dir, f"{basefile}{self._compendium.EXTENSION}") if with_compendium else None
+        self._lexicographer.save_to_file(collated, json_path, txt_path, store_path, shadowed=shadowed)
+
+        return {'ok': True, 'scripts': scripts, 'retold': retold, 'lexemes': len(collated), 'json': json_path}
+
+    '''
+    SKILL:
+    Recalls the expositions of a script, provided it is unchanged since it was last told
+    '''
+    def _recall(self, full_path):
+        remembrance = (os.path.abspath(full_path), full_path)
+        remembered = self._memory.get(remembrance)
+        if remembered is None:
+            return None
+        stat = os.stat(full_path)
+        size, mtime, expositions = remembered
+        if (size, mtime) != (stat.st_size, stat.st_mtime_ns):
+            return None
+        self._memory.move_to_end(remembrance)
+        return expositions
+
+    '''
+    MECHANISM:
+    Tells (granulates and extracts) a single script, and remembers it - forgetting the least recently told, should too many be remembered
+    (The lineages only serve the granulation itself, so once too many are registered they can be let go of, and registered afresh.)
+    '''
+    def _tell(self, full_path, lexicographer):
+        if len(self._lineages) > RACONTEUR.LINEAGES_KEPT:
+            self._lineages = self._lineages_kind()
+
+        stat = os.stat(full_path)
+        with open(full_path, 'rb') as f:
+            granulated = self._granulator(f, full_path, self._lineages).granulate()
+        expositions = lexicographer.extract(granulated) if granulated else {}
+
+        remembrance = (os.path.abspath(full_path), full_path)
+        self._memory[remembrance] = (stat.st_size, stat.st_mtime_ns, expositions)
+        self._memory.move_to_end(remembrance)
+        while len(self._memory) > RACONTEUR.SCRIPTS_REMEMBERED:
+            self._memory.popitem(last=False)
+        return expositions
+
+    '''
+    BEHAVIOUR:
+    Renders the narration of an editorialised index, as `narration.py` would
+    '''
+    def narrate(self, basefile):
+        md_path = f"{basefile}.md"
+        self._narration.rehydrate_and_render(basefile, md_path)
+        return {'ok': True, 'markdown': md_path}
+
+
+'''
+MECHANISM:
+The listener's side of the conversation: sends one request and waits for the one reply (None if no raconteur is listening)
+'''
+def ask(socket_path, request):
+    try:
+        with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as conversation:
+            conversation.connect(socket_path)
+            conversation.sendall(json.dumps(request).encode('utf-8') + b'\n')
+            reply = conversation.makefile('rb').readline()
+    except (FileNotFoundError, ConnectionRefusedError):
+        return None
+    return json.loads(reply) if reply else None
+
+
+'''
+MECHANISM:
+Just like narrate.py's own 'are you sure?' prompt, asked by the listener (the raconteur cannot ask anyone anything)
+'''
+def confirm_overwrite(path):
+    response = input(f"File '{path}' already exists. Overwrite? [y/N]: ").strip().lower()
+    return response == 'y'
+
+
+'''
+BEHAVIOUR:
+The CLI for both the raconteur (serve) and its listeners (scan, narrate, ping, stop)
+'''
+def converse():
+    import argparse
+
+    parser = argparse.ArgumentParser(description="A long-lived, warm narrator, and the tiny client that asks it for tales.")
+    parser.add_argument('--socket', default=default_socket(), help="the raconteur's Unix socket")
+    commands = parser.add_subparsers(dest='command', required=True)
+
+    commands.add_parser('serve', help="start the raconteur (in the foreground)")
+    scan = commands.add_parser('scan', help="as narrate.py: extract the expositions of a scan directory")
+    scan.add_argument('scan_dir')
+    scan.add_argument('base_filename')
+    scan.add_argument('--compendium', action='store_true')
+    scan.add_argument('--yes', action='store_true', help="overwrite existing outputs without asking")
+    narrate = commands.add_parser('narrate', help="as narration.py: render <base_filename>.md")
+    narrate.add_argument('base_filename')
+    narrate.add_argument('--yes', action='store_true', help="overwrite existing outputs without asking")
+    commands.add_parser('ping', help="check the raconteur is listening")
+    commands.add_parser('stop', help="ask the raconteur to stop")
+    args = parser.parse_args()
+
+    if not hasattr(socket, 'AF_UNIX'):
+        print("The raconteur needs Unix domain sockets, which this platform does not offer.")
+        sys.exit(1)
+
+    if args.command == 'serve':
+        RACONTEUR(args.socket).serve()
+        return
+
+    request = {'command': args.command, 'cwd': os.getcwd()}
+    if args.command == 'scan':
+        json_path = os.path.join(args.scan_dir, f"{args.base_filename}.json")
+        if os.path.exists(json_path) and not args.yes and not confirm_overwrite(json_path):
+            print("Aborting to preserve existing JSON and TXT files.")
+            sys.exit(1)
+        request.update(scan_dir=args.scan_dir, base_filename=args.base_filename, compendium=args.compendium)
+    elif args.command == 'narrate':
+        md_path = f"{args.base_filename}.md"
+        if os.path.exists(md_path) and not args.yes and not confirm_overwrite(md_path):
+            print("Aborting to preserve existing markdown file.")
+            sys.exit(1)
+        request.update(base_filename=args.base_filename)
+
+    reply = ask(args.socket, request)
+    if reply is None:
+        print(f"No raconteur is listening on '{args.socket}' - start one with: python raconteur.py serve")
+        sys.exit(1)
+
+    print(json.dumps(reply))
+    sys.exit(0 if reply.get('ok') else 1)
+
+
+if __name__ == '__main__':
+    converse()
@@ -0,0 +1,331 @@
+# CONTINUUM: to present recovered scripts to the GRANULATOR as binary file-like bulk material
+import io
+# CONTINUUM: for the machine-readable form of the report, and the change feed
+import json
+# CONTINUUM: each lexeme's content is known in the change feed by its hash
+import hashlib
+# CONTINUUM: to tell whether there is a store to digest
+import os
+# CONTINUUM: to read the CLI
+import argparse
+
+from granulator import GRANULATOR, Lineages
+from lexicographer import LEXICOGRAPHER
+from compendium import COMPENDIUM
+from chronicle import CHRONICLE
+from palimpsest import PALIMPSEST
+
+'''
+THROUGHLINE:
+A recension is one version of a text, as compared with another. Here we compare two tellings of the same story - two lexeme stores, or the scripts of two git revisions - and say how the later telling differs from the earlier:
+- added: a lexeme only the later telling knows
+- removed: a lexeme only the earlier telling knew
+- moved: a lexeme whose canonical reference (where it is found in the source) has changed
+- reworded: a lexeme whose content (or category) has changed
+
+A lexeme may be both moved and reworded.
+
+Changes are reported per attestation subtree, so a reader sees at a glance which modules, classes and methods have had their story changed.
+
+When comparing git revisions only the scripts whose content actually differs (by blob id) are recovered and re-extracted: an unchanged script cannot have changed its story.
+
+The changes may also be given as a change feed (JSON Lines, e.g. `expo.changes.jsonl`), for consumers that only want to process what changed: one event per changed lexeme - `added`, `updated` (moved and/or reworded) or `removed` - carrying its key, category, reference and the hash of its content. `narrate.py --changes` writes one at the end of every scan, against the store the scan replaces.
+'''
+
+'''
+FIGURATION:
+Collates two tellings of the story, lexeme by lexeme.
+'''
+class RECENSION:
+    # KNOWLEDGE: The kinds of change we report, in the order we report them
+    KINDS = ['added', 'removed', 'moved', 'reworded']
+
+    # KNOWLEDGE: How each kind of change is marked in the printed report
+    MARKS = {'added': '+', 'removed': '-', 'moved': '>', 'reworded': '~'}
+
+    # KNOWLEDGE: The events of the change feed, in the order they are given; a lexeme both moved and reworded is updated just once
+    EVENTS = {'added': 'added', 'removed': 'removed', 'moved': 'updated', 'reworded': 'updated'}
+
+    # KNOWLEDGE: The conventional file extension of a change feed, sitting alongside the lexeme stores
+    FEED_EXTENSION = f".changes{CHRONICLE.EXTENSION}"
+
+    def __init__(self):
+        # KNOWLEDGE: Every change found, as kind -> list of (key, earlier record, later record)
+        self.changes = {kind: [] for kind in RECENSION.KINDS}
+
+        # KNOWLEDGE: When comparing revisions, the scripts that were re-extracted, and how many there were in all
+        self.recovered = []
+        self.scripts = 0
+
+    '''
+    BEHAVIOUR:
+    Collates an earlier and a later set of lexeme records (key -> record), noting every change
+    '''
+    def collate(self, earlier, later):
+        for key in sorted(set(earlier.keys()) | set(later.keys())):
+            before = earlier.get(key)
+            after = later.get(key)
+
+            if before is None:
+                self.changes['added'].append((key, None, after))
+                continue
+            if after is None:
+                self.changes['removed'].append((key, before, None))
+                continue
+
+            if before.get('reference') != after.get('reference'):
+                self.changes['moved'].append((key, before, after))
+            # (a digest holds only the hash of its content)
+            if before.get('content') != after.get('content') or before.get('hash') != after.get('hash') or before.get('category') != after.get('category'):
+                self.changes['reworded'].append((key, before, after))
+        return self
+
+    '''
+    SKILL:
+    The hash a lexeme's content is known by in the change feed
+    '''
+    @staticmethod
+    def hash_of(content):
+        return hashlib.blake2b(content.encode('utf-8'), digest_size=16).hexdigest()
+
+    '''
+    MECHANISM:
+    Digests a lexeme store (key -> record) into just what is needed to collate it: each lexeme's category, canonical, reference and content hash.
+    A store's contents need not then be held while the next store is written.
+    '''
+    @staticmethod
+    def digest(store):
+        return {
+            key: {
+                'category': record['category'],
+                'canonical': record['canonical'],
+                'reference': record['reference'],
+                'hash': RECENSION.hash_of(record['content']),
+            }
+            for key, record in (store.folios() if hasattr(store, 'folios') else store.items())
+        }
+
+    '''
+    MECHANISM:
+    Digests the lexeme store at a path (an empty digest, should there be no store)
+    '''
+    @staticmethod
+    def digest_of(path):
+        if not path or not os.path.exists(path):
+            return {}
+        store = COMPENDIUM.consult(path)
+        try:
+            return RECENSION.digest(store)
+        finally:
+            if hasattr(store, 'close'):
+                store.close()
+
+    '''
+    BEHAVIOUR:
+    Gives the change feed: one event per changed lexeme, in key order, as {'event', 'key', 'category', 'reference', 'hash'}.
+    An updated event also names its changes (moved, reworded); a removed event describes the lexeme as it was.
+    '''
+    def events(self):
+        found = {}
+        for kind, changes in self.changes.items():
+            for key, before, after in changes:
+                record = after or before
+                event = found.setdefault(key, {
+                    'event': RECENSION.EVENTS[kind],
+                    'key': key,
+                    'category': record['category'],
+                    'reference': record['reference'],
+                    'hash': record['hash'] if 'hash' in record else RECENSION.hash_of(record['content']),
+                })
+                if event['event'] == 'updated':
+                    event.setdefault('changes', []).append(kind)
+        return [found[key] for key in sorted(found)]
+
+    '''
+    BEHAVIOUR:
+    Writes the change feed (JSON Lines) to a path, giving how many events of each kind were written
+    '''
+    def write_feed(self, path):
+        tally = {event: 0 for event in dict.fromkeys(RECENSION.EVENTS.values())}
+        with open(path, 'w', encoding='utf-8', newline='\n') as feed:
+            for event in self.events():
+                feed.write(json.dumps(event, ensure_ascii=False) + '\n')
+                tally[event['event']] += 1
+        return tally
+
+    '''
+    BEHAVIOUR:
+    Collates two lexeme stores (JSON, chronicle or compendium)
+    '''
+    @staticmethod
+    def of_stores(earlier_path, later_path):
+        earlier = COMPENDIUM.consult(earlier_path)
+        later = COMPENDIUM.consult(later_path)
+        try:
+            return RECENSION().collate(earlier, later)
+        finally:
+            for store in (earlier, later):
+                if hasattr(store, 'close'):
+                    store.close()
+
+    '''
+    BEHAVIOUR:
+    Collates the story told by the scripts beneath a scan root at two git revisions.
+    Only scripts whose blobs differ between the revisions are recovered and re-extracted.
+    '''
+    @staticmethod
+    def of_revisions(root, earlier_revision, later_revision):
+        recension = RECENSION()
+        with PALIMPSEST(root, earlier_revision) as earlier, PALIMPSEST(root, later_revision) as later:
+            earlier_scripts = earlier.scripts()
+            later_scripts = later.scripts()
+
+            # PROSE: On finding what needs re-telling...
+            # A script whose blob is the same in both revisions tells the same story in both, so it is passed over
+            unchanged = set(earlier_scripts) & set(later_scripts)
+            recension.scripts = len(set(path for path, _ in earlier_scripts) | set(path for path, _ in later_scripts))
+
+            # Every other script is recovered and re-told, in walk order, from whichever revisions hold it
+            earlier_changed = [script for script in earlier_scripts if script not in unchanged]
+            later_changed = [script for script in later_scripts if script not in unchanged]
+            recension.recovered = sorted(set(path for path, _ in earlier_changed) | set(path for path, _ in later_changed))
+
+            earlier_lexemes = RECENSION._retell(earlier, earlier_changed)
+            later_lexemes = RECENSION._retell(later, later_changed)
+
+        return recension.collate(earlier_lexemes, later_lexemes)
+
+    '''
+    MECHANISM:
+    Re-tells the given (full_path, blob) scripts of one revision, collating their transcribed lexemes just as a scan would
+    '''
+    @staticmethod
+    def _retell(palimpsest, scripts):
+        lexicographer = LEXICOGRAPHER()
+        lineages = Lineages()
+        lexemes = {}
+        for full_path, blob in scripts:
+            granulated = GRANULATOR(io.BytesIO(palimpsest.unearth(blob)), full_path, lineages).granulate()
+            if not granulated:
+                continue
+            for key, lexeme in lexicographer.extract(granulated).items():
+                lexemes[str(key)] = LEXICOGRAPHER.transcribe(lexeme)
+        return lexemes
+
+    '''
+    SKILL:
+    The attestation of a lexeme (its canonical, less its own lexical) - the subtree it belongs to.
+    A canonical with no lexical at all (e.g. a module's THROUGHLINE) is its own subtree.
+    '''
+    @staticmethod
+    def attestation_of(key, record):
+        canonical = (record or {}).get('canonical', key)
+        attestation, _, _ = canonical.rpartition('.')
+        return attestation or canonical
+
+    '''
+    MECHANISM:
+    Counts every change against each level of its attestation subtree
+    '''
+    def _subtree_tallies(self):
+        tallies = {}
+        for kind, changes in self.changes.items():
+            for key, before, after in changes:
+                diachronic = self.attestation_of(key, after or before).split('.')
+                for depth in range(1, len(diachronic) + 1):
+                    subtree = '.'.join(diachronic[:depth])
+                    tallies.setdefault(subtree, {k: 0 for k in RECENSION.KINDS})[kind] += 1
+        return tallies
+
+    '''
+    BEHAVIOUR:
+    Prints the changes, grouped under each attestation subtree along with the tally of changes within that subtree
+    '''
+    def report(self):
+        if self.scripts:
+            print(f"=== Re-extracted {len(self.recovered)} of {self.scripts} scripts")
+            for full_path in self.recovered:
+                print(f"    {full_path}")
+
+        tallies = self._subtree_tallies()
+        grouped = {}
+        for kind, changes in self.changes.items():
+            for key, before, after in changes:
+                grouped.setdefault(self.attestation_of(key, after or before), []).append((kind, key, before, after))
+
+        for subtree in sorted(tallies):
+            depth = subtree.count('.')
+            tally = ', '.join(f"{count} {kind}" for kind, count in tallies[subtree].items() if count)
+            print(f"{'   ' * depth}{subtree}: {tally}")
+            for kind, key, before, after in sorted(grouped.get(subtree, []), key=lambda change: change[1]):
+                print(f"{'   ' * (depth + 1)}{self.MARKS[kind]} {self._describe(kind, key, before, after)}")
+
+        totals = ', '.join(f"{len(self.changes[kind])} {kind}" for kind in RECENSION.KINDS)
+        print(f"=== {totals}")
+
+    '''
+    MECHANISM:
+    A one-line description of a single change
+    '''
+    @staticmethod
+    def _describe(kind, key, before, after):
+        if kind == 'added':
+            return f"{key}:{after['category']} at {after['reference']}"
+        if kind == 'removed':
+            return f"{key}:{before['category']} was at {before['reference']}"
+        if kind == 'moved':
+            return f"{key}:{after['category']} {before['reference']} -> {after['reference']}"
+        if before['category'] != after['category']:
+            return f"{key}:{before['category']} -> {after['category']}"
+        return f"{key}:{after['category']}"
+
+    '''
+    MECHANISM:
+    The changes as plain data, for machine consumption
+    '''
+    def as_dict(self):
+        return {
+            'scripts': self.scripts,
+            'recovered': self.recovered,
+            'changes': {
+                kind: [
+                    {'key': key, 'earlier': before, 'later': after}
+                    for key, before, after in changes
+                ]
+                for kind, changes in self.changes.items()
+            },
+            'subtrees': self._subtree_tallies(),
+        }
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Reports how the narrative differs between two lexeme stores or two git revisions.")
+    modes = parser.add_subparsers(dest='mode', required=True)
+
+    stores = modes.add_parser('stores', help="compare two lexeme stores (JSON, chronicle or compendium)")
+    stores.add_argument('earlier', help="the earlier lexeme store")
+    stores.add_argument('later', help="the later lexeme store")
+
+    revisions = modes.add_parser('revisions', help="compare the scripts beneath a scan root at two git revisions")
+    revisions.add_argument('scan_dir', help="directory of Python scripts, within a git work tree")
+    revisions.add_argument('earlier', help="the earlier revision")
+    revisions.add_argument('later', help="the later revision")
+
+    for mode in (stores, revisions):
+        mode.add_argument('--json', action='store_true', help="print the changes as JSON")
+        mode.add_argument('--feed', metavar='FILE', help="also write the changes as a change feed (JSON Lines) to FILE")
+
+    args = parser.parse_args()
+
+    if args.mode == 'stores':
+        recension = RECENSION.of_stores(args.earlier, args.later)
+    else:
+        recension = RECENSION.of_revisions(args.scan_dir, args.earlier, args.later)
+
+    if args.feed:
+        recension.write_feed(args.feed)
+
+    if args.json:
+        print(json.dumps(recension.as_dict(), indent=2))
+    else:
+        recension.report()
@@ -43,6 +43,9 @@ class REGISTRAR:
         # KNOWLEDGE: the true identity of an heir apparent
         self._heir = ''
 
+        # KNOWLEDGE: the title last awarded, kept until the register next changes - most subjects share the title of the subject before them
+        self._title = None
+
     '''
     BEHAVIOUR:
     Provides the current lineage relevant to a subject, IF this is a notable subject.
@@ -123,8 +126,10 @@ class REGISTRAR:
     Joins up all the identities in our current lineage to form a single, recordable, title
     '''
     def _entitle(self):
-        lineage = '.'.join(d['id'] for d in self._register if 'id' in d)
-        return lineage.strip('.')
+        if self._title is None:
+            lineage = '.'.join(d['id'] for d in self._register if 'id' in d)
+            self._title = lineage.strip('.')
+        return self._title
 
     '''
     DISPOSITION:
@@ -134,6 +139,7 @@ class REGISTRAR:
     def _prepare_for_heir(self, subject):
         if LINEAGE.is_progenitor(subject):
             self._register.append({'id': '', 'wedded_resilience': self._resilience})
+            self._title = None
             self._heir_apparent = True
 
     '''
@@ -146,6 +152,7 @@ class REGISTRAR:
             if not self._register:
                 self._register.append({'id': '', 'wedded_resilience': self._resilience})
             self._register[-1]['id'] = self._heir
+            self._title = None
         self._heir = ''
 
     '''
@@ -154,6 +161,29 @@ class REGISTRAR:
     '''
     def _sign_off_record(self):
         self._register = self._register[:-1]
+        self._title = None
+
+    '''
+    MECHANISM:
+    The standing of the register (resilience, family lines, heir sought and heir pending), as plain data a registrar elsewhere can carry on from
+    '''
+    def standing(self):
+        register = tuple((d['id'], d['wedded_resilience']) for d in self._register)
+        return self._resilience, register, self._heir_apparent, self._heir
+
+    '''
+    MECHANISM:
+    A registrar that carries on from the standing of another, just as if it had recorded all the same subjects itself
+    '''
+    @classmethod
+    def resuming(cls, standing):
+        resilience, register, heir_apparent, heir = standing
+        registrar = cls('')
+        registrar._resilience = resilience
+        registrar._register = [{'id': registrant, 'wedded_resilience': wedded} for registrant, wedded in register]
+        registrar._heir_apparent = heir_apparent
+        registrar._heir = heir
+        return registrar
 
     '''
     FLAW:
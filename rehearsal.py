@@ -0,0 +1,239 @@
+# CONTINUUM: for the stand-in stores, set aside (or kept) in a directory of their own
+import os
+import tempfile
+# CONTINUUM: to time each phase, to weigh its memory, and (if asked) to profile it
+import time
+import tracemalloc
+import cProfile
+import pstats
+# CONTINUUM: to forge random (but repeatable) stand-in lexemes
+import random
+# CONTINUUM: for writing the stand-in JSON store
+import json
+# CONTINUUM: to read the CLI
+import argparse
+
+import narration
+from compendium import COMPENDIUM
+from chronicle import CHRONICLE
+
+'''
+THROUGHLINE:
+Before the performance, the rehearsal: the whole play is run through, on an empty stage, with the stopwatch running.
+
+Nobody has measured `narration.rehydrate_and_render` at scale - our own code base gives a few hundred lexemes, where a large one gives hundreds of thousands. So an UNDERSTUDY forges a stand-in `expo.json`/`expo.txt` pair as large as we like: many lexemes, with long arcs (deeply dotted keys), long multi-paragraph contents, and an index thick with headings, blank lines and lines that resolve to no lexeme at all.
+
+Then the narration is rehearsed over it, phase by phase:
+- load: reading the lexeme store (in whichever format it was forged)
+- resolve: turning each index line into its lexeme, just as the narration does, but writing nothing
+- render: the whole of `rehydrate_and_render`, giving its write throughput
+
+Each phase is timed, and then run again under tracemalloc for its peak memory (apart, so the weighing does not skew the timing). If asked, each phase is also run under cProfile, its profile saved as `BASE.<phase>.prof` and its costliest calls listed, so the time of each phase can be broken down further.
+'''
+
+'''
+AFFORDANCE:
+Forges a stand-in lexeme store and index, as large and as awkward as asked.
+'''
+class UNDERSTUDY:
+    # KNOWLEDGE: The categories the stand-in lexemes are given
+    CATEGORIES = ['THROUGHLINE', 'FIGURATION', 'AFFORDANCE', 'BEHAVIOUR', 'MECHANISM', 'SKILL', 'DISPOSITION', 'FLAW', 'KNOWLEDGE', 'CONTINUUM']
+
+    # KNOWLEDGE: A little vocabulary for names and narrative
+    WORDS = ['grain', 'sample', 'lineage', 'heir', 'powder', 'hopper', 'sludge', 'record', 'scroll', 'ink', 'folio', 'codex']
+
+    # KNOWLEDGE: The formats a stand-in store may be forged in, as name -> file suffix
+    FORMATS = {
+        'json': '.json',
+        **{name: f".json{suffix}" for name, (suffix, _) in COMPENDIUM.COMPRESSIONS.items()},
+        'chronicle': CHRONICLE.EXTENSION,
+        'compendium': COMPENDIUM.EXTENSION,
+    }
+
+    def __init__(self, seed=0, arc=12, paragraphs=6, unresolved=0.2):
+        self._random = random.Random(seed)
+        # KNOWLEDGE: The deepest a key is dotted, the most paragraphs a content runs to, and the share of index lines that resolve to nothing
+        self._arc = arc
+        self._paragraphs = paragraphs
+        self._unresolved = unresolved
+
+    def _words(self, least, most):
+        return ' '.join(self._random.choice(UNDERSTUDY.WORDS) for _ in range(self._random.randint(least, most)))
+
+    '''
+    MECHANISM:
+    A stand-in key: a module, then an arc of names, made unique by its number
+    '''
+    def _key(self, number):
+        arc = [f"{self._random.choice(UNDERSTUDY.WORDS)}_{self._random.randint(0, 9)}" for _ in range(self._random.randint(0, self._arc - 1))]
+        return '.'.join([f"/module_{number % 97}", *arc, f"heir_{number}"])
+
+    '''
+    MECHANISM:
+    A stand-in record, with a content of one or more paragraphs
+    '''
+    def _record(self, category):
+        paragraphs = [self._words(20, 80) for _ in range(self._random.randint(1, self._paragraphs))]
+        return {
+            'category': category,
+            'canonical': self._words(1, 1),
+            'content': '\n\n'.join(paragraphs),
+            'reference': f"[({self._random.randint(1, 50000)}, {4 * self._random.randint(0, 8)})]",
+        }
+
+    '''
+    BEHAVIOUR:
+    Gives the stand-in records, as (key, record) pairs, and the lines of the index that arranges them
+    '''
+    def forge(self, lexemes):
+        records, lines = [], []
+        for number in range(lexemes):
+            if number % 50 == 0:
+                lines += ['', f"## {self._words(2, 6)}"]
+            category = self._random.choice(UNDERSTUDY.CATEGORIES)
+            key = self._key(number)
+            records.append((key, self._record(category)))
+            lines.append(f"{key}:{category}")
+            if self._random.random() < self._unresolved:
+                lines.append(f"{self._key(lexemes + number)}:{category}")
+        return records, lines
+
+    '''
+    BEHAVIOUR:
+    Forges a stand-in store (in the given format) and index under a base name, giving the path of the store
+    '''
+    def stage(self, basefile, lexemes, store_format='json'):
+        records, lines = self.forge(lexemes)
+        store_path = f"{basefile}{UNDERSTUDY.FORMATS[store_format]}"
+        if store_format == 'compendium':
+            COMPENDIUM.bind(store_path, records)
+        elif store_format == 'chronicle':
+            CHRONICLE.write(store_path, records)
+        else:
+            with COMPENDIUM.scroll(store_path, 'w') as jf:
+                json.dump(dict(records), jf, indent=2)
+
+        with open(f"{basefile}.txt", 'w', encoding='utf-8') as tf:
+            tf.write('\n'.join(lines) + '\n')
+        return store_path
+
+
+'''
+MECHANISM:
+The resolve phase: each index line turned into its lexeme, just as rehydrate_and_render turns it, but writing nothing - giving (resolved, unresolved)
+'''
+def resolve(basefile, lexeme_dict):
+    resolved = unresolved = 0
+    with open(f"{basefile}.txt", 'r', encoding='utf-8') as tf:
+        for line in tf:
+            line = line.rstrip()
+            if not line.strip() or ':' not in line:
+                continue
+            key, _ = line.rsplit(':', 1)
+            if lexeme_dict.get(key.strip()):
+                resolved += 1
+            else:
+                unresolved += 1
+    return resolved, unresolved
+
+
+# (each phase lets go of any store it opened, so no phase is weighed down by the one before)
+def _load(basefile):
+    store = narration.load_lexemes(basefile)
+    if hasattr(store, 'close'):
+        store.close()
+
+def _resolve(basefile):
+    store = narration.load_lexemes(basefile)
+    try:
+        # (the store's loading is the load phase's cost, so the resolution is timed apart from it)
+        started = time.perf_counter()
+        resolved, unresolved = resolve(basefile, store)
+        return resolved, unresolved, time.perf_counter() - started
+    finally:
+        if hasattr(store, 'close'):
+            store.close()
+
+def _render(basefile):
+    narration.rehydrate_and_render(basefile, f"{basefile}.md")
+    return os.path.getsize(f"{basefile}.md")
+
+
+'''
+BEHAVIOUR:
+Rehearses the narration of a stand-in under a base name, phase by phase, giving each phase's (seconds, peak bytes, what it gave).
+Should a profile base be named, each phase is profiled too, and its profile saved as `<profile>.<phase>.prof`.
+'''
+def rehearse(basefile, weigh=True, profile=None):
+    phases = {}
+    for name, act in [('load', _load), ('resolve', _resolve), ('render', _render)]:
+        started = time.perf_counter()
+        given = act(basefile)
+        seconds = time.perf_counter() - started
+
+        peak = None
+        if weigh:
+            tracemalloc.start()
+            try:
+                act(basefile)
+                peak = tracemalloc.get_traced_memory()[1]
+            finally:
+                tracemalloc.stop()
+
+        if profile:
+            profiler = cProfile.Profile()
+            profiler.runcall(act, basefile)
+            profiler.dump_stats(f"{profile}.{name}.prof")
+
+        phases[name] = (seconds, peak, given)
+    return phases
+
+
+'''
+BEHAVIOUR:
+Prints the rehearsal: each phase's time and peak memory, with the resolution cost per line and the write throughput
+'''
+def report(store_path, lexemes, phases, profile=None, top=15):
+    mib = lambda size: f"{size / (1 << 20):8.1f} MiB"
+    resolved, unresolved, resolving = phases['resolve'][2]
+    print(f"=== Rehearsed {lexemes:,} lexemes from {store_path} ({os.path.getsize(store_path):,} bytes): {resolved:,} index lines resolved, {unresolved:,} unresolved")
+    for name, (seconds, peak, given) in phases.items():
+        line = f"{name:<8} {seconds:9.3f}s"
+        line += f"  peak {mib(peak)}" if peak is not None else ''
+        if name == 'resolve' and resolved + unresolved:
+            line += f"  {1e6 * resolving / (resolved + unresolved):.2f} us/line (after loading)"
+        if name == 'render' and seconds:
+            line += f"  {mib(given / seconds).strip()}/s written ({given:,} bytes)"
+        print(line)
+
+    if profile:
+        for name in phases:
+            print(f"=== {name}: the {top} costliest calls (cumulative), from {profile}.{name}.prof")
+            pstats.Stats(f"{profile}.{name}.prof").sort_stats('cumulative').print_stats(top)
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Benchmarks narration.py's rendering over a large stand-in lexeme store and index.")
+    parser.add_argument('--lexemes', type=int, default=100000, help="how many stand-in lexemes to forge (default 100,000)")
+    parser.add_argument('--arc', type=int, default=12, help="the deepest a stand-in key is dotted (default 12)")
+    parser.add_argument('--paragraphs', type=int, default=6, help="the most paragraphs a stand-in content runs to (default 6)")
+    parser.add_argument('--unresolved', type=float, default=0.2, help="the share of lexemes followed by an index line that resolves to nothing (default 0.2)")
+    parser.add_argument('--format', choices=list(UNDERSTUDY.FORMATS), default='json', help="the format of the stand-in store (default json)")
+    parser.add_argument('--seed', type=int, default=0, help="seed for the stand-in lexemes")
+    parser.add_argument('--keep', metavar='DIR', help="forge the stand-ins into DIR, and leave them there (default: a temporary directory)")
+    parser.add_argument('--no-memory', action='store_true', help="skip the (slower) tracemalloc run of each phase")
+    parser.add_argument('--profile', metavar='BASE', help="also profile each phase with cProfile, saving BASE.<phase>.prof")
+    parser.add_argument('--top', type=int, default=15, help="how many of the costliest calls of each profiled phase to list (default 15)")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as aside:
+        stage = args.keep or aside
+        os.makedirs(stage, exist_ok=True)
+        basefile = os.path.join(stage, 'expo')
+
+        started = time.perf_counter()
+        store_path = UNDERSTUDY(args.seed, args.arc, args.paragraphs, args.unresolved).stage(basefile, args.lexemes, args.format)
+        print(f"=== Forged the stand-ins in {time.perf_counter() - started:.3f}s")
+
+        phases = rehearse(basefile, weigh=not args.no_memory, profile=args.profile)
+        report(store_path, args.lexemes, phases, args.profile, args.top)
@@ -0,0 +1,167 @@
+# CONTINUUM: a stable digest of each script's path decides which scribe copies it, whatever host the scribe works on
+import hashlib
+# CONTINUUM: for joining paths and relating them back to the scan root
+import os
+# CONTINUUM: lets us stand several local processes in for the scribes at their desks
+import subprocess
+# CONTINUUM: to find the running interpreter, and to read the CLI
+import sys
+# CONTINUUM: to read the CLI
+import argparse
+
+from compendium import COMPENDIUM
+from cistern import CISTERN
+from lexicographer import LEXICOGRAPHER
+
+'''
+THROUGHLINE:
+A huge tree is too much for one scribe, so the work is shared out across a scriptorium.
+
+Every scribe walks the same tree in the same (sorted) order, so every script has the same ordinal at every desk. Each scribe is allotted a share of the scripts - either by a stable digest of the script's path, or by an explicit manifest - and copies out only the lexemes of its share into a partial COMPENDIUM, each lexeme noting the ordinal of the script it came from. This is the "map" (see `narrate.py --map`).
+
+The collator then takes all the partial compendia and merges them (see `CISTERN.confluence`): where scribes disagree over a key, the lexeme from the script latest in the walk wins - precisely the outcome of a single scan updating `all_expositions` in walk order. The merged flow is written into the usual JSON and TXT stores. This is the "reduce".
+
+For trying all this out on one machine, `simulate` sets several local processes to work as scribes, and then collates their partials.
+'''
+
+'''
+FIGURATION:
+Shares a scan out amongst scribes, and collates what they copy.
+'''
+class SCRIPTORIUM:
+    '''
+    MECHANISM:
+    Parses a shard given as 'K/N' (K counting from 1), giving the pair (K, N)
+    '''
+    @staticmethod
+    def parse_shard(shard):
+        share, _, shares = shard.partition('/')
+        share, shares = int(share), int(shares)
+        if not 1 <= share <= shares:
+            raise ValueError(f"Shard '{shard}' must be K/N with 1 <= K <= N.")
+        return share, shares
+
+    '''
+    MECHANISM:
+    The o/s independent name of a script relative to the scan root - the same on every host
+    '''
+    @staticmethod
+    def relative_name(root, full_path):
+        return os.path.relpath(full_path, root).replace(os.sep, '/')
+
+    '''
+    SKILL:
+    Decides which share a script belongs to, from a stable digest of its relative name
+    '''
+    @staticmethod
+    def share_of(relative_name, shares):
+        digest = hashlib.md5(relative_name.encode('utf-8')).hexdigest()
+        return int(digest, 16) % shares + 1
+
+    '''
+    BEHAVIOUR:
+    Allots a scribe its share of the walk, giving (ordinal, full_path) for every script this scribe should copy.
+    Ordinals are counted (from 1) over the whole walk, so they agree between every scribe.
+    '''
+    @staticmethod
+    def allot(scripts, root, shard=None, manifest=None):
+        listed = None
+        if manifest:
+            with open(manifest, 'r', encoding='utf-8') as f:
+                listed = {line.strip().replace('\\', '/') for line in f if line.strip()}
+
+        share, shares = SCRIPTORIUM.parse_shard(shard) if shard else (1, 1)
+
+        for ordinal, full_path in enumerate(scripts, start=1):
+            relative_name = SCRIPTORIUM.relative_name(root, full_path)
+            if listed is not None and relative_name not in listed:
+                continue
+            if SCRIPTORIUM.share_of(relative_name, shares) != share:
+                continue
+            yield ordinal, full_path
+
+    '''
+    MECHANISM:
+    The conventional name of a scribe's partial compendium
+    '''
+    @staticmethod
+    def partial_name(basefile, shard=None):
+        if shard:
+            share, shares = SCRIPTORIUM.parse_shard(shard)
+            return f"{basefile}.part-{share}-of-{shares}{COMPENDIUM.EXTENSION}"
+        return f"{basefile}.part{COMPENDIUM.EXTENSION}"
+
+    '''
+    BEHAVIOUR:
+    Collates partial compendia into the final JSON and TXT stores (and, optionally, a compendium).
+    The order the partials are given in makes no difference - the ordinals alone decide any conflict.
+    '''
+    @staticmethod
+    def reduce(partials, dictout, indexout, storeout=None):
+        stores = [COMPENDIUM(partial) for partial in partials]
+        try:
+            merged = CISTERN.confluence([store.folios() for store in stores])
+            LEXICOGRAPHER.save_records(merged, dictout, indexout, storeout)
+        finally:
+            for store in stores:
+                store.close()
+
+    '''
+    BEHAVIOUR:
+    Stands several local processes in for scribes on separate hosts: each runs `narrate.py --map` over its shard, concurrently, and then their partials are collated
+    '''
+    @staticmethod
+    def simulate(scan_dir, basefile, scribes, storeout=None):
+        narrate = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'narrate.py')
+        shards = [f"{share}/{scribes}" for share in range(1, scribes + 1)]
+
+        desks = [
+            subprocess.Popen(
+                [sys.executable, narrate, str(scan_dir), basefile, '--map', '--shard', shard],
+                stdout=subprocess.DEVNULL
+            )
+            for shard in shards
+        ]
+        failed = [shard for shard, desk in zip(shards, desks) if desk.wait() != 0]
+        if failed:
+            raise RuntimeError(f"Scribes for shards {', '.join(failed)} did not finish their copying.")
+
+        partials = [os.path.join(scan_dir, SCRIPTORIUM.partial_name(basefile, shard)) for shard in shards]
+        SCRIPTORIUM.reduce(
+            partials,
+            os.path.join(scan_dir, f"{basefile}.json"),
+            os.path.join(scan_dir, f"{basefile}.txt"),
+            storeout
+        )
+        return partials
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Collates the partial lexeme stores of a shared-out scan.")
+    modes = parser.add_subparsers(dest='mode', required=True)
+
+    reducing = modes.add_parser('reduce', help="merge partial compendia into the final JSON and TXT stores")
+    reducing.add_argument('out_dir', help="directory to write the final stores into")
+    reducing.add_argument('base_filename', help="base name of the final JSON and TXT stores")
+    reducing.add_argument('partials', nargs='+', help="partial compendia written by `narrate.py --map`")
+    reducing.add_argument('--compendium', action='store_true', help="also bind the final lexemes into a compendium")
+
+    simulating = modes.add_parser('simulate', help="map a scan over several local processes, then reduce")
+    simulating.add_argument('scan_dir', help="directory of Python scripts to narrate")
+    simulating.add_argument('base_filename', help="base name of the JSON and TXT files written into scan_dir")
+    simulating.add_argument('--scribes', type=int, default=4, help="how many local processes to stand in as nodes")
+    simulating.add_argument('--compendium', action='store_true', help="also bind the final lexemes into a compendium")
+
+    args = parser.parse_args()
+
+    if args.mode == 'reduce':
+        store_path = os.path.join(args.out_dir, f"{args.base_filename}{COMPENDIUM.EXTENSION}") if args.compendium else None
+        SCRIPTORIUM.reduce(
+            args.partials,
+            os.path.join(args.out_dir, f"{args.base_filename}.json"),
+            os.path.join(args.out_dir, f"{args.base_filename}.txt"),
+            store_path
+        )
+    else:
+        store_path = os.path.join(args.scan_dir, f"{args.base_filename}{COMPENDIUM.EXTENSION}") if args.compendium else None
+        SCRIPTORIUM.simulate(args.scan_dir, args.base_filename, args.scribes, store_path)
@@ -0,0 +1,428 @@
+# CONTINUUM: for finding and loading the pipelines under assay, and keeping each one's modules apart
+import sys
+import os
+import importlib
+# CONTINUUM: to present each specimen to a pipeline as binary file-like bulk material
+import io
+# CONTINUUM: to time each pipeline
+import time
+# CONTINUUM: to forge random (but repeatable) specimen scripts
+import random
+# CONTINUUM: to read the CLI
+import argparse
+# CONTINUUM: somewhere transient to write the stores being compared
+import tempfile
+
+'''
+THROUGHLINE:
+A touchstone is the dark stone on which gold was once rubbed to tell true metal from counterfeit: the streak of the sample is set beside the streak of a known true piece, and any difference shows.
+
+Before any faster engine or data structure is adopted into the GRANULATOR, REGISTRAR or LEXICOGRAPHER, its output must be shown to be unchanged. So we rub both pipelines - the reference and the candidate - over the same specimens, and set their streaks side by side:
+- the grains, field by field (lineage, type, substance, location, progenitor)
+- the final lexemes, field by field (category, canonical, content, reference)
+- or, if either pipeline fails, the failure itself
+
+The specimens are real scripts (any scan directory), and scripts forged by a COUNTERFEITER to be rich in the awkward cases: decorators, inline comments just before a DEDENT, PROSE blocks, nested classes, blocks at the top of a script, plain (non-expo) strings - some with a method called on them (e.g. `', '.join(...)`), which must not be run into the name before them - and tagged strings with a method called on them and plain strings after (e.g. `'KNOWLEDGE: ...'.join(['...' % x for x in xs])`), which must stay the grain the plain strings follow.
+
+A mismatch found in a long script is of little help, so every mismatch is whittled down - line by line, for as long as the mismatch persists - to a minimal failing source.
+
+And since speed is the usual reason for a candidate, each pipeline's time over the specimens is recorded too.
+
+The stores, too, must not depend on how the lexemes were collated: so (with `--stores`) our own lexemes of every specimen are saved both from a dictionary and through a spilling CISTERN, and the two JSON and TXT stores must be identical, byte for byte.
+
+A pipeline is either:
+- 'module:function', where function(bulk, full_path) gives (granulated, expositions) for the script's bytes
+- a directory holding a tree of these scripts (e.g. an older checkout), whose own GRANULATOR and LEXICOGRAPHER are loaded, kept apart from ours
+'''
+
+# KNOWLEDGE: Where our own scripts live - their modules must be set aside while another tree's are loaded
+HOME = os.path.dirname(os.path.abspath(__file__))
+
+'''
+BEHAVIOUR:
+Our own pipeline: the GRANULATOR and LEXICOGRAPHER of this very tree
+'''
+def reference(bulk, full_path):
+    from granulator import GRANULATOR
+    from lexicographer import LEXICOGRAPHER
+    granulated = GRANULATOR(io.BytesIO(bulk), full_path).granulate()
+    return granulated, (LEXICOGRAPHER().extract(granulated) if granulated else {})
+
+
+'''
+AFFORDANCE:
+Forges random specimen scripts, written in the Narratival-Exposition grammar and rich in the cases most likely to trip up a pipeline.
+'''
+class COUNTERFEITER:
+    # KNOWLEDGE: The tags our docstrings and comments are adorned with
+    CHARACTERISATIONS = ['FIGURATION', 'AFFORDANCE']
+    ACTIONS = ['BEHAVIOUR', 'MECHANISM', 'SKILL', 'DISPOSITION', 'FLAW']
+
+    # KNOWLEDGE: A little vocabulary for names and narrative
+    WORDS = ['grain', 'sample', 'lineage', 'heir', 'powder', 'hopper', 'sludge', 'record', 'scroll', 'ink']
+
+    def __init__(self, seed):
+        self._random = random.Random(seed)
+
+    '''
+    MECHANISM:
+    Some words of narrative
+    '''
+    def _words(self, least=2, most=6):
+        return ' '.join(self._random.choice(COUNTERFEITER.WORDS) for _ in range(self._random.randint(least, most)))
+
+    def _name(self):
+        return f"{self._random.choice(COUNTERFEITER.WORDS)}_{self._random.randint(0, 99)}"
+
+    '''
+    MECHANISM:
+    A tagged docstring, as placed before a class or def (sometimes spanning several lines)
+    '''
+    def _docstring(self, indent, tags):
+        pad = '    ' * indent
+        lines = [f"{pad}'''", f"{pad}{self._random.choice(tags)}:"]
+        lines += [f"{pad}{self._words()}" for _ in range(self._random.randint(1, 3))]
+        lines.append(f"{pad}'''")
+        return lines
+
+    '''
+    MECHANISM:
+    The lines of a body, one statement (or comment) at a time
+    '''
+    def _statements(self, indent):
+        pad = '    ' * indent
+        lines = []
+        for _ in range(self._random.randint(1, 4)):
+            choice = self._random.random()
+            if choice < 0.2:
+                lines.append(f"{pad}# KNOWLEDGE: {self._words()}")
+                lines.append(f"{pad}self.{self._name()} = {self._random.randint(0, 9)}")
+            elif choice < 0.3:
+                lines.append(f"{pad}# KNOWLEDGE: {self._words()}")
+                lines.append(f"{pad}{self._name()} = '{self._words(1, 2)}'.{self._random.choice(['join', 'upper', 'format'])}({self._name()})")
+            elif choice < 0.35:
+                # (a tagged string with a method called on it, then plain strings within the call)
+                name = self._name()
+                lines.append(f"{pad}{self._name()} = 'KNOWLEDGE: {self._words(1, 2)}'.{self._random.choice(['join', 'format'])}(['{self._words(1, 2)}' % {name} for {name} in {self._name()}])")
+            elif choice < 0.4:
+                lines.append(f"{pad}# PROSE:")
+                lines += [f"{pad}# {self._words()}" for _ in range(self._random.randint(1, 3))]
+                lines.append(f"{pad}{self._name()} = '{self._words(1, 2)}'")
+            elif choice < 0.5:
+                lines.append(f"{pad}'''{self._words()}'''")
+            elif choice < 0.65:
+                lines.append(f"{pad}{self._name()} = {self._name()}  # {self._words()}")
+            else:
+                lines.append(f"{pad}{self._name()} = {self._random.randint(0, 9)}")
+        # an inline comment just before the DEDENT
+        if self._random.random() < 0.4:
+            lines.append(f"{pad}# {self._words()}")
+        return lines
+
+    '''
+    MECHANISM:
+    A def, perhaps decorated, with its docstring before it
+    '''
+    def _def(self, indent):
+        pad = '    ' * indent
+        lines = self._docstring(indent, COUNTERFEITER.ACTIONS) if self._random.random() < 0.8 else []
+        for _ in range(self._random.choice([0, 0, 1, 2])):
+            lines.append(f"{pad}@{self._random.choice(['staticmethod', 'property', 'functools.cache'])}")
+        lines.append(f"{pad}def {self._name()}(self, {self._name()}):")
+        lines += self._statements(indent + 1)
+        return lines
+
+    '''
+    MECHANISM:
+    A class (perhaps holding nested classes) with its docstring before it
+    '''
+    def _class(self, indent, depth):
+        pad = '    ' * indent
+        lines = self._docstring(indent, COUNTERFEITER.CHARACTERISATIONS) if self._random.random() < 0.8 else []
+        lines.append(f"{pad}class {self._name().upper()}:")
+        lines += self._statements(indent + 1)
+        for _ in range(self._random.randint(1, 3)):
+            lines.append('')
+            if depth < 2 and self._random.random() < 0.3:
+                lines += self._class(indent + 1, depth + 1)
+            else:
+                lines += self._def(indent + 1)
+        return lines
+
+    '''
+    BEHAVIOUR:
+    Forges a whole script
+    '''
+    def forge(self):
+        lines = ["# CONTINUUM: " + self._words(), "import functools", ""]
+        lines += ["'''", "THROUGHLINE:", self._words(), "'''", ""]
+        # (a block at the top of a script loses the module's lineage, so what follows is keyed without it - and alike in many a script)
+        if self._random.random() < 0.3:
+            lines += ["try:", "    import functools", "except ImportError:", "    pass", ""]
+        for _ in range(self._random.randint(1, 4)):
+            lines += self._class(0, 0) if self._random.random() < 0.6 else self._def(0)
+            lines.append('')
+        return '\n'.join(lines) + '\n'
+
+
+'''
+FIGURATION:
+Sets two pipelines' streaks side by side over the same specimens.
+'''
+class TOUCHSTONE:
+    # KNOWLEDGE: The fields of a grain, and of a lexeme, in the order they are compared
+    GRAIN_FIELDS = ['lineage', 'type', 'substance', 'location', 'progenitor']
+    LEXEME_FIELDS = ['category', 'canonical', 'content', 'reference']
+
+    # KNOWLEDGE: How many lexemes the CISTERN holds before it spills, when the stores are compared (kept low, so most keys written alike arrive in different runs)
+    SPILL_THRESHOLD = 50
+
+    def __init__(self, reference_pipeline, candidate_pipeline, lexemes_only=False):
+        self._pipelines = {'reference': reference_pipeline, 'candidate': candidate_pipeline}
+
+        # DISPOSITION: are we assaying only the final lexemes (e.g. for a candidate that deliberately drops grains)
+        self.lexemes_only = lexemes_only
+
+        # KNOWLEDGE: The time each pipeline has spent on the specimens
+        self.timings = {'reference': 0.0, 'candidate': 0.0}
+
+        # KNOWLEDGE: How many specimens were assayed, and the (shrunk) mismatches found
+        self.assayed = 0
+        self.mismatches = []
+
+        # KNOWLEDGE: The stores that differed, however the lexemes were collated
+        self.discrepancies = []
+
+    '''
+    SKILL:
+    Loads a pipeline, given as 'module:function' or as the directory of a tree of these scripts
+    '''
+    @staticmethod
+    def load(specification):
+        if os.path.isdir(specification):
+            return TOUCHSTONE._load_tree(specification)
+
+        module_name, _, function_name = specification.partition(':')
+        if not function_name:
+            raise ValueError(f"Pipeline '{specification}' must be 'module:function' or a directory.")
+        return getattr(importlib.import_module(module_name), function_name)
+
+    '''
+    MECHANISM:
+    Loads another tree's GRANULATOR and LEXICOGRAPHER, keeping its modules apart from our own (which share their names)
+    '''
+    @staticmethod
+    def _load_tree(directory):
+        directory = os.path.abspath(directory)
+
+        def lives_in(module, place):
+            path = getattr(module, '__file__', None)
+            return path is not None and os.path.dirname(os.path.abspath(path)) == place
+
+        # PROSE: On loading a tree...
+        # Our own modules are set aside, so the tree's modules of the same name are loaded afresh from the tree
+        set_aside = {name: module for name, module in sys.modules.items() if name != '__main__' and lives_in(module, HOME)}
+        for name in set_aside:
+            del sys.modules[name]
+
+        sys.path.insert(0, directory)
+        try:
+            granulator = importlib.import_module('granulator')
+            lexicographer = importlib.import_module('lexicographer')
+        finally:
+            # Then the tree's modules are forgotten by name (the pipeline holds them still), and ours are put back
+            sys.path.remove(directory)
+            for name in [name for name, module in sys.modules.items() if lives_in(module, directory)]:
+                del sys.modules[name]
+            sys.modules.update(set_aside)
+
+        def pipeline(bulk, full_path):
+            granulated = granulator.GRANULATOR(io.BytesIO(bulk), full_path).granulate()
+            return granulated, (lexicographer.LEXICOGRAPHER().extract(granulated) if granulated else {})
+        return pipeline
+
+    '''
+    MECHANISM:
+    Rubs one pipeline over a specimen, giving its streak: the plain grains and lexemes, or else the failure
+    '''
+    def _streak(self, which, bulk, full_path):
+        started = time.perf_counter()
+        try:
+            granulated, expositions = self._pipelines[which](bulk, full_path)
+            grains = [tuple(grain) for grain in (granulated or [])]
+            lexemes = {
+                str(key): (lexeme.category.name, str(lexeme.canonical), lexeme.content, str(lexeme.reference))
+                for key, lexeme in (expositions or {}).items()
+            }
+            return {'grains': grains, 'lexemes': lexemes}
+        except Exception as e:
+            return {'failure': f"{type(e).__name__}: {e}"}
+        finally:
+            self.timings[which] += time.perf_counter() - started
+
+    '''
+    SKILL:
+    The differences between two streaks, field by field (an empty list if they match)
+    '''
+    def differences(self, expected, found):
+        if 'failure' in expected or 'failure' in found:
+            if expected.get('failure') != found.get('failure'):
+                return [f"outcome: {expected.get('failure', 'succeeded')} != {found.get('failure', 'succeeded')}"]
+            return []
+
+        differences = []
+        if not self.lexemes_only:
+            for index, (before, after) in enumerate(zip(expected['grains'], found['grains'])):
+                for name, this, that in zip(TOUCHSTONE.GRAIN_FIELDS, before, after):
+                    if this != that:
+                        differences.append(f"grain {index} {name}: {this!r} != {that!r}")
+                if differences:
+                    break
+            if len(expected['grains']) != len(found['grains']):
+                differences.append(f"grains: {len(expected['grains'])} != {len(found['grains'])}")
+
+        for key in sorted(set(expected['lexemes']) | set(found['lexemes'])):
+            before, after = expected['lexemes'].get(key), found['lexemes'].get(key)
+            if before is None or after is None:
+                differences.append(f"lexeme {key}: {'missing' if after is None else 'unexpected'}")
+                continue
+            for name, this, that in zip(TOUCHSTONE.LEXEME_FIELDS, before, after):
+                if this != that:
+                    differences.append(f"lexeme {key} {name}: {this!r} != {that!r}")
+        return differences
+
+    '''
+    MECHANISM:
+    Rubs both pipelines over a specimen, giving the differences between their streaks
+    '''
+    def _compare(self, source, full_path):
+        bulk = source.encode('utf-8') if isinstance(source, str) else source
+        return self.differences(self._streak('reference', bulk, full_path), self._streak('candidate', bulk, full_path))
+
+    '''
+    BEHAVIOUR:
+    Assays a single specimen, whittling down (and recording) any mismatch found
+    '''
+    def assay(self, source, full_path):
+        self.assayed += 1
+        differences = self._compare(source, full_path)
+        if differences:
+            # (the whittling is not timed - only the assay itself counts towards each pipeline's speed)
+            timings = dict(self.timings)
+            shrunk = self.shrink(source, full_path)
+            self.mismatches.append({
+                'specimen': full_path,
+                'differences': self._compare(shrunk, full_path),
+                'shrunk': shrunk,
+            })
+            self.timings = timings
+        return not differences
+
+    '''
+    BEHAVIOUR:
+    Whittles a mismatching source down to a minimal one: whole runs of lines are cut away (halving the run each time nothing more can be cut), for as long as the mismatch persists
+    '''
+    def shrink(self, source, full_path):
+        if isinstance(source, bytes):
+            source = source.decode('utf-8', errors='surrogateescape')
+        lines = source.splitlines(keepends=True)
+
+        run = max(1, len(lines) // 2)
+        while True:
+            cut = False
+            start = 0
+            while start < len(lines):
+                trial = lines[:start] + lines[start + run:]
+                if trial and self._compare(''.join(trial), full_path):
+                    lines = trial
+                    cut = True
+                else:
+                    start += run
+            if run == 1 and not cut:
+                return ''.join(lines)
+            if not cut:
+                run = max(1, run // 2)
+
+    '''
+    BEHAVIOUR:
+    Saves our own lexemes of every specimen twice - once collated into a dictionary, once spilled through a CISTERN - noting every store (JSON or TXT) that differs
+    '''
+    def assay_stores(self, specimens):
+        from lexicographer import LEXICOGRAPHER
+        from cistern import CISTERN
+
+        held, shadowed, spilled = {}, set(), CISTERN(TOUCHSTONE.SPILL_THRESHOLD)
+        for source, full_path in specimens:
+            bulk = source.encode('utf-8') if isinstance(source, str) else source
+            try:
+                _, expositions = reference(bulk, full_path)
+            except Exception:
+                continue
+            LEXICOGRAPHER.collate(held, expositions, shadowed)
+            spilled.update(expositions)
+
+        with tempfile.TemporaryDirectory(prefix='touchstone-') as place:
+            LEXICOGRAPHER.save_to_file(held, os.path.join(place, 'held.json'), os.path.join(place, 'held.txt'), shadowed=shadowed)
+            LEXICOGRAPHER.save_records(spilled.drain(), os.path.join(place, 'spilled.json'), os.path.join(place, 'spilled.txt'), entries=spilled.shadowed)
+            for extension in ('json', 'txt'):
+                with open(os.path.join(place, f"held.{extension}"), 'rb') as f, open(os.path.join(place, f"spilled.{extension}"), 'rb') as g:
+                    if f.read() != g.read():
+                        self.discrepancies.append(extension.upper())
+        return not self.discrepancies
+
+    '''
+    BEHAVIOUR:
+    Prints what the touchstone showed
+    '''
+    def report(self):
+        print(f"=== Assayed {self.assayed} specimens: {len(self.mismatches)} mismatched")
+        for mismatch in self.mismatches:
+            print(f"--- {mismatch['specimen']}")
+            for difference in mismatch['differences']:
+                print(f"    {difference}")
+            print("    minimal failing source:")
+            for line in mismatch['shrunk'].splitlines():
+                print(f"    | {line}")
+        for discrepancy in self.discrepancies:
+            print(f"--- the {discrepancy} store differs when the lexemes are spilled through a CISTERN")
+
+        reference_time, candidate_time = self.timings['reference'], self.timings['candidate']
+        print(f"=== reference {reference_time:.3f}s, candidate {candidate_time:.3f}s", end='')
+        if candidate_time > 0:
+            print(f" (candidate is {reference_time / candidate_time:.2f}x the speed of reference)")
+        else:
+            print()
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Checks that a candidate pipeline gives exactly the grains and lexemes of a reference pipeline.")
+    parser.add_argument('candidate', help="the candidate pipeline: 'module:function' or a directory holding a tree of these scripts")
+    parser.add_argument('--reference', default='touchstone:reference',
+                        help="the reference pipeline (default: this tree's own GRANULATOR and LEXICOGRAPHER)")
+    parser.add_argument('--scan', metavar='DIR', action='append', default=[], help="assay the Python scripts beneath DIR (repeatable)")
+    parser.add_argument('--forgeries', type=int, default=100, metavar='N', help="assay N forged scripts (default 100)")
+    parser.add_argument('--seed', type=int, default=0, help="seed for the forged scripts")
+    parser.add_argument('--lexemes-only', action='store_true', help="compare only the final lexemes, not the grains")
+    parser.add_argument('--stores', action='store_true',
+                        help="also check that our own stores of all the specimens are identical whether the lexemes are held in a dictionary or spilled through a CISTERN")
+    args = parser.parse_args()
+
+    touchstone = TOUCHSTONE(TOUCHSTONE.load(args.reference), TOUCHSTONE.load(args.candidate), args.lexemes_only)
+
+    from narrate import seek_scripts
+    specimens = []
+    for scan_dir in args.scan:
+        for full_path in seek_scripts(scan_dir):
+            with open(full_path, 'rb') as f:
+                specimens.append((f.read(), full_path))
+    for forgery in range(args.forgeries):
+        counterfeiter = COUNTERFEITER(f"{args.seed}:{forgery}")
+        specimens.append((counterfeiter.forge(), f"forgery_{forgery}.py"))
+
+    for source, full_path in specimens:
+        touchstone.assay(source, full_path)
+    if args.stores:
+        touchstone.assay_stores(specimens)
+
+    touchstone.report()
+    sys.exit(1 if touchstone.mismatches or touchstone.discrepancies else 0)